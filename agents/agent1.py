@@ -1,13 +1,27 @@
 import sys, os, re
-from datetime import datetime, timedelta
+import threading
+import contextvars
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+import requests
 from dotenv import load_dotenv
-from typing import TypedDict, List, Dict, Any
+from dateutil.relativedelta import relativedelta
+from typing import TypedDict, List, Dict, Any, Optional
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import AIMessage
 from huggingface_hub import InferenceClient
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from backend.calendar_api import create_event, check_availability
+from backend.calendar_api import create_event, check_availability, prefetch_day, search_events, find_free_slots, get_busy_events, reschedule_event, cancel_event, write_event_id
+from backend.slots import free_mask
+from backend.events import Event
+from backend.timecore import zone, day_epoch, clock_labels
+from backend import deadline, job_queue, memstats
+from backend.llm_batch import MicroBatcher, LLM_BATCH_MAX_SIZE, LLM_SUBMIT_TIMEOUT_SECONDS
 
 if os.path.exists("/etc/secrets/.env"):
     load_dotenv("/etc/secrets/.env")
@@ -15,15 +29,42 @@ else:
     load_dotenv() 
 hf_token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
 
-client = InferenceClient(
-    model="microsoft/DialoGPT-medium",
-    token=hf_token,
-)
+LLM_TIMEOUT_SECONDS = int(os.getenv("LLM_TIMEOUT_SECONDS", "15"))
+
+_client = None
+_client_pid = None
+
+def get_client() -> InferenceClient:
+    """This process's inference client, created on first use so its HTTP session never crosses a fork"""
+    global _client, _client_pid
+    if _client_pid != os.getpid():
+        _client = InferenceClient(
+            model="microsoft/DialoGPT-medium",
+            token=hf_token,
+            timeout=LLM_TIMEOUT_SECONDS,
+        )
+        _client_pid = os.getpid()
+    return _client
+
+# "hf" calls the inference client (or LLM_BATCH_URL, an endpoint taking a list of inputs); "stub" answers locally
+LLM_BACKEND = os.getenv("LLM_BACKEND", "hf")
+LLM_BATCH_URL = os.getenv("LLM_BATCH_URL")
+LLM_PARAMETERS = {"max_new_tokens": 50, "temperature": 0.7, "return_full_text": False}
+STUB_REPLY = "I'm here to help with your calendar! You can ask me to check availability or book a meeting."
 
 DEFAULT_TIMEZONE = "Asia/Kolkata"
+MAX_AVAILABILITY_DAYS = 14
+
+# Shared pool for fanning multi-day availability lookups out concurrently
+availability_pool = ThreadPoolExecutor(max_workers=7, thread_name_prefix="availability")
+# Per-prompt calls of one batch when the backend only takes a single prompt per request
+generation_pool = ThreadPoolExecutor(max_workers=LLM_BATCH_MAX_SIZE, thread_name_prefix="generation")
+
+# Sessions whose conversation state is kept in this process (least recently used are dropped)
+SESSION_CONTEXT_CACHE_SIZE = int(os.getenv("SESSION_CONTEXT_CACHE_SIZE", "5000"))
 
 # Enhanced conversation context to track all details
-conversation_context = {
+CONTEXT_TEMPLATE = {
     'last_topic': None,
     'last_date_mentioned': None,
     'last_time_mentioned': None,
@@ -33,9 +74,102 @@ conversation_context = {
     'available_slots': [],  # Store available slots from last availability check
     'last_availability_date': None,
     'booking_in_progress': False,
-    'accumulated_booking_info': {}
+    'accumulated_booking_info': {},
+    # Set when a turn hands a booking to the job queue; the API enqueues it and reports the job id
+    'pending_job': None,
+    # Id of the enqueued booking; accumulated_booking_info is kept until its outcome is known
+    'booking_job': None,
+    # {'id', 'summary', 'when'} of the event a cancel request matched; it is only deleted on a yes
+    'pending_cancel': None
 }
 
+def new_context() -> Dict[str, Any]:
+    context = dict(CONTEXT_TEMPLATE)
+    context['available_slots'] = []
+    context['accumulated_booking_info'] = {}
+    return context
+
+_active_context: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar('conversation_context', default=None)
+_session_contexts: 'OrderedDict[str, tuple]' = OrderedDict()
+_session_contexts_lock = threading.Lock()
+_session_context_evictions = 0
+
+class SessionContext(MutableMapping):
+    """
+    conversation_context as seen by the running turn: the state of the session
+    entered with agent_session(), so concurrent sessions never share it
+    """
+    def _context(self) -> Dict[str, Any]:
+        context = _active_context.get()
+        if context is None:
+            raise RuntimeError("conversation_context used outside agent_session()")
+        return context
+
+    def __getitem__(self, key):
+        return self._context()[key]
+
+    def __setitem__(self, key, value):
+        self._context()[key] = value
+
+    def __delitem__(self, key):
+        del self._context()[key]
+
+    def __iter__(self):
+        return iter(self._context())
+
+    def __len__(self):
+        return len(self._context())
+
+conversation_context = SessionContext()
+
+@contextmanager
+def agent_session(session_id: str):
+    """Run a turn against one session's context; turns of the same session are serialized"""
+    global _session_context_evictions
+    with _session_contexts_lock:
+        entry = _session_contexts.pop(session_id, None) or (new_context(), threading.Lock())
+        _session_contexts[session_id] = entry
+        while len(_session_contexts) > SESSION_CONTEXT_CACHE_SIZE:
+            _session_contexts.popitem(last=False)
+            _session_context_evictions += 1
+    context, lock = entry
+    with lock:
+        token = _active_context.set(context)
+        try:
+            yield context
+        finally:
+            _active_context.reset(token)
+
+def forget_session(session_id: str):
+    with _session_contexts_lock:
+        _session_contexts.pop(session_id, None)
+
+def session_memory(top: int = 10) -> Dict[str, Any]:
+    """Conversation state held by this process: session count, LRU evictions and the largest sessions by estimated size"""
+    with _session_contexts_lock:
+        entries = list(_session_contexts.items())
+        evictions = _session_context_evictions
+    sizes = []
+    for session_id, (context, _) in entries:
+        try:
+            sizes.append((memstats.deep_size(context), session_id))
+        except RuntimeError:
+            # The session's turn changed its context mid-walk; it is counted next time
+            continue
+    sizes.sort(reverse=True)
+    total = sum(size for size, _ in sizes)
+    return {
+        'sessions': len(entries),
+        'capacity': SESSION_CONTEXT_CACHE_SIZE,
+        'evictions': evictions,
+        'estimated_kb': round(total / 1024, 1),
+        'mean_session_bytes': round(total / len(sizes)) if sizes else None,
+        'largest': [
+            {'session_id': session_id, 'estimated_bytes': size}
+            for size, session_id in sizes[:top]
+        ]
+    }
+
 def parse_relative_date(date_input, reference_date=None):
     if reference_date is None:
         reference_date = datetime.now()
@@ -203,6 +337,99 @@ def parse_duration(text: str) -> int:
     
     return None
 
+WEEKDAY_CODES = {
+    'monday': 'MO', 'tuesday': 'TU', 'wednesday': 'WE', 'thursday': 'TH',
+    'friday': 'FR', 'saturday': 'SA', 'sunday': 'SU'
+}
+
+def extract_recurrence(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Recurrence of a booking request ('every Monday', 'daily for 2 weeks', 'weekdays until
+    Dec 1', '6 times') as an RRULE without bounds plus its bounds, or None
+    """
+    text_lower = text.lower()
+    day_names = '|'.join(WEEKDAY_CODES)
+    patterns = [
+        (r'\b(every weekday|weekdays|every working day)\b', 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR', 'every weekday'),
+        (r'\b(every day|daily)\b', 'FREQ=DAILY', 'every day'),
+        (rf'\bevery (other )?((?:{day_names})s?(?:(?:,\s*|\s+and\s+|\s*,\s*and\s+)(?:{day_names})s?)*)\b', None, None),
+        (r'\b(every other week|biweekly|fortnightly)\b', 'FREQ=WEEKLY;INTERVAL=2', 'every other week'),
+        (r'\b(every week|weekly)\b', 'FREQ=WEEKLY', 'every week'),
+        (r'\b(every month|monthly)\b', 'FREQ=MONTHLY', 'every month'),
+    ]
+    for pattern, rule, description in patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            break
+    else:
+        return None
+    if rule is None:
+        names = [name for name in WEEKDAY_CODES if name in match.group(2)]
+        rule = 'FREQ=WEEKLY;BYDAY=' + ','.join(WEEKDAY_CODES[name] for name in names)
+        description = 'every ' + ('other ' if match.group(1) else '') + ' and '.join(name.title() for name in names)
+        if match.group(1):
+            rule += ';INTERVAL=2'
+
+    recurrence = {'rule': rule, 'description': description, 'count': None, 'span': None, 'until': None,
+                  'phrases': [match.group(0)]}
+    count_match = re.search(r'\b(\d+) (times|occurrences|sessions)\b', text_lower)
+    span_match = re.search(r'\bfor (\d+|a|one|two|three|four|six) (day|week|month)s?\b', text_lower)
+    until_match = re.search(r'\buntil ([a-z]+ \d{1,2}(?:st|nd|rd|th)?|\d{1,2}(?:st|nd|rd|th)? [a-z]+|\d{4}-\d{2}-\d{2})', text_lower)
+    if count_match:
+        recurrence['count'] = int(count_match.group(1))
+        recurrence['description'] += f", {count_match.group(1)} times"
+        recurrence['phrases'].append(count_match.group(0))
+    elif span_match:
+        words = {'a': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'six': 6}
+        amount = words.get(span_match.group(1)) or int(span_match.group(1))
+        recurrence['span'] = (amount, span_match.group(2))
+        recurrence['description'] += f" for {amount} {span_match.group(2)}{'s' if amount > 1 else ''}"
+        recurrence['phrases'].append(span_match.group(0))
+    elif until_match:
+        recurrence['until'] = parse_relative_date(until_match.group(1))
+        if recurrence['until']:
+            recurrence['description'] += f" until {datetime.strptime(recurrence['until'], '%Y-%m-%d').strftime('%B %d')}"
+        recurrence['phrases'].append(until_match.group(0))
+    return recurrence
+
+def series_start_date(text: str, recurrence: Dict[str, Any], reference_date: Optional[datetime] = None) -> Optional[str]:
+    """
+    First date of a series: an explicit start ('starting Monday', 'tomorrow', 'next Friday'),
+    moved forward to the first day a weekly BYDAY rule matches
+    """
+    text_lower = text.lower()
+    start_match = (
+        re.search(r'\b(?:starting|from|beginning)\s+(today|tomorrow|next \w+|this \w+|[a-z]+ \d{1,2}(?:st|nd|rd|th)?|\d{1,2}(?:st|nd|rd|th)? [a-z]+|\w+day)\b', text_lower)
+        or re.search(r'\b(today|tomorrow|next \w+|this \w+|coming \w+)\b', text_lower)
+    )
+    start_date = parse_relative_date(start_match.group(1), reference_date) if start_match else None
+    by_day = re.search(r'BYDAY=([A-Z,]+)', recurrence['rule'])
+    if not by_day:
+        return start_date
+    codes = by_day.group(1).split(',')
+    day = datetime.strptime(start_date, "%Y-%m-%d") if start_date else (reference_date or datetime.now())
+    for offset in range(7):
+        candidate = day + timedelta(days=offset)
+        if list(WEEKDAY_CODES.values())[candidate.weekday()] in codes:
+            return candidate.strftime("%Y-%m-%d")
+    return start_date
+
+def build_recurrence_rule(recurrence: Dict[str, Any], start_dt: datetime) -> str:
+    """Final RRULE for a series starting at start_dt (aware); UNTIL is given in UTC as RFC 5545 requires"""
+    rule = recurrence['rule']
+    if recurrence.get('count'):
+        return f"{rule};COUNT={recurrence['count']}"
+    last_day = None
+    if recurrence.get('span'):
+        amount, unit = recurrence['span']
+        last_day = start_dt + relativedelta(**{f"{unit}s": amount}) - timedelta(days=1)
+    elif recurrence.get('until'):
+        last_day = datetime.strptime(recurrence['until'], "%Y-%m-%d").replace(tzinfo=start_dt.tzinfo)
+    if last_day is None:
+        return rule
+    until = last_day.replace(hour=23, minute=59, second=59).astimezone(timezone.utc)
+    return f"{rule};UNTIL={until.strftime('%Y%m%dT%H%M%SZ')}"
+
 def is_availability_request(text: str) -> bool:
     availability_keywords = [
         'available', 'free', 'availability', 'busy', 'schedule',
@@ -216,6 +443,22 @@ def is_availability_request(text: str) -> bool:
             return True
     return False
 
+EVENT_SEARCH_PATTERNS = [
+    r"\b(when is|when's|what time is) my next\b",
+    r'\bnext (meeting|call|event) with\b',
+    r'\b(do i have|have i got|are there) any\b.*\b(meetings?|calls?|events?) (with|about)\b',
+    r'\b(list|show|find)( me)?( all)?( my)?( the)? \w+s\b'
+]
+
+def is_event_search_request(text: str) -> bool:
+    """Questions about existing events by person or topic, e.g. 'when is my next meeting with John'"""
+    text_lower = text.lower()
+    # Open-slot and booking questions keep their own handlers
+    excluded = ['available', 'free', 'slot', 'book', 'schedule', 'set up', 'arrange', 'create']
+    if any(word in text_lower for word in excluded):
+        return False
+    return any(re.search(pattern, text_lower) for pattern in EVENT_SEARCH_PATTERNS)
+
 def is_booking_request(text: str) -> bool:
     booking_keywords = [
         'book', 'schedule', 'set up', 'create', 'arrange', 'plan',
@@ -234,7 +477,118 @@ def is_duration_only(text: str) -> bool:
     ]
     return any(re.match(pattern, text_lower) for pattern in duration_patterns)
 
-def generate_natural_response(text: str, response_type: str = "casual") -> str:
+def _generate_one(prompt: str) -> Optional[str]:
+    try:
+        return get_client().text_generation(prompt, **LLM_PARAMETERS)
+    except Exception as e:
+        print(f"⚠️ Text generation failed: {e}")
+        return None
+
+def generate_batch(prompts: List[str]) -> List[Optional[str]]:
+    """Completions for a micro-batch of prompts, one entry per prompt (None on failure)"""
+    if LLM_BACKEND == "stub":
+        return [STUB_REPLY for _ in prompts]
+    if LLM_BATCH_URL:
+        # Endpoints serving a text-generation pipeline take the whole batch as one list of inputs
+        response = requests.post(
+            LLM_BATCH_URL,
+            headers={"Authorization": f"Bearer {hf_token}"},
+            json={"inputs": prompts, "parameters": LLM_PARAMETERS},
+            timeout=LLM_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        outputs = response.json()
+        return [(output[0] if isinstance(output, list) else output).get('generated_text') for output in outputs]
+    # The serverless API takes one prompt per call, so the batch goes out as concurrent calls
+    return list(generation_pool.map(_generate_one, prompts))
+
+llm_batcher = MicroBatcher(generate_batch)
+
+# Casual turns with a fixed right answer; matched in one pass over the normalized text
+RESPONSE_TEMPLATES = [
+    ('greeting', r'(hi|hello|hey|hiya|good (morning|afternoon|evening)|greetings)( there)?( bot| assistant)?',
+     "{greeting}! I can check your availability, find your meetings and book, move or cancel events. What would you like to do?"),
+    ('how_are_you', r"(how are you|how's it going|how are things)( doing)?( today)?",
+     "Doing well, thanks for asking! Want me to check your calendar for {today}?"),
+    ('thanks', r'(thanks|thank you|thx|ty|cheers|much appreciated)( so much| a lot)?( for (the|your) help)?',
+     "You're welcome! Anything else for your calendar?"),
+    ('farewell', r'(bye|goodbye|see you|see ya|good night|later|that\'s all|that is all)( for now)?',
+     "Goodbye! Your calendar is in good hands."),
+    ('help', r'(help|help me|i need help|what can you do|what do you do|how does this work|how do i use this|what are your (features|capabilities)|capabilities)',
+     "Here's what I can do:\n"
+     "• Check availability – 'Am I free tomorrow afternoon?'\n"
+     "• Find meetings – 'When is my next meeting with John?'\n"
+     "• Book – 'Book a 30 minute call with Sara on Friday at 3pm'\n"
+     "• Repeat – 'Schedule a standup every Monday at 10am for 6 weeks'\n"
+     "• Move or cancel – 'Move my meeting with John to Thursday at 4pm'"),
+    ('identity', r'(who are you|what are you|what is your name|what\'s your name)',
+     "I'm your calendar assistant. I keep track of your schedule and book meetings for you."),
+    ('confirmation', r'(yes|yeah|yep|sure|ok|okay|sounds good|great|perfect|cool|alright|got it)',
+     "{confirmation}"),
+    ('negation', r'(no|nope|nah|never ?mind|cancel that|forget it|not now)( thanks| thank you)?',
+     "No problem. Let me know whenever you need something on your calendar."),
+    ('today', r"(what day is (it|today)|what's the date( today)?|what is (the date|today's date)|what is today)",
+     "Today is {today}."),
+]
+_TEMPLATE_PATTERN = re.compile("|".join(f"(?P<{intent}>{pattern})" for intent, pattern, _ in RESPONSE_TEMPLATES))
+_TEMPLATE_REPLIES = {intent: reply for intent, _, reply in RESPONSE_TEMPLATES}
+
+response_stats = {'casual_turns': 0, 'template_replies': 0, 'llm_calls': 0, 'by_intent': {}}
+_response_stats_lock = threading.Lock()
+
+def _count_response(intent: Optional[str]):
+    with _response_stats_lock:
+        response_stats['casual_turns'] += 1
+        if intent is None:
+            response_stats['llm_calls'] += 1
+        else:
+            response_stats['template_replies'] += 1
+            response_stats['by_intent'][intent] = response_stats['by_intent'].get(intent, 0) + 1
+
+def response_metrics() -> Dict[str, Any]:
+    """How many casual turns were answered locally instead of by the remote model"""
+    with _response_stats_lock:
+        turns = response_stats['casual_turns']
+        return {
+            'casual_turns': turns,
+            'template_replies': response_stats['template_replies'],
+            'llm_calls': response_stats['llm_calls'],
+            'llm_avoided_fraction': round(response_stats['template_replies'] / turns, 3) if turns else None,
+            'by_intent': dict(response_stats['by_intent'])
+        }
+
+def template_reply(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> Optional[tuple]:
+    """(intent, reply) when the turn is a known small-talk intent, else None"""
+    normalized = re.sub(r'[^\w\s\']', ' ', text.lower())
+    normalized = re.sub(r'\s+', ' ', normalized).strip()
+    match = _TEMPLATE_PATTERN.fullmatch(normalized)
+    if not match:
+        return None
+    intent = match.lastgroup
+    reply = _TEMPLATE_REPLIES[intent]
+    if '{' not in reply:
+        return intent, reply
+    now = datetime.now(zone(user_timezone))
+    greeting = re.match(r'good (morning|afternoon|evening)', normalized)
+    slots = {
+        # Echo the user's own "good evening"; otherwise greet by the local time of day
+        'greeting': greeting.group(0).capitalize() if greeting else
+                    "Good morning" if now.hour < 12 else "Good afternoon" if now.hour < 17 else "Good evening",
+        'today': now.strftime("%A, %B %d"),
+        'confirmation': (f"Great! Which of those times works for you on {conversation_context['last_availability_date']}? "
+                         f"Just reply with the time, e.g. 'book {format_slots(conversation_context['available_slots'][:1])}'."
+                         if conversation_context['available_slots'] and conversation_context['last_availability_date']
+                         else "Great! What would you like to do next?")
+    }
+    return intent, reply.format(**slots)
+
+def generate_natural_response(text: str, response_type: str = "casual", user_timezone: str = DEFAULT_TIMEZONE) -> str:
+    if response_type == "casual":
+        # Known intents are answered locally; only open-ended input escalates to the model
+        templated = template_reply(text, user_timezone)
+        _count_response(templated[0] if templated else None)
+        if templated:
+            return templated[1]
     try:
         if response_type == "casual":
             prompt = f"You are a helpful calendar assistant. Respond naturally and conversationally to: '{text}'. Keep it brief and friendly."
@@ -242,12 +596,9 @@ def generate_natural_response(text: str, response_type: str = "casual") -> str:
             prompt = f"You are checking calendar availability. The user asked: '{text}'. Generate a brief, natural response asking for clarification if needed."
         elif response_type == "booking":
             prompt = f"You are helping schedule a meeting. The user said: '{text}'. Generate a brief, natural response."
-        response = client.text_generation(
-            prompt,
-            max_new_tokens=50,
-            temperature=0.7,
-            return_full_text=False
-        )
+        deadline.check("generation")
+        # Wait no longer than the turn's budget; the canned reply below stands in otherwise
+        response = llm_batcher.submit(prompt, timeout=deadline.timeout(LLM_SUBMIT_TIMEOUT_SECONDS))
         return response.strip() if response else "I'm here to help with your calendar!"
     except Exception:
         if response_type == "casual":
@@ -298,38 +649,74 @@ def extract_availability_request(text: str) -> Dict[str, Any]:
         'time_end': time_end
     }
 
-def suggest_alternative_times(date: str, conflicts: List[Dict]) -> List[str]:
-    """Return list of available time slots"""
+def suggest_alternative_times(date: str, conflicts: List[Dict], user_timezone: str = DEFAULT_TIMEZONE) -> List[str]:
+    """Free hourly slots (HH:MM, user's time) between 9:00 and 18:00 on date around the conflicts' epoch intervals"""
     try:
-        base_date = datetime.strptime(date, "%Y-%m-%d")
-        available_slots = []
-        for hour in range(9, 18):
-            slot_start = base_date.replace(hour=hour, minute=0)
-            slot_end = slot_start + timedelta(hours=1)
-            is_free = True
-            for conflict in conflicts:
-                conflict_start = datetime.fromisoformat(conflict['start'].replace('Z', '+00:00'))
-                conflict_end = datetime.fromisoformat(conflict['end'].replace('Z', '+00:00'))
-                if (slot_start < conflict_end and slot_end > conflict_start):
-                    is_free = False
-                    break
-            if is_free:
-                available_slots.append(slot_start.strftime("%H:%M"))
-        return available_slots
+        timed = [conflict for conflict in conflicts if conflict.get('start_ts') is not None]
+        conflict_starts = [conflict['start_ts'] for conflict in timed]
+        conflict_ends = [conflict['end_ts'] for conflict in timed]
+        slot_starts = day_epoch(date, user_timezone) + 3600 * np.arange(9, 18, dtype=np.int64)
+        free = free_mask(conflict_starts, conflict_ends, slot_starts, 3600)
+        return clock_labels(slot_starts[free], user_timezone)
     except Exception:
         return []
 
-def check_availability_smart(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
-    global conversation_context
-    
-    availability_info = extract_availability_request(text)
-    date_str = availability_info['date']
-    if not date_str:
-        date_str = 'today'
-    parsed_date = parse_relative_date(date_str)
-    if not parsed_date:
-        return "The date could not be understood. Please specify more clearly."
+def extract_availability_dates(text: str, reference_date=None) -> List[str]:
+    """Every date or week range mentioned in an availability question, as sorted YYYY-MM-DD strings"""
+    if reference_date is None:
+        reference_date = datetime.now()
+    text_lower = text.lower()
+    weekday_names = 'monday|tuesday|wednesday|thursday|friday|saturday|sunday'
+    month_names = 'january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec'
+    dates = set()
+
+    weekday_pattern = rf'\b(?:(this|next|coming)\s+(week\s+)?)?({weekday_names})\b(?:\s+(next|this|coming)\s+week\b)?'
+    for match in re.finditer(weekday_pattern, text_lower):
+        prefix, week, day, suffix = match.groups()
+        if week or suffix in ('next', 'coming'):
+            phrase = f"next week {day}"
+        elif prefix:
+            phrase = f"{prefix} {day}"
+        else:
+            phrase = day
+        parsed = parse_relative_date(phrase, reference_date)
+        if parsed:
+            dates.add(parsed)
+    # Blank out weekday phrases so "monday next week" is not also read as a week range
+    remaining = re.sub(weekday_pattern, ' ', text_lower)
+
+    for match in re.finditer(r'\b(day after tomorrow|today|tomorrow)\b', remaining):
+        parsed = parse_relative_date(match.group(1), reference_date)
+        if parsed:
+            dates.add(parsed)
+
+    month_day_patterns = [
+        rf'\b(?:{month_names})\s+\d{{1,2}}(?:st|nd|rd|th)?\b',
+        rf'\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:{month_names})\b'
+    ]
+    for pattern in month_day_patterns:
+        for match in re.finditer(pattern, remaining):
+            parsed = parse_relative_date(match.group(0), reference_date)
+            if parsed:
+                dates.add(parsed)
+
+    week_match = re.search(r'\b(this|next|coming)\s+week\b', remaining)
+    if week_match:
+        today = reference_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        if week_match.group(1) == 'this':
+            first_day = today
+        else:
+            first_day = today + timedelta(days=7 - today.weekday())
+        last_day = first_day + timedelta(days=6 - first_day.weekday())
+        day = first_day
+        while day <= last_day:
+            dates.add(day.strftime("%Y-%m-%d"))
+            day += timedelta(days=1)
+
+    return sorted(dates)[:MAX_AVAILABILITY_DAYS]
 
+def resolve_time_window(availability_info: Dict[str, Any]):
+    """Return (start_time, end_time, time_desc) for an availability request, defaulting to business hours"""
     start_time = availability_info['time_start']
     end_time = availability_info['time_end']
     if not start_time and not end_time:
@@ -347,6 +734,87 @@ def check_availability_smart(text: str, user_timezone: str = DEFAULT_TIMEZONE) -
             time_desc = f"from {start_time} onwards"
     else:
         time_desc = f"from {start_time} to {end_time}"
+    return start_time, end_time, time_desc
+
+def format_slots(available_slots: List[str]) -> str:
+    return ", ".join([datetime.strptime(slot, "%H:%M").strftime("%I:%M %p").lstrip('0') for slot in available_slots[:5]])
+
+def check_availability_for_dates(dates: List[str], start_time: str, end_time: str, time_desc: str,
+                                 user_timezone: str = DEFAULT_TIMEZONE, slot_minutes: int = 60) -> str:
+    """Check several days concurrently and combine the answers into one per-day summary"""
+    global conversation_context
+
+    def check_day(date):
+        start_dt = datetime.strptime(f"{date} {start_time}", "%Y-%m-%d %H:%M")
+        end_dt = datetime.strptime(f"{date} {end_time}", "%Y-%m-%d %H:%M")
+        result = check_availability(start_dt.isoformat(), end_dt.isoformat(), user_timezone=user_timezone)
+        return date, start_dt, result
+
+    # Days still unanswered when the request budget runs out are reported as such, the rest as usual
+    futures = [availability_pool.submit(deadline.propagate(check_day), date) for date in dates]
+    done, _ = wait(futures, timeout=deadline.remaining())
+    results = []
+    for date, future in zip(dates, futures):
+        if future in done and future.exception() is None:
+            results.append(future.result())
+        else:
+            error = str(future.exception()) if future in done else "ran out of time"
+            results.append((date, datetime.strptime(f"{date} {start_time}", "%Y-%m-%d %H:%M"), {"error": error}))
+
+    # Open slots for every busy day come from one batched check over the whole set
+    busy_dates = [date for date, _, result in results if "error" not in result and not result.get("available")]
+    try:
+        slots_by_date = find_free_slots(busy_dates, "09:00", "18:00", slot_minutes, user_timezone) if busy_dates and deadline.has_time(1) else {}
+    except Exception:
+        slots_by_date = {}
+
+    lines = []
+    free_dates = []
+    for date, start_dt, result in results:
+        display_date = start_dt.strftime("%A, %B %d")
+        if isinstance(result, dict) and "error" in result:
+            lines.append(f"• {display_date}: couldn't check ({result['error']})")
+        elif result.get("available"):
+            free_dates.append(date)
+            lines.append(f"• {display_date}: free {time_desc}")
+        else:
+            available_slots = slots_by_date.get(date) or suggest_alternative_times(date, result.get("conflicts", []), user_timezone)
+            if available_slots:
+                lines.append(f"• {display_date}: busy {time_desc}. Available slots: {format_slots(available_slots)}")
+            else:
+                lines.append(f"• {display_date}: busy {time_desc}. No available slots found.")
+
+    # A follow-up booking most likely targets the first day that is open
+    conversation_context['last_availability_date'] = free_dates[0] if free_dates else dates[0]
+
+    checked = sum(1 for _, _, result in results if "error" not in result)
+    if free_dates:
+        header = f"You're free on {len(free_dates)} of {len(dates)} days {time_desc}:"
+    elif not checked:
+        header = f"I couldn't check any of those {len(dates)} days {time_desc}:"
+    elif checked < len(dates):
+        header = f"You're not free on any of the {checked} days I could check {time_desc}:"
+    else:
+        header = f"You're not free on any of those {len(dates)} days {time_desc}:"
+    return header + "\n" + "\n".join(lines)
+
+def check_availability_smart(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
+    global conversation_context
+    
+    availability_info = extract_availability_request(text)
+    start_time, end_time, time_desc = resolve_time_window(availability_info)
+
+    requested_dates = extract_availability_dates(text)
+    if len(requested_dates) > 1:
+        slot_minutes = parse_duration(text) or 60
+        return check_availability_for_dates(requested_dates, start_time, end_time, time_desc, user_timezone, slot_minutes)
+
+    date_str = availability_info['date']
+    if not date_str:
+        date_str = 'today'
+    parsed_date = parse_relative_date(date_str)
+    if not parsed_date:
+        return "The date could not be understood. Please specify more clearly."
 
     try:
         start_dt = datetime.strptime(f"{parsed_date} {start_time}", "%Y-%m-%d %H:%M")
@@ -368,29 +836,310 @@ def check_availability_smart(text: str, user_timezone: str = DEFAULT_TIMEZONE) -
             return f"You're free on {display_date} {time_desc}."
         else:
             conflicts = result.get("conflicts", [])
-            available_slots = suggest_alternative_times(parsed_date, conflicts)
+            available_slots = suggest_alternative_times(parsed_date, conflicts, user_timezone)
             conversation_context['available_slots'] = available_slots
             
             if available_slots:
-                slots_text = ", ".join([datetime.strptime(slot, "%H:%M").strftime("%I:%M %p").lstrip('0') for slot in available_slots[:5]])
+                slots_text = format_slots(available_slots)
                 return f"Not available on {display_date} {time_desc}. Available slots: {slots_text}"
             else:
                 return f"Not available on {display_date} {time_desc}. No available slots found."
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         return f"Error checking availability: {str(e)}"
 
-def extract_comprehensive_booking_info(text: str) -> Dict[str, Any]:
-    """Extract all possible booking information from text"""
+def extract_event_search(text: str) -> Dict[str, Any]:
+    """Pull the person, topic and date range out of an event search question"""
+    text_lower = text.lower().strip().rstrip('?.!')
+    boundary = r'(?=\s+(?:next|this|coming|today|tomorrow|on|in|at|during|for)\b|$)'
+
+    person = None
+    person_match = re.search(rf'\bwith ([a-z][\w.\'-]*(?: [a-z][\w.\'-]*)*?){boundary}', text_lower)
+    if person_match:
+        person = person_match.group(1).strip()
+
+    topic = None
+    topic_words = r'([\w-]+(?: [\w-]+)*?)'
+    topic_boundary = r'(?=\s+(?:with|next|this|coming|today|tomorrow|on|in|at|during|for)\b|$)'
+    topic_patterns = [
+        rf"\b(?:when is|when's|what time is) my next {topic_words}{topic_boundary}",
+        rf'\b(?:list|show|find)(?: me)?(?: all)?(?: my)?(?: the)? {topic_words}{topic_boundary}',
+        rf'\bany {topic_words}{topic_boundary}'
+    ]
+    for pattern in topic_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            topic = match.group(1)
+            break
+
+    dates = extract_availability_dates(text)
+    wants_next = bool(re.search(r'\b(my next|next (meeting|call|event))\b', text_lower))
+    return {'person': person, 'topic': topic, 'dates': dates, 'next_only': wants_next}
+
+def format_event_time(event: Event, user_timezone: str = DEFAULT_TIMEZONE) -> str:
+    if event.all_day:
+        return event.local_start().strftime("%A, %B %d (all day)")
+    return event.local_start(zone(user_timezone)).strftime("%A, %B %d at %I:%M %p")
+
+def search_events_smart(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
+    query = extract_event_search(text)
+    terms = [part for part in (query['person'], query['topic']) if part]
+    if not terms:
+        return "Who or what should I look for? Try 'When is my next meeting with John?' or 'List all standups next week'."
+
+    user_tz = zone(user_timezone)
+    if query['dates']:
+        start_dt = datetime.strptime(query['dates'][0], "%Y-%m-%d").replace(tzinfo=user_tz)
+        end_dt = datetime.strptime(query['dates'][-1], "%Y-%m-%d").replace(tzinfo=user_tz) + timedelta(days=1)
+        range_desc = f"between {start_dt.strftime('%B %d')} and {(end_dt - timedelta(days=1)).strftime('%B %d')}"
+    else:
+        start_dt = datetime.now(user_tz)
+        end_dt = None
+        range_desc = "coming up"
+
+    if query['person'] and query['topic'] in (None, 'meeting', 'meetings', 'call', 'calls'):
+        description = f"meeting with {query['person'].title()}"
+    elif query['person']:
+        description = f"{query['topic']} with {query['person'].title()}"
+    else:
+        description = query['topic']
+
+    events = search_events(terms, start_dt, end_dt, limit=1 if query['next_only'] else 10)
+    if not events:
+        return f"I couldn't find any {description} {range_desc}."
+
+    if query['next_only']:
+        event = events[0]
+        return f"Your next {description} is '{event.summary}' on {format_event_time(event, user_timezone)}."
+
+    lines = [f"• {format_event_time(event, user_timezone)} – {event.summary}" for event in events]
+    return f"Found {len(events)} {description} {range_desc}:\n" + "\n".join(lines)
+
+CANCEL_VERBS = r'(?:cancel|delete|remove|call off)'
+RESCHEDULE_VERBS = r'(?:reschedule|move|push(?: back)?|postpone|shift|bring forward)'
+EDIT_TARGET_WORDS = r'\b(my|our|meeting|call|event|appointment|standup|sync|1:1|one-on-one)\b'
+# The edit verb has to lead the request (or one of its clauses), optionally after a polite opener
+EDIT_LEAD = r"(?:^|[,.;!?]\s*)(?:(?:please|ok|okay|so|hey)[, ]+)?(?:(?:can|could|would) you |i (?:want|need|would like|'d like) to |let's )?(?:please )?"
+# 'Book a meeting to discuss the office move' is a booking, whatever else it mentions
+BOOKING_VERBS = r'\b(?:book|schedule|set up|arrange|create)\b'
+TIME_PATTERN = r'\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\b\d{1,2}:\d{2}\b|\b(?:noon|morning|afternoon|evening)\b'
+
+def _is_edit_request(text: str, verbs: str) -> bool:
+    text_lower = text.lower().strip()
+    return bool(
+        re.search(rf'{EDIT_LEAD}{verbs}\b', text_lower)
+        and re.search(EDIT_TARGET_WORDS, text_lower)
+        and not re.search(BOOKING_VERBS, text_lower)
+    )
+
+def is_cancel_request(text: str) -> bool:
+    """'Cancel my standup tomorrow', 'can you call off the meeting with John'"""
+    return _is_edit_request(text, CANCEL_VERBS)
+
+def is_reschedule_request(text: str) -> bool:
+    """'Move my meeting with John to Friday 3pm', 'please push the standup by 30 minutes'"""
+    return _is_edit_request(text, RESCHEDULE_VERBS)
+
+def extract_event_edit(text: str) -> Dict[str, Any]:
+    """
+    Split a move/cancel request into the event it targets (person, topic, dates, time)
+    and, for moves, where it should go ('to Friday 3pm') or how far ('by 30 minutes')
+    """
+    text_lower = text.lower().strip().rstrip('?.!')
+    text_lower = re.sub(r"\b(today|tomorrow)'s\b", r'\1', text_lower)
+    target, separator, destination = text_lower, None, ''
+    split = re.search(r'\s+(to|until|till|by)\s+', text_lower)
+    if split and re.search(rf'\b{RESCHEDULE_VERBS}\b', text_lower[:split.start()]):
+        target, separator, destination = text_lower[:split.start()], split.group(1), text_lower[split.end():]
+
+    time_match = re.search(TIME_PATTERN, target)
+    target_time = parse_time_input(time_match.group(0)) if time_match else None
+    if time_match:
+        target = re.sub(r'\s+', ' ', target[:time_match.start()] + target[time_match.end():]).strip()
+
+    boundary = r'(?=\s+(?:next|this|coming|today|tomorrow|on|in|at|from|for)\b|$)'
+    person = None
+    person_match = re.search(rf'\bwith ([a-z][\w.\'-]*(?: [a-z][\w.\'-]*)*?){boundary}', target)
+    if person_match:
+        person = person_match.group(1).strip()
+
+    topic = None
+    topic_boundary = r'(?=\s+(?:with|next|this|coming|today|tomorrow|on|in|at|from|for)\b|$)'
+    topic_match = re.search(
+        rf'\b(?:{CANCEL_VERBS}|{RESCHEDULE_VERBS})(?: my| the| our)?(?: next)?(?: (?:today|tomorrow))? (?!(?:my|the|our|with|next|this|coming|on|in|at|from|for)\b)([\w-]+(?: [\w-]+)*?){topic_boundary}',
+        target
+    )
+    # "cancel my tomorrow" has a date where the topic would be
+    if topic_match and not re.fullmatch(r'(?:today|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday)', topic_match.group(1)):
+        topic = topic_match.group(1)
+
+    return {
+        'person': person,
+        'topic': topic,
+        'dates': extract_availability_dates(target),
+        'time': target_time,
+        'next_only': bool(re.search(r'\bnext\b', target)),
+        'separator': separator,
+        'destination': destination
+    }
+
+def resolve_new_start(edit: Dict[str, Any], event: Event, user_timezone: str = DEFAULT_TIMEZONE) -> Optional[datetime]:
+    """New local start of a moved event; missing parts (date or time) are kept from the event"""
+    current = event.local_start(zone(user_timezone)).replace(tzinfo=None)
+    destination = edit['destination']
+    if not destination:
+        return None
+
+    if edit['separator'] == 'by':
+        shift = re.search(r'\b(\d+|an?|half an)\s*(hour|hr|minute|min|day|week)s?\b', destination)
+        if not shift:
+            return None
+        amount = {'a': 1, 'an': 1, 'half an': 0.5}.get(shift.group(1)) or int(shift.group(1))
+        unit = {'hour': 'hours', 'hr': 'hours', 'minute': 'minutes', 'min': 'minutes', 'day': 'days', 'week': 'weeks'}[shift.group(2)]
+        delta = timedelta(**{unit: amount})
+        return current - delta if 'forward' in destination or 'earlier' in destination else current + delta
+
+    new_date = current.date()
+    dates = extract_availability_dates(destination)
+    if dates:
+        # "to next week" keeps the weekday; a single day is taken as given
+        same_weekday = [date for date in dates if datetime.strptime(date, "%Y-%m-%d").weekday() == current.weekday()]
+        new_date = datetime.strptime(same_weekday[0] if len(dates) > 1 and same_weekday else dates[0], "%Y-%m-%d").date()
+    new_time = None
+    time_match = re.search(TIME_PATTERN, destination)
+    if time_match:
+        new_time = parse_time_input(time_match.group(0))
+    if not dates and not new_time:
+        return None
+    hour, minute = map(int, (new_time or current.strftime("%H:%M")).split(':'))
+    return datetime.combine(new_date, datetime.min.time()).replace(hour=hour, minute=minute)
+
+def search_terms_only_stopwords(terms: List[str]) -> bool:
+    return all(word in ('meeting', 'meetings', 'call', 'calls', 'event', 'events') for term in terms for word in term.split())
+
+def find_edit_target(edit: Dict[str, Any], user_timezone: str = DEFAULT_TIMEZONE):
+    """(matching events, description) for the event a move/cancel request points at"""
+    user_tz = zone(user_timezone)
+    terms = [part for part in (edit['person'], edit['topic']) if part]
+    if edit['dates']:
+        start_dt = datetime.strptime(edit['dates'][0], "%Y-%m-%d").replace(tzinfo=user_tz)
+        end_dt = datetime.strptime(edit['dates'][-1], "%Y-%m-%d").replace(tzinfo=user_tz) + timedelta(days=1)
+    else:
+        start_dt = datetime.now(user_tz)
+        end_dt = None
+
+    if edit['person']:
+        description = f"meeting with {edit['person'].title()}"
+    else:
+        description = edit['topic'] or "event"
+
+    if search_terms_only_stopwords(terms):
+        # "Cancel my 3pm tomorrow": nothing to search for, read the day straight from the mirror
+        if not (edit['time'] and edit['dates']):
+            return [], description
+        events = [event for event in get_busy_events(int(start_dt.timestamp()), int(end_dt.timestamp()))
+                  if event.start >= start_dt.timestamp()]
+        events.sort()
+    else:
+        events = search_events(terms, start_dt, end_dt, limit=10)
+    if edit['time']:
+        events = [event for event in events if not event.all_day and
+                  event.local_start(user_tz).strftime("%H:%M") == edit['time']]
+    return events, description
+
+def pick_edit_target(edit: Dict[str, Any], events: List[Event], description: str, action: str,
+                     user_timezone: str = DEFAULT_TIMEZONE):
+    """(event, None) when the request points at one event, else (None, a reply asking which)"""
+    if not events:
+        return None, f"I couldn't find any {description} to {action}."
+    if len(events) == 1 or edit['next_only']:
+        return events[0], None
+    lines = [f"• {format_event_time(event, user_timezone)} – {event.summary}" for event in events[:5]]
+    return None, (f"I found {len(events)} matching events. Which one should I {action}? "
+                  f"Add the date or time:\n" + "\n".join(lines))
+
+def reschedule_meeting_smart(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
+    edit = extract_event_edit(text)
+    events, description = find_edit_target(edit, user_timezone)
+    event, reply = pick_edit_target(edit, events, description, "move", user_timezone)
+    if reply:
+        return reply
+
+    new_start = resolve_new_start(edit, event, user_timezone)
+    if new_start is None:
+        return (f"When should I move '{event.summary}' ({format_event_time(event, user_timezone)}) to? "
+                f"Try 'move it to Friday at 3pm' or 'push it by 30 minutes'.")
+    if new_start < datetime.now(zone(user_timezone)).replace(tzinfo=None):
+        return "❌ Cannot move a meeting into the past. Please choose a future time."
+
+    duration = None
+    duration_match = re.search(r'\bfor (\d+ ?(?:hours?|hrs?|minutes?|mins?)|half an hour|an hour)\b', edit['destination'])
+    if duration_match:
+        duration = 60 if duration_match.group(1) == 'an hour' else parse_duration(duration_match.group(1))
+
+    old_time = format_event_time(event, user_timezone)
+    result = reschedule_event(event.id, new_start.strftime("%Y-%m-%dT%H:%M:%S"), duration, user_timezone)
+    if 'error' in result:
+        error = result['error']
+        return error if error.startswith("❌") else f"❌ Could not move '{event.summary}': {error}"
+    return f"✅ Moved '{event.summary}' from {old_time} to {new_start.strftime('%A, %B %d at %I:%M %p')}."
+
+def cancel_meeting_smart(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
+    edit = extract_event_edit(text)
+    events, description = find_edit_target(edit, user_timezone)
+    event, reply = pick_edit_target(edit, events, description, "cancel", user_timezone)
+    if reply:
+        return reply
+
+    # The match may be fuzzy (a topic word in another event's description), so ask before deleting
+    when = format_event_time(event, user_timezone)
+    conversation_context['pending_cancel'] = {'id': event.id, 'summary': event.summary, 'when': when}
+    return f"Cancel '{event.summary}' on {when}? Reply 'yes' to cancel it or 'no' to keep it."
+
+CONFIRM_PATTERN = re.compile(r"(yes|yeah|yep|y|sure|ok|okay|confirm|do it|go ahead|cancel it|please do)( please)?[.!]*")
+DECLINE_PATTERN = re.compile(r"(no|nope|nah|n|don't|do not|keep it|never ?mind|leave it)( thanks| thank you)?[.!]*")
+
+def answer_pending_cancel(text: str) -> Optional[str]:
+    """
+    Reply to a yes/no about the event a cancel request matched. Anything else drops the
+    question (so a later, unrelated 'yes' cannot delete it) and returns None to route the text.
+    """
+    global conversation_context
+    pending = conversation_context['pending_cancel']
+    if not pending:
+        return None
+    conversation_context['pending_cancel'] = None
+    answer = text.lower().strip()
+    if DECLINE_PATTERN.fullmatch(answer):
+        return f"Okay, I kept '{pending['summary']}' on {pending['when']}."
+    if not CONFIRM_PATTERN.fullmatch(answer):
+        return None
+    result = cancel_event(pending['id'])
+    if 'error' in result:
+        return f"❌ Could not cancel '{pending['summary']}': {result['error']}"
+    return f"🗑️ Cancelled '{pending['summary']}' on {pending['when']}."
+
+def extract_comprehensive_booking_info(text: str, reference_date: Optional[datetime] = None) -> Dict[str, Any]:
+    """Extract all possible booking information from text (dates relative to reference_date, default now)"""
     info = {
         'title': None,
         'date': None,
         'time': None,
         'duration_minutes': None,
-        'location': None
+        'location': None,
+        'recurrence': None
     }
     
     text_lower = text.lower()
     
+    # Recurrence first, so 'every monday' does not end up in the title
+    info['recurrence'] = extract_recurrence(text)
+    if info['recurrence']:
+        for phrase in info['recurrence']['phrases']:
+            text_lower = text_lower.replace(phrase, ' ')
+        text_lower = re.sub(r'\s+', ' ', text_lower).strip()
+    
     # Extract title/subject
     title_patterns = [
         r'meeting with ([^,\n]+)',
@@ -401,7 +1150,8 @@ def extract_comprehensive_booking_info(text: str) -> Dict[str, Any]:
     ]
     for pattern in title_patterns:
         match = re.search(pattern, text_lower)
-        if match:
+        # 'book 09:00' names a time, not a meeting called '09'
+        if match and not match.group(1).strip().isdigit():
             info['title'] = match.group(1).strip().title()
             break
     
@@ -410,12 +1160,13 @@ def extract_comprehensive_booking_info(text: str) -> Dict[str, Any]:
         weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
         for day in weekdays:
             if day in text_lower:
-                info['date'] = parse_relative_date(f"next week {day}")
+                info['date'] = parse_relative_date(f"next week {day}", reference_date)
                 break
     else:
-        date_match = re.search(r'\b(today|tomorrow|next \w+|this \w+|\w+ \d+|coming \w+|\d+(?:st|nd|rd|th)?)', text_lower)
+        # A number that is the hour of a clock time ('09:00', '3 pm') is not a day of the month
+        date_match = re.search(r'\b(today|tomorrow|next \w+|this \w+|\w+ \d+|coming \w+|\d+(?:st|nd|rd|th)?)(?!\d|:\d|\s*(?:am|pm)\b)', text_lower)
         if date_match:
-            info['date'] = parse_relative_date(date_match.group(0))
+            info['date'] = parse_relative_date(date_match.group(0), reference_date)
     
     # Extract time
     time_match = re.search(r'(\d{1,2}(?::\d{2})?\s*(?:am|pm))', text_lower)
@@ -425,6 +1176,10 @@ def extract_comprehensive_booking_info(text: str) -> Dict[str, Any]:
     # Extract duration
     info['duration_minutes'] = parse_duration(text)
     
+    # A series only takes an explicit start date; 'at 10am' must not read as the 10th
+    if info['recurrence']:
+        info['date'] = series_start_date(text_lower, info['recurrence'], reference_date)
+    
     return info
 
 def get_accumulated_booking_info() -> Dict[str, Any]:
@@ -469,7 +1224,13 @@ def book_meeting_smart(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
         duration = parse_duration(text)
         if duration:
             current_info = {'duration_minutes': duration}
-    
+
+    # Asked for a title (e.g. after picking an offered slot), a bare answer like 'Design sync' is the title
+    elif (conversation_context['booking_in_progress'] and text.strip()
+          and not conversation_context['accumulated_booking_info'].get('title')
+          and not any(current_info.values())):
+        current_info = {'title': text.strip().title()}
+
     # Update accumulated information
     update_accumulated_booking_info(current_info)
     
@@ -489,31 +1250,94 @@ def book_meeting_smart(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
     
     if missing_fields:
         conversation_context['booking_in_progress'] = True
+        # Warm the day's events now so the completing turn checks conflicts locally
+        if complete_info.get('date'):
+            prefetch_day(complete_info['date'], user_timezone)
         return f"Need {', '.join(missing_fields)}."
     
-    # All information available, create the meeting
+    # All information available: hand the write to the job queue when workers are running
+    booking = {
+        'title': complete_info['title'],
+        'date': complete_info['date'],
+        'time': complete_info['time'],
+        'duration_minutes': complete_info['duration_minutes'],
+        'recurrence': complete_info.get('recurrence'),
+        'user_timezone': user_timezone
+    }
+    if not job_queue.running():
+        return complete_booking(booking)
+    
+    # The details stay in accumulated_booking_info until settle_booking_job() sees the outcome,
+    # so a booking that fails on a conflict only needs the new time
+    conversation_context['pending_job'] = {'kind': 'book_meeting', 'payload': booking}
+    conversation_context['booking_in_progress'] = False
+    return f"⏳ Booking '{booking['title']}' for {booking['date']} at {booking['time']}. I'll confirm as soon as it's on your calendar."
+
+def complete_booking(booking: Dict[str, Any]) -> str:
+    """Check and create a fully specified booking; returns the reply for the user"""
+    global conversation_context
+    user_timezone = booking.get('user_timezone') or DEFAULT_TIMEZONE
     try:
-        datetime_str = f"{complete_info['date']} {complete_info['time']}"
+        datetime_str = f"{booking['date']} {booking['time']}"
         dt = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M")
         
+        recurrence = booking.get('recurrence')
+        rule = build_recurrence_rule(recurrence, dt.replace(tzinfo=zone(user_timezone))) if recurrence else None
+        
         event = create_event(
             dt.isoformat(),
-            complete_info['duration_minutes'],
-            complete_info['title'],
-            user_timezone=user_timezone
+            booking['duration_minutes'],
+            booking['title'],
+            user_timezone=user_timezone,
+            recurrence_rule=rule,
+            # A retried job finds the event its earlier run created instead of booking it again
+            event_id=write_event_id(booking['job_id']) if booking.get('job_id') else None
         )
         
         if isinstance(event, dict) and "error" in event:
-            return f"❌ {event['error']}"
+            return event['error'] if event['error'].startswith("❌") else f"❌ {event['error']}"
         
         # Clear accumulated info after successful booking
-        conversation_context['accumulated_booking_info'] = {}
-        conversation_context['booking_in_progress'] = False
+        if not job_queue.running():
+            conversation_context['accumulated_booking_info'] = {}
+            conversation_context['booking_in_progress'] = False
+        
+        if recurrence:
+            return (f"✅ Recurring meeting '{booking['title']}' scheduled {recurrence['description']} at "
+                    f"{dt.strftime('%I:%M %p')} starting {dt.strftime('%A, %B %d')} ({booking['duration_minutes']} minutes)!")
         
-        return f"✅ Meeting '{complete_info['title']}' scheduled for {dt.strftime('%A, %B %d at %I:%M %p')} ({complete_info['duration_minutes']} minutes)!"
+        return f"✅ Meeting '{booking['title']}' scheduled for {dt.strftime('%A, %B %d at %I:%M %p')} ({booking['duration_minutes']} minutes)!"
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         return f"❌ Error creating meeting: {str(e)}"
 
+def run_booking_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """job_queue handler for 'book_meeting' jobs"""
+    response = complete_booking(payload)
+    return {"response": response, "status": "error" if response.startswith("❌") else "success"}
+
+job_queue.register('book_meeting', run_booking_job)
+
+def settle_booking_job():
+    """
+    Apply the outcome of the session's queued booking, once it has finished: a booked
+    meeting clears the accumulated details, a failed one resumes the booking with them
+    """
+    global conversation_context
+    job_id = conversation_context['booking_job']
+    if not job_id:
+        return
+    job = job_queue.get_job(job_id)
+    if job is not None and job['status'] not in job_queue.FINISHED:
+        return
+    conversation_context['booking_job'] = None
+    if job is not None and job['status'] == 'failed':
+        conversation_context['booking_in_progress'] = True
+    else:
+        conversation_context['accumulated_booking_info'] = {}
+        conversation_context['booking_in_progress'] = False
+
 def update_context(text: str, topic: str):
     global conversation_context
     conversation_context['last_topic'] = topic
@@ -531,10 +1355,38 @@ def update_context(text: str, topic: str):
     if info['title']:
         conversation_context['last_title_mentioned'] = info['title']
 
+def offered_slot_pick(text: str) -> Optional[str]:
+    """The just-offered slot (HH:MM) a reply like 'book 09:00', '10am' or 'the 2 pm one' picks, if any"""
+    slots = conversation_context['available_slots']
+    if not slots or not conversation_context['last_availability_date']:
+        return None
+    match = re.fullmatch(
+        r"(?:(?:ok|okay|yes|yeah|sure|great)[,!]? )?(?:(?:please )?(?:book|take|let's do|i'll take|go with) )?"
+        r"(?:the )?(\d{1,2}(?::\d{2})?(?: ?(?:am|pm))?)(?: (?:one|slot))?(?: please)?[.!]?",
+        text.lower().strip()
+    )
+    if not match:
+        return None
+    picked = parse_time_input(match.group(1))
+    if picked in slots:
+        return picked
+    # A bare hour ('book 2') means whichever offered slot starts in that hour
+    if picked is None and match.group(1).isdigit():
+        hour = int(match.group(1))
+        return next((slot for slot in slots if int(slot[:2]) in (hour, hour + 12) and slot.endswith(':00')), None)
+    return None
+
 def process_contextual_input(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
     global conversation_context
     text_lower = text.lower().strip()
     
+    # A pick from the slots just offered books that slot on the day that was checked
+    picked_slot = offered_slot_pick(text)
+    if picked_slot:
+        update_accumulated_booking_info({'date': conversation_context['last_availability_date'], 'time': picked_slot})
+        conversation_context['available_slots'] = []
+        return book_meeting_smart("", user_timezone)
+    
     # Handle continuation phrases
     continuation_patterns = [
         r'^(what about|and|how about)',
@@ -555,15 +1407,40 @@ def process_contextual_input(text: str, user_timezone: str = DEFAULT_TIMEZONE) -
     
     return None
 
+DEADLINE_REPLY = "⏱️ Sorry, that took longer than I'm allowed to wait. Please try again in a moment."
+
 def process_input(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
+    try:
+        settle_booking_job()
+        return route_input(text, user_timezone)
+    except deadline.DeadlineExceeded as e:
+        print(f"⏱️ Turn stopped: {e}")
+        return DEADLINE_REPLY
+
+def route_input(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
     text = text.strip()
     
+    cancel_reply = answer_pending_cancel(text)
+    if cancel_reply:
+        return cancel_reply
+    
+    # Edits name an existing event, so they win over a booking in progress ("reschedule" contains "schedule")
+    if is_reschedule_request(text):
+        update_context(text, 'reschedule')
+        return reschedule_meeting_smart(text, user_timezone)
+    if is_cancel_request(text):
+        update_context(text, 'cancel')
+        return cancel_meeting_smart(text, user_timezone)
+    
     # Check for contextual input first
     contextual_response = process_contextual_input(text, user_timezone)
     if contextual_response:
         return contextual_response
     
-    if is_availability_request(text):
+    if is_event_search_request(text):
+        update_context(text, 'search')
+        return search_events_smart(text, user_timezone)
+    elif is_availability_request(text):
         update_context(text, 'availability')
         return check_availability_smart(text, user_timezone)
     elif is_booking_request(text):
@@ -571,15 +1448,47 @@ def process_input(text: str, user_timezone: str = DEFAULT_TIMEZONE) -> str:
         return book_meeting_smart(text, user_timezone)
     else:
         update_context(text, 'casual')
-        return generate_natural_response(text, "casual")
+        return generate_natural_response(text, "casual", user_timezone)
 
 class AgentState(TypedDict):
     input: str
     steps: List[AIMessage]
+    user_timezone: str
+    # Time budget of the request (backend.deadline.Budget), re-entered explicitly inside the graph
+    budget: Any
+
+# Representative turns for warm_up()
+WARM_UP_SAMPLES = [
+    "am I free tomorrow at 3pm?",
+    "am I free next monday, wednesday and friday afternoon?",
+    "book a 30 minute meeting with John on friday at 10am every week",
+    "when is my next meeting with Sarah about the budget?",
+    "move my standup on thursday to 4pm",
+    "cancel the meeting with John tomorrow",
+]
+
+def warm_up():
+    """
+    Run the text parsers over sample turns so compiled regexes and timezone objects are
+    cached before traffic arrives (under gunicorn --preload, once in the master for all
+    workers). Calendar, LLM and pool-backed paths are left out: nothing may start
+    threads or open connections before the fork.
+    """
+    zone(DEFAULT_TIMEZONE)
+    parsers = [is_cancel_request, is_reschedule_request, is_availability_request, is_event_search_request,
+               is_booking_request, extract_availability_request, extract_availability_dates, extract_event_search,
+               extract_event_edit, extract_comprehensive_booking_info, extract_recurrence, parse_duration]
+    for text in WARM_UP_SAMPLES:
+        for parse in parsers:
+            try:
+                parse(text)
+            except Exception as e:
+                print(f"⚠️ Warm-up of {parse.__name__} failed: {e}")
 
 def agent_logic(state: AgentState) -> AgentState:
     user_input = state["input"]
-    response = process_input(user_input)
+    with deadline.use(state.get("budget")):
+        response = process_input(user_input, state.get("user_timezone") or DEFAULT_TIMEZONE)
     state["steps"].append(AIMessage(content=response))
     return state
 
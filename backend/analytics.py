@@ -0,0 +1,172 @@
+"""
+Calendar utilization analytics over a columnar snapshot of events.
+
+Events in the requested range are loaded with one listing, reduced to
+NumPy arrays of epoch-second start/end times, merged into disjoint busy
+blocks and then aggregated with prefix sums and searchsorted, so a month
+or a quarter is answered in a single vectorized pass.
+"""
+import numpy as np
+from datetime import date, datetime, timedelta, time
+from typing import Dict, Any, List
+
+from backend.calendar_api import busy_arrays, get_events_in_range
+from backend.events import Event
+from backend.slots import merge_intervals
+from backend.timecore import zone
+
+MAX_RANGE_DAYS = 366
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def busy_before(merged_starts: np.ndarray, merged_ends: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Total busy seconds before each point, for many points at once"""
+    if merged_starts.size == 0:
+        return np.zeros(points.size, dtype=np.int64)
+    lengths = merged_ends - merged_starts
+    completed = np.concatenate(([0], np.cumsum(lengths)))
+    k = np.searchsorted(merged_starts, points, side='right')
+    partial = np.zeros(points.size, dtype=np.int64)
+    inside = k > 0
+    idx = k[inside] - 1
+    partial[inside] = np.clip(points[inside] - merged_starts[idx], 0, lengths[idx])
+    return completed[np.maximum(k - 1, 0)] + partial
+
+
+def _local_midnights(first_day: datetime, num_days: int, user_tz) -> np.ndarray:
+    """Epoch seconds of local midnight for num_days + 1 consecutive days (DST-correct)"""
+    return np.array([
+        datetime.combine((first_day + timedelta(days=i)).date(), time.min, tzinfo=user_tz).timestamp()
+        for i in range(num_days + 1)
+    ], dtype=np.int64)
+
+
+def compute_utilization(events: List[Event], start_date: str, end_date: str,
+                        user_timezone: str = "Asia/Kolkata", work_start_hour: int = 9,
+                        work_end_hour: int = 17, top_free_blocks: int = 5) -> Dict[str, Any]:
+    """
+    Utilization per day and ISO week, a weekday x hour busy-minutes heatmap and
+    the longest free blocks inside working hours for [start_date, end_date] (inclusive)
+    """
+    user_tz = zone(user_timezone)
+    first_day = datetime.strptime(start_date, "%Y-%m-%d")
+    num_days = (datetime.strptime(end_date, "%Y-%m-%d") - first_day).days + 1
+
+    midnights = _local_midnights(first_day, num_days, user_tz)
+    day_starts = midnights[:-1]
+    work_starts = day_starts + work_start_hour * 3600
+    work_ends = day_starts + work_end_hour * 3600
+    work_seconds = (work_end_hour - work_start_hour) * 3600
+
+    raw_starts, raw_ends = busy_arrays(events)
+    # Clip to the range so events hanging over the edges only count their inside part
+    raw_starts = np.clip(raw_starts, midnights[0], midnights[-1])
+    raw_ends = np.clip(raw_ends, midnights[0], midnights[-1])
+    keep = raw_ends > raw_starts
+    raw_starts, raw_ends = raw_starts[keep], raw_ends[keep]
+    busy_starts, busy_ends = merge_intervals(raw_starts, raw_ends)
+
+    busy_at_midnight = busy_before(busy_starts, busy_ends, midnights)
+    day_busy = np.diff(busy_at_midnight)
+    working_busy = busy_before(busy_starts, busy_ends, work_ends) - busy_before(busy_starts, busy_ends, work_starts)
+    utilization = working_busy / work_seconds if work_seconds else np.zeros(num_days)
+
+    meeting_day = np.searchsorted(midnights, raw_starts, side='right') - 1
+    meetings_per_day = np.bincount(meeting_day, minlength=num_days)[:num_days]
+
+    # Heatmap: busy seconds in every local hour of every day, folded onto weekday x hour
+    hour_points = (day_starts[:, None] + np.arange(25, dtype=np.int64)[None, :] * 3600)
+    hour_points = np.minimum(hour_points, midnights[1:, None])
+    busy_hours = np.diff(busy_before(busy_starts, busy_ends, hour_points.ravel()).reshape(num_days, 25), axis=1)
+    weekdays = np.array([(first_day + timedelta(days=i)).weekday() for i in range(num_days)])
+    heatmap = np.zeros((7, 24), dtype=np.int64)
+    np.add.at(heatmap, weekdays, busy_hours)
+    weekday_counts = np.bincount(weekdays, minlength=7)
+
+    # Free blocks: treat off-hours as busy, merge, and the gaps left are free working time
+    off_starts = np.concatenate((day_starts, work_ends))
+    off_ends = np.concatenate((work_starts, midnights[1:]))
+    blocked_starts, blocked_ends = merge_intervals(
+        np.concatenate((busy_starts, off_starts)), np.concatenate((busy_ends, off_ends))
+    )
+    free_starts = blocked_ends[:-1]
+    free_ends = blocked_starts[1:]
+    free_lengths = free_ends - free_starts
+    free_day = np.searchsorted(midnights, free_starts, side='right') - 1
+    longest_free_per_day = np.zeros(num_days, dtype=np.int64)
+    if free_lengths.size:
+        np.maximum.at(longest_free_per_day, free_day, free_lengths)
+    top = np.argsort(-free_lengths, kind='stable')[:top_free_blocks]
+
+    # ISO weeks: group days by the ordinal of the Monday they belong to (immune to DST shifts)
+    week_keys = first_day.toordinal() + np.arange(num_days) - weekdays
+    week_starts, week_index = np.unique(week_keys, return_inverse=True)
+    week_busy = np.bincount(week_index, weights=working_busy, minlength=week_starts.size)
+    week_days = np.bincount(week_index, minlength=week_starts.size)
+
+    def local(ts) -> str:
+        return datetime.fromtimestamp(int(ts), user_tz).strftime("%Y-%m-%d %H:%M")
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "timezone": user_timezone,
+        "working_hours": f"{work_start_hour:02d}:00-{work_end_hour:02d}:00",
+        "totals": {
+            "meetings": int(raw_starts.size),
+            "busy_minutes": int(day_busy.sum() // 60),
+            "working_busy_minutes": int(working_busy.sum() // 60),
+            "utilization": round(float(working_busy.sum() / (work_seconds * num_days)), 4) if work_seconds else 0.0
+        },
+        "days": [
+            {
+                "date": (first_day + timedelta(days=i)).strftime("%Y-%m-%d"),
+                "weekday": WEEKDAYS[weekdays[i]],
+                "meetings": int(meetings_per_day[i]),
+                "busy_minutes": int(day_busy[i] // 60),
+                "working_busy_minutes": int(working_busy[i] // 60),
+                "utilization": round(float(utilization[i]), 4),
+                "longest_free_minutes": int(longest_free_per_day[i] // 60)
+            }
+            for i in range(num_days)
+        ],
+        "weeks": [
+            {
+                "week_start": date.fromordinal(int(week_starts[i])).strftime("%Y-%m-%d"),
+                "days_in_range": int(week_days[i]),
+                "working_busy_minutes": int(week_busy[i] // 60),
+                "utilization": round(float(week_busy[i] / (work_seconds * week_days[i])), 4) if work_seconds else 0.0
+            }
+            for i in range(week_starts.size)
+        ],
+        "heatmap": {
+            "weekdays": WEEKDAYS,
+            "hours": list(range(24)),
+            # Average busy minutes per weekday/hour over the days of that weekday in range
+            "busy_minutes": (heatmap / 60 / np.maximum(weekday_counts, 1)[:, None]).round(1).tolist()
+        },
+        "longest_free_blocks": [
+            {"start": local(free_starts[i]), "end": local(free_ends[i]), "minutes": int(free_lengths[i] // 60)}
+            for i in top
+        ]
+    }
+
+
+def utilization_report(start_date: str, end_date: str, user_timezone: str = "Asia/Kolkata",
+                       work_start_hour: int = 9, work_end_hour: int = 17) -> Dict[str, Any]:
+    """Fetch the range once and compute the utilization report for it"""
+    first_day = datetime.strptime(start_date, "%Y-%m-%d")
+    last_day = datetime.strptime(end_date, "%Y-%m-%d")
+    num_days = (last_day - first_day).days + 1
+    if num_days < 1 or num_days > MAX_RANGE_DAYS:
+        raise ValueError(f"Range must cover 1 to {MAX_RANGE_DAYS} days")
+    if not 0 <= work_start_hour < work_end_hour <= 24:
+        raise ValueError("Working hours must satisfy 0 <= start < end <= 24")
+
+    user_tz = zone(user_timezone)
+    if user_tz is None:
+        raise ValueError(f"Unknown timezone '{user_timezone}'")
+    range_start = first_day.replace(tzinfo=user_tz)
+    range_end = (last_day + timedelta(days=1)).replace(tzinfo=user_tz)
+    events = get_events_in_range(range_start, range_end)
+    return compute_utilization(events, start_date, end_date, user_timezone, work_start_hour, work_end_hour)
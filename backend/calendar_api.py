@@ -1,9 +1,23 @@
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from googleapiclient.errors import HttpError
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 from datetime import datetime, timedelta
-from dateutil import tz
+import hashlib
 import re
-from typing import Dict, Any
+import sys
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Iterator
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend import deadline, event_cache, event_index, recurrence, slots, snapshot
+from backend.timecore import CALENDAR_TZ, zone, local_epoch, day_epoch, day_bounds, local_time, format_epoch, calendar_day, calendar_days
+from backend.events import Event, parse_events
 
 
 SERVICE_ACCOUNT_FILE = "/etc/secrets/calendarbot.json"
@@ -11,74 +25,306 @@ SCOPES = ['https://www.googleapis.com/auth/calendar']
 
 CALENDAR_ID = "yourcalendar7@gmail.com"
 
+# Window kept in the local mirror for event search, and how often it is re-synced
+MIRROR_DAYS_BACK = 1
+MIRROR_DAYS_AHEAD = 60
+MIRROR_SYNC_TTL_SECONDS = 300
+
+# How far ahead, and for how many occurrences, a new recurring booking is checked for conflicts
+RECURRING_CHECK_DAYS = 90
+RECURRING_CHECK_LIMIT = 200
+
+# Google accepts at most 50 calls per batch request
+IMPORT_BATCH_SIZE = 50
+
+# Socket timeout of every Calendar API call; request budgets (backend.deadline) are checked before each one
+GOOGLE_API_TIMEOUT_SECONDS = int(os.getenv("GOOGLE_API_TIMEOUT_SECONDS", "10"))
+# Alternatives are only searched for when at least this much of the request budget is left
+ALTERNATIVES_MIN_SECONDS = 2
 
+
+# Immutable setup is done at import, so under gunicorn --preload the master does it once and
+# workers share it copy-on-write; API clients hold sockets and are built per process (get_service)
 credentials = service_account.Credentials.from_service_account_file(
     SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-service = build("calendar", "v3", credentials=credentials)
+# The packaged discovery document, kept as text: building a client mutates the parsed copy it gets
+DISCOVERY_DOCUMENT = discovery_cache.get_static_doc("calendar", "v3")
+_clients = threading.local()
+
+event_cache.subscribe(event_index.update_day)
+_mirror_synced_at = 0.0
+_mirror_sync_lock = threading.Lock()
+_snapshot = None
+# Series seen with moved or cancelled instances; they are listed server-side, never expanded locally
+_exception_series = set()
+
 
-def check_calendar_availability(start_time_str, duration_minutes, user_timezone="Asia/Kolkata"):
+def get_service():
     """
-    Check if the calendar is available during the requested time slot
-    Returns: (is_available: bool, conflicting_events: list)
+    This thread's Calendar client. Built on first use in each process and thread:
+    httplib2 connections are neither thread-safe nor usable across a fork.
     """
-    try:
-        
-        user_tz = tz.gettz(user_timezone)
-        naive_dt = datetime.fromisoformat(start_time_str)
-        user_dt = naive_dt.replace(tzinfo=user_tz)
+    pid = os.getpid()
+    if getattr(_clients, "pid", None) != pid:
+        http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=GOOGLE_API_TIMEOUT_SECONDS))
+        _clients.service = build_from_document(DISCOVERY_DOCUMENT, http=http)
+        _clients.pid = pid
+    return _clients.service
 
-       
-        ist_tz = tz.gettz("Asia/Kolkata")
-        ist_start = user_dt.astimezone(ist_tz)
-        ist_end = ist_start + timedelta(minutes=duration_minutes)
 
-        print(f"🔍 Checking availability from {ist_start.strftime('%Y-%m-%d %H:%M')} to {ist_end.strftime('%Y-%m-%d %H:%M')} IST")
+def _execute(request):
+    """Run an API request unless the current request budget is already spent or cancelled"""
+    deadline.check("calendar API")
+    return request.execute()
 
-       
-        events_result = service.events().list(
+
+def load_snapshot() -> bool:
+    """Map the newest mirror snapshot written by any worker; True if a new one was attached"""
+    global _snapshot
+    latest = snapshot.open_snapshot(current=_snapshot)
+    if latest is None or latest is _snapshot:
+        return False
+    _snapshot = latest
+    event_cache.attach_snapshot(latest)
+    print(f"🗺️ Mapped event snapshot: {len(latest)} events over {latest.days.size} days, {latest.age():.0f}s old")
+    return True
+
+
+load_snapshot()
+
+
+def _fetch_ist_day(day: str) -> List[Event]:
+    """List every event of one IST calendar day (YYYY-MM-DD) straight from the API"""
+    day_start, day_end = (local_time(epoch) for epoch in day_bounds(day))
+
+    events = []
+    page_token = None
+    while True:
+        events_result = _execute(get_service().events().list(
             calendarId=CALENDAR_ID,
-            timeMin=ist_start.isoformat(),
-            timeMax=ist_end.isoformat(),
+            timeMin=day_start.isoformat(),
+            timeMax=day_end.isoformat(),
             singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+            orderBy='startTime',
+            pageToken=page_token
+        ))
+        events.extend(parse_events(events_result.get('items', [])))
+        page_token = events_result.get('nextPageToken')
+        if not page_token:
+            return events
 
-        events = events_result.get('items', [])
+
+def get_busy_events(start: int, end: int) -> List[Event]:
+    """Events of every IST day touched by the epoch window [start, end), served from the local day cache"""
+    events = []
+    seen_ids = set()
+    for day in calendar_days(start, end):
+        for event in event_cache.get_day(day, _fetch_ist_day):
+            if event.id in seen_ids:
+                continue
+            seen_ids.add(event.id)
+            events.append(event)
+    return events
+
+
+def _event_ist_days(event: Event) -> List[str]:
+    """IST days an event occupies (all-day events use their exclusive end date)"""
+    return calendar_days(event.start, event.end)
+
+
+def _list_instances(event_id, range_start, range_end) -> List[Event]:
+    """Server-side instances of one recurring series inside the range"""
+    events = []
+    page_token = None
+    while True:
+        events_result = _execute(get_service().events().instances(
+            calendarId=CALENDAR_ID,
+            eventId=event_id,
+            timeMin=range_start.isoformat(),
+            timeMax=range_end.isoformat(),
+            maxResults=2500,
+            pageToken=page_token
+        ))
+        events.extend(parse_events(events_result.get('items', [])))
+        page_token = events_result.get('nextPageToken')
+        if not page_token:
+            return events
+
+
+def list_events_range(range_start, range_end) -> List[Event]:
+    """
+    Every event overlapping [range_start, range_end) with one paginated listing.
+    Recurring series come back once as masters and are expanded locally, unless
+    they have moved or cancelled instances (showDeleted): those series come from
+    events.instances, since an instance moved out of the range is not listed.
+    """
+    items = []
+    page_token = None
+    while True:
+        events_result = _execute(get_service().events().list(
+            calendarId=CALENDAR_ID,
+            timeMin=range_start.isoformat(),
+            timeMax=range_end.isoformat(),
+            singleEvents=False,
+            showDeleted=True,
+            maxResults=2500,
+            pageToken=page_token
+        ))
+        items.extend(events_result.get('items', []))
+        page_token = events_result.get('nextPageToken')
+        if not page_token:
+            break
+    _exception_series.update(recurrence.exception_series(items))
+    return recurrence.expand_listing(
+        items, range_start, range_end,
+        fallback=lambda master: _list_instances(master['id'], range_start, range_end),
+        known_exceptions=_exception_series
+    )
+
+
+def store_range(range_start, range_end, events):
+    """Store a ranged listing in the mirror, one IST day bucket at a time"""
+    days = {day: [] for day in calendar_days(int(range_start.timestamp()), int(range_end.timestamp()))}
+    for event in events:
+        for day in _event_ist_days(event):
+            if day in days:
+                days[day].append(event)
+    for day, day_events in days.items():
+        event_cache.store_day(day, day_events)
+    return days
+
+
+def sync_mirror(days_back=MIRROR_DAYS_BACK, days_ahead=MIRROR_DAYS_AHEAD):
+    """Load the whole mirror window with one paginated range listing and store it day by day"""
+    global _mirror_synced_at
+    today = datetime.now(CALENDAR_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    range_start = today - timedelta(days=days_back)
+    range_end = today + timedelta(days=days_ahead + 1)
+
+    # Taken before listing so the snapshot never claims to be newer than its data
+    started_at = time.time()
+    days = store_range(range_start, range_end, list_events_range(range_start, range_end))
+    _mirror_synced_at = time.monotonic()
+    print(f"🔄 Mirror synced: {sum(len(e) for e in days.values())} event-days over {len(days)} days")
+    try:
+        snapshot.write(days, started_at)
+        load_snapshot()
+    except Exception as e:
+        print(f"⚠️ Could not write event snapshot: {e}")
+
+
+def get_events_in_range(range_start, range_end) -> List[Event]:
+    """
+    Events overlapping an arbitrary range, fetched with a single listing.
+    Whole IST days inside the range are refreshed in the mirror on the way through.
+    """
+    events = list_events_range(range_start, range_end)
+    first_full_day = range_start.astimezone(CALENDAR_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    if first_full_day < range_start:
+        first_full_day += timedelta(days=1)
+    last_full_day = range_end.astimezone(CALENDAR_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    if first_full_day < last_full_day:
+        store_range(first_full_day, last_full_day, events)
+    return events
+
+
+def _mirror_age() -> float:
+    """Seconds since the newest of this process's own sync and the mapped snapshot"""
+    ages = [float('inf')]
+    if _mirror_synced_at:
+        ages.append(time.monotonic() - _mirror_synced_at)
+    if _snapshot is not None:
+        ages.append(_snapshot.age())
+    return min(ages)
+
+
+def ensure_mirror():
+    """
+    Sync the mirror inline when neither this process nor a usable snapshot holds it;
+    afterwards refresh a stale mirror in the background
+    """
+    if not _mirror_synced_at and event_cache.snapshot_base() is None:
+        with _mirror_sync_lock:
+            load_snapshot()
+            if not _mirror_synced_at and event_cache.snapshot_base() is None:
+                sync_mirror()
+        return
+    if _mirror_age() > MIRROR_SYNC_TTL_SECONDS and _mirror_sync_lock.acquire(blocking=False):
+        def refresh():
+            try:
+                # Another worker may already have synced and written a newer snapshot
+                load_snapshot()
+                if _mirror_age() <= MIRROR_SYNC_TTL_SECONDS:
+                    return
+                sync_mirror()
+            except Exception as e:
+                print(f"⚠️ Mirror refresh failed: {e}")
+            finally:
+                _mirror_sync_lock.release()
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+def search_events(terms, start_dt: Optional[datetime] = None, end_dt: Optional[datetime] = None, limit=20) -> List[Event]:
+    """
+    Find events whose summary, description or attendees contain every term,
+    starting within [start_dt, end_dt). Answered from the local index, merged
+    with the mapped snapshot for days this process has not reloaded itself.
+    """
+    try:
+        ensure_mirror()
+        start_ts = start_dt.timestamp() if start_dt else None
+        end_ts = end_dt.timestamp() if end_dt else None
+        hits = event_index.search(terms, start_ts=start_ts, end_ts=end_ts, limit=limit)
+        base = event_cache.snapshot_base()
+        if base is None:
+            return hits
+        seen_ids = {event.id for event in hits}
+        from_base = []
+        for event in base.search(terms, start_ts, end_ts):
+            if len(from_base) == limit:
+                break
+            if event.id not in seen_ids and not event_cache.shadows(calendar_day(event.start)):
+                from_base.append(event)
+        return sorted(hits + from_base)[:limit]
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"❌ Error searching events: {e}")
+        return []
+
+
+def prefetch_day(date_str, user_timezone="Asia/Kolkata"):
+    """
+    Warm the cache for a user-local day (YYYY-MM-DD) in the background
+    so a booking that completes later runs its checks against local data
+    """
+    try:
+        for day in calendar_days(*day_bounds(date_str, user_timezone)):
+            event_cache.prefetch(day, _fetch_ist_day)
+    except Exception as e:
+        print(f"⚠️ Could not prefetch {date_str}: {e}")
+
+def check_calendar_availability(start_time_str, duration_minutes, user_timezone="Asia/Kolkata", exclude_ids=None):
+    """
+    Check if the calendar is available during the requested time slot,
+    ignoring the events in exclude_ids (e.g. the one being moved)
+    Returns: (is_available: bool, conflicting_events: list)
+    """
+    try:
+        window_start = local_epoch(start_time_str, user_timezone)
+        window_end = window_start + int(duration_minutes) * 60
+
+        print(f"🔍 Checking availability from {format_epoch(window_start)} to {format_epoch(window_end)} IST")
+
+        events = get_busy_events(window_start, window_end)
         
         if not events:
             print("✅ No conflicts found - time slot is available")
             return True, []
         
-       
-        conflicting_events = []
-        for event in events:
-            event_start = event['start'].get('dateTime', event['start'].get('date'))
-            event_end = event['end'].get('dateTime', event['end'].get('date'))
-            
-           
-            if 'T' in event_start:  
-                existing_start = datetime.fromisoformat(event_start.replace('Z', '+00:00'))
-                existing_end = datetime.fromisoformat(event_end.replace('Z', '+00:00'))
-                
-               
-                if existing_start.tzinfo is None:
-                    existing_start = existing_start.replace(tzinfo=ist_tz)
-                else:
-                    existing_start = existing_start.astimezone(ist_tz)
-                    
-                if existing_end.tzinfo is None:
-                    existing_end = existing_end.replace(tzinfo=ist_tz)
-                else:
-                    existing_end = existing_end.astimezone(ist_tz)
-                
-             
-                if (ist_start < existing_end) and (ist_end > existing_start):
-                    conflicting_events.append({
-                        'summary': event.get('summary', 'Untitled Event'),
-                        'start': existing_start.strftime('%Y-%m-%d %H:%M'),
-                        'end': existing_end.strftime('%Y-%m-%d %H:%M'),
-                        'id': event.get('id')
-                    })
+        # Events carry epoch seconds, so the overlap test is integer comparison; conflicts keep
+        # their epochs for callers and IST strings only for the messages built from them
+        conflicting_events = _conflicts_in(events, window_start, window_end, exclude_ids)
         
         if conflicting_events:
             print(f"❌ Found {len(conflicting_events)} conflicting event(s)")
@@ -89,74 +335,406 @@ def check_calendar_availability(start_time_str, duration_minutes, user_timezone=
             print("✅ No conflicts found - time slot is available")
             return True, []
 
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"❌ Error checking availability: {e}")
         return False, [{"error": str(e)}]
 
-def suggest_alternative_times(start_time_str, duration_minutes, user_timezone="Asia/Kolkata", num_suggestions=3):
+def _conflicts_in(events: List[Event], window_start: int, window_end: int, exclude_ids=None) -> List[Dict[str, Any]]:
+    """Timed events overlapping the window, as conflict dicts (epochs for callers, IST strings for messages)"""
+    return [
+        {
+            'summary': event.summary,
+            'start': format_epoch(event.start),
+            'end': format_epoch(event.end),
+            'start_ts': event.start,
+            'end_ts': event.end,
+            'id': event.id
+        }
+        for event in events
+        if not (exclude_ids and event.id in exclude_ids) and not event.all_day and event.overlaps(window_start, window_end)
+    ]
+
+def live_conflicts(window_start: int, window_end: int, exclude_ids=None) -> List[Dict[str, Any]]:
+    """
+    Re-check a window against the API right before writing into it. The mirror (a cached
+    day or a snapshot up to SNAPSHOT_MAX_AGE_SECONDS old) may not have seen a booking made
+    by another worker yet; when the API disagrees, the window's days are dropped from it.
+    """
+    events_result = _execute(get_service().events().list(
+        calendarId=CALENDAR_ID,
+        timeMin=local_time(window_start).isoformat(),
+        timeMax=local_time(window_end).isoformat(),
+        singleEvents=True,
+        maxResults=250
+    ))
+    conflicts = _conflicts_in(parse_events(events_result.get('items', [])), window_start, window_end, exclude_ids)
+    if conflicts:
+        print(f"❌ Found {len(conflicts)} conflict(s) the mirror had not seen yet")
+        for day in calendar_days(window_start, window_end):
+            event_cache.invalidate_day(day)
+    return conflicts
+
+def busy_arrays(events: List[Event]):
+    """(starts, ends) int64 epoch-second arrays of the timed events; all-day events are not busy time"""
+    timed = [event for event in events if not event.all_day]
+    starts = np.fromiter((event.start for event in timed), dtype=np.int64, count=len(timed))
+    ends = np.fromiter((event.end for event in timed), dtype=np.int64, count=len(timed))
+    return starts, ends
+
+
+def busy_columns(start: int, end: int, exclude_ids=None):
+    """Epoch-second (starts, ends) arrays of the timed events in the days touched by the epoch window"""
+    events = get_busy_events(start, end)
+    if exclude_ids:
+        events = [event for event in events if event.id not in exclude_ids]
+    return busy_arrays(events)
+
+
+def check_epoch_slots(candidate_starts, duration_minutes, exclude_ids=None) -> np.ndarray:
+    """Free/busy mask for candidate start times given as epoch seconds"""
+    candidate_starts = np.asarray(candidate_starts, dtype=np.int64)
+    if candidate_starts.size == 0:
+        return np.zeros(0, dtype=bool)
+    duration_seconds = int(duration_minutes) * 60
+    busy_starts, busy_ends = busy_columns(int(candidate_starts.min()), int(candidate_starts.max()) + duration_seconds, exclude_ids)
+    return slots.free_mask(busy_starts, busy_ends, candidate_starts, duration_seconds)
+
+
+def check_slots(candidates, duration_minutes, user_timezone="Asia/Kolkata") -> np.ndarray:
+    """
+    Batch availability check: one boolean per candidate start time (naive datetimes
+    or ISO strings in user_timezone), True when [start, start + duration) is free.
+    Busy intervals are loaded and converted once for the whole batch.
+    """
+    candidate_starts = [local_epoch(candidate, user_timezone) for candidate in candidates]
+    return check_epoch_slots(candidate_starts, duration_minutes)
+
+
+def find_free_slots(dates, start_time="09:00", end_time="18:00", duration_minutes=60, user_timezone="Asia/Kolkata", step_minutes=None) -> Dict[str, List[str]]:
+    """
+    Free slot start times (HH:MM) per date for every step inside [start_time, end_time),
+    checked for all dates in one batch
+    """
+    step_seconds = (step_minutes or duration_minutes) * 60
+    start_hour, start_minute = map(int, start_time.split(':'))
+    end_hour, end_minute = map(int, end_time.split(':'))
+    window_seconds = (end_hour * 60 + end_minute - start_hour * 60 - start_minute) * 60
+    offsets = np.arange(0, window_seconds - duration_minutes * 60 + 1, step_seconds, dtype=np.int64)
+
+    day_starts = np.array([day_epoch(date, user_timezone, start_hour, start_minute) for date in dates], dtype=np.int64)
+    candidate_starts = (day_starts[:, None] + offsets[None, :]).ravel()
+    free = check_epoch_slots(candidate_starts, duration_minutes).reshape(len(dates), offsets.size)
+
+    slot_minutes = start_hour * 60 + start_minute + offsets // 60
+    slot_labels = [f"{minutes // 60:02d}:{minutes % 60:02d}" for minutes in slot_minutes]
+    return {
+        date: [slot_labels[j] for j in np.flatnonzero(free[i])]
+        for i, date in enumerate(dates)
+    }
+
+
+def suggest_alternative_times(start_time_str, duration_minutes, user_timezone="Asia/Kolkata", num_suggestions=3, exclude_ids=None):
     """
     Suggest alternative time slots if the requested time is not available
     """
     try:
-        user_tz = tz.gettz(user_timezone)
-        naive_dt = datetime.fromisoformat(start_time_str)
-        user_dt = naive_dt.replace(tzinfo=user_tz)
+        # The next 8 half-hour steps, checked together in one batch
+        candidate_starts = local_epoch(start_time_str, user_timezone) + 1800 * np.arange(1, 9, dtype=np.int64)
+        free = check_epoch_slots(candidate_starts, duration_minutes, exclude_ids)
         
-        suggestions = []
-        
-        
-        for i in range(1, 9):  
-            alternative_time = user_dt + timedelta(minutes=30 * i)
-            is_available, _ = check_calendar_availability(
-                alternative_time.isoformat(), 
-                duration_minutes, 
-                user_timezone
-            )
-            
-            if is_available:
-                suggestions.append(alternative_time.strftime('%Y-%m-%d %H:%M'))
-                if len(suggestions) >= num_suggestions:
-                    break
-        
-        return suggestions
+        return [format_epoch(int(start), user_timezone) for start in candidate_starts[free][:num_suggestions]]
         
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"❌ Error suggesting alternatives: {e}")
         return []
 
-def create_event(start_time_str, duration_minutes, summary="Meeting with Asma", description="Booked via chatbot", user_timezone="Asia/Kolkata"):
+def _record_created(event_result):
+    """Add a freshly inserted event, or the instances of a new series inside the mirror window, to the cached days"""
+    if event_result.get('recurrence'):
+        today = datetime.now(CALENDAR_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+        created = list(recurrence.expand(
+            event_result, today - timedelta(days=MIRROR_DAYS_BACK), today + timedelta(days=MIRROR_DAYS_AHEAD + 1)
+        ))
+    else:
+        created = parse_events([event_result])
+    for event in created:
+        for day in _event_ist_days(event):
+            event_cache.add_event(day, event)
+
+
+def _forget(event: Event):
+    """Drop an event from the cached days it occupied and from the index"""
+    for day in _event_ist_days(event):
+        event_cache.remove_event(day, event.id)
+    event_index.remove_event(event.id)
+
+
+def get_event(event_id) -> Optional[Event]:
+    """An event by id: from the local mirror when it holds it, else one API read"""
+    event = event_index.get(event_id)
+    if event is not None:
+        return event
+    return Event.from_google(_execute(get_service().events().get(calendarId=CALENDAR_ID, eventId=event_id)))
+
+
+def _occurrences(body) -> List[Event]:
+    """Instances of an event body to check for conflicts (a series over its first RECURRING_CHECK_DAYS)"""
+    event = Event.from_google(body)
+    if event is None or not body.get('recurrence'):
+        return [event] if event is not None else []
+    first = event.local_start()
+    return list(recurrence.expand(body, first, first + timedelta(days=RECURRING_CHECK_DAYS)))[:RECURRING_CHECK_LIMIT]
+
+
+def import_events(bodies: List[Dict[str, Any]], skip_conflicts=False) -> Dict[str, Any]:
+    """
+    Import one batch (up to IMPORT_BATCH_SIZE) of event bodies carrying an iCalUID.
+    UIDs already in the calendar are skipped; every occurrence is checked for conflicts
+    against one ranged listing; the rest go out as a single batched HTTP request.
+    """
+    summary = {"imported": 0, "duplicates": 0, "conflict_count": 0, "conflicts": [], "failed": []}
+    if not bodies:
+        return summary
+
+    occurrences = [_occurrences(body) for body in bodies]
+    every = [event for events in occurrences for event in events]
+    timed = [(i, event) for i, events in enumerate(occurrences) for event in events if not event.all_day]
+    existing = []
+    # The UID lookup spans every occurrence, all-day ones included; only timed ones can conflict
+    if every:
+        existing = get_events_in_range(
+            local_time(min(event.start for event in every)),
+            local_time(max(event.end for event in every) + 1)
+        )
+    # Events without an iCalUID were exported under their id
+    existing_uids = {event.uid for event in existing if event.uid} | {event.id for event in existing}
+
+    owners = np.fromiter((i for i, _ in timed), dtype=np.int64, count=len(timed))
+    starts = np.fromiter((event.start for _, event in timed), dtype=np.int64, count=len(timed))
+    ends = np.fromiter((event.end for _, event in timed), dtype=np.int64, count=len(timed))
+    busy_starts, busy_ends = busy_arrays(existing)
+    conflicting = set(owners[slots.overlap_mask(busy_starts, busy_ends, starts, ends)].tolist())
+
+    to_insert = []
+    for i, body in enumerate(bodies):
+        # An override of a series that is already in the calendar counts as present too
+        if body['iCalUID'] in existing_uids or recurrence.series_uid(body['iCalUID']) in existing_uids:
+            summary["duplicates"] += 1
+            continue
+        if i in conflicting:
+            summary["conflict_count"] += 1
+            summary["conflicts"].append({
+                "uid": body['iCalUID'],
+                "summary": body.get('summary'),
+                "start": body['start'].get('dateTime', body['start'].get('date'))
+            })
+            if skip_conflicts:
+                continue
+        to_insert.append(body)
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            summary["failed"].append({"uid": to_insert[int(request_id)]['iCalUID'], "error": str(exception)})
+            return
+        summary["imported"] += 1
+        _record_created(response)
+
+    if to_insert:
+        service = get_service()
+        batch = service.new_batch_http_request(callback=on_response)
+        for i, body in enumerate(to_insert):
+            batch.add(service.events().import_(calendarId=CALENDAR_ID, body=body), request_id=str(i))
+        _execute(batch)
+    print(f"📥 Imported {summary['imported']}/{len(bodies)} events ({summary['duplicates']} duplicates, {summary['conflict_count']} conflicts)")
+    return summary
+
+
+def iter_events_range(range_start, range_end) -> Iterator[Event]:
+    """
+    Events overlapping [range_start, range_end) in start order, read day by day from the
+    mirror with the next day prefetched meanwhile, so exports can stream without
+    holding the range in memory
+    """
+    start_ts = int(range_start.timestamp())
+    end_ts = int(range_end.timestamp())
+    days = calendar_days(start_ts, end_ts)
+    # Only events running past their day can show up again on a later one
+    carried_over = set()
+    for i, day in enumerate(days):
+        if i + 1 < len(days):
+            event_cache.prefetch(days[i + 1], _fetch_ist_day)
+        day_end = day_bounds(day)[1]
+        for event in sorted(event_cache.get_day(day, _fetch_ist_day)):
+            if event.id in carried_over or not event.overlaps(start_ts, end_ts):
+                continue
+            if event.end > day_end:
+                carried_over.add(event.id)
+            yield event
+
+
+def check_recurring_availability(start_time_str, duration_minutes, rule, user_timezone="Asia/Kolkata"):
+    """
+    Check every occurrence of a new series (RRULE text) over the next RECURRING_CHECK_DAYS
+    against one ranged listing. Returns (occurrence_starts, conflicting_starts) as epoch seconds.
+    """
+    user_dt = datetime.fromisoformat(start_time_str).replace(tzinfo=zone(user_timezone))
+    starts = np.asarray(
+        recurrence.occurrence_starts(rule, user_dt, user_dt + timedelta(days=RECURRING_CHECK_DAYS), RECURRING_CHECK_LIMIT),
+        dtype=np.int64
+    )
+    if starts.size == 0:
+        return starts, starts
+    duration_seconds = int(duration_minutes) * 60
+    range_start = local_time(int(starts[0]))
+    range_end = local_time(int(starts[-1]) + duration_seconds)
+    busy_starts, busy_ends = busy_arrays(get_events_in_range(range_start, range_end))
+    free = slots.free_mask(busy_starts, busy_ends, starts, duration_seconds)
+    return starts, starts[~free]
+
+
+def create_recurring_event(start_time_str, duration_minutes, rule, summary="Meeting with Asma", description="Booked via chatbot", user_timezone="Asia/Kolkata", event_id=None):
+    """
+    Create a recurring series from an RRULE (e.g. 'FREQ=WEEKLY;BYDAY=MO;COUNT=6') if no occurrence conflicts.
+    With event_id (see write_event_id) running the same write again returns the series it created.
+    """
     try:
+        existing = _already_written(event_id)
+        if existing is not None:
+            return existing
+        user_tz = zone(user_timezone)
+        starts, conflicting = check_recurring_availability(start_time_str, duration_minutes, rule, user_timezone)
+        if starts.size == 0:
+            return {"error": "That recurrence has no occurrences."}
+        if conflicting.size:
+            details = [format_epoch(int(start), user_timezone, '%a %Y-%m-%d %H:%M') for start in conflicting[:5]]
+            if conflicting.size > 5:
+                details.append(f"... and {conflicting.size - 5} more")
+            return {"error": f"{conflicting.size} of {starts.size} occurrences conflict with existing events:\n" +
+                             "\n".join(f"   • {detail}" for detail in details)}
+
+        user_dt = datetime.fromisoformat(start_time_str).replace(tzinfo=user_tz)
+        event = {
+            'summary': summary,
+            'description': description,
+            # Recurring series keep the user's zone so occurrences follow their wall clock across DST
+            'start': {
+                'dateTime': user_dt.isoformat(),
+                'timeZone': user_timezone,
+            },
+            'end': {
+                'dateTime': (user_dt + timedelta(minutes=duration_minutes)).isoformat(),
+                'timeZone': user_timezone,
+            },
+            'recurrence': [f"RRULE:{rule}"],
+        }
+
+        event_result = _insert_once(event, event_id)
+        print(f"✅ Recurring event created: {event_result.get('htmlLink')}")
+        _record_created(event_result)
+        event_result['occurrences_checked'] = int(starts.size)
+        return event_result
+
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        print("❌ Error creating recurring event:", e)
+        return {"error": str(e)}
+
+
+def write_event_id(key: str) -> str:
+    """
+    The event id a write identified by key (e.g. a job id) creates its event under.
+    Google ids are base32hex (0-9, a-v), which a hex digest always is.
+    """
+    return "bk" + hashlib.sha1(key.encode()).hexdigest()
+
+
+def _existing_event(event_id) -> Optional[Dict[str, Any]]:
+    """The API's copy of an event, or None when no event was ever created under that id"""
+    try:
+        return _execute(get_service().events().get(calendarId=CALENDAR_ID, eventId=event_id))
+    except HttpError as e:
+        if e.resp.status in (404, 410):
+            return None
+        raise
+
+
+def _insert_once(body, event_id=None):
+    """
+    Insert an event; with event_id it is created under that id, and an event that
+    already has it (an earlier run of the same write) is returned instead of a second copy
+    """
+    if event_id is None:
+        return _execute(get_service().events().insert(calendarId=CALENDAR_ID, body=body))
+    try:
+        return _execute(get_service().events().insert(calendarId=CALENDAR_ID, body=dict(body, id=event_id)))
+    except HttpError as e:
+        if e.resp.status != 409:
+            raise
+        print(f"↩️ Event {event_id} already exists; not inserting it again")
+        return _execute(get_service().events().get(calendarId=CALENDAR_ID, eventId=event_id))
+
+
+def _already_written(event_id) -> Optional[Dict[str, Any]]:
+    """The event a retried write created on an earlier run, if any (so it is not checked against itself)"""
+    if event_id is None:
+        return None
+    existing = _existing_event(event_id)
+    if existing is not None:
+        print(f"↩️ Event {event_id} was already created by an earlier attempt")
+        _record_created(existing)
+    return existing
+
+
+def _conflict_message(conflicts, alternatives) -> str:
+    conflict_details = []
+    for conflict in conflicts:
+        if 'error' in conflict:
+            conflict_details.append(f"Error: {conflict['error']}")
+        else:
+            conflict_details.append(f"'{conflict['summary']}' from {conflict['start']} to {conflict['end']}")
+
+    error_msg = f"❌ Time slot not available! Conflicting with:\n" + "\n".join([f"   • {detail}" for detail in conflict_details])
+
+    if alternatives:
+        error_msg += f"\n\n💡 Alternative time slots available:\n" + "\n".join([f"   • {alt}" for alt in alternatives])
+    elif alternatives is None:
+        error_msg += "\n\n💡 Ran out of time to look for alternatives. Please try a different time."
+    else:
+        error_msg += "\n\n💡 No alternative slots found in the next 4 hours. Please try a different time."
+    return error_msg
+
+
+def create_event(start_time_str, duration_minutes, summary="Meeting with Asma", description="Booked via chatbot", user_timezone="Asia/Kolkata", recurrence_rule=None, event_id=None):
+    """
+    Book a meeting if the slot is free. With event_id (see write_event_id) running the
+    same write again, e.g. a retried job, returns the event it created instead of
+    reporting that event as a conflict or booking it twice.
+    """
+    if recurrence_rule:
+        return create_recurring_event(start_time_str, duration_minutes, recurrence_rule, summary, description, user_timezone, event_id)
+    try:
+        existing = _already_written(event_id)
+        if existing is not None:
+            return existing
         is_available, conflicts = check_calendar_availability(start_time_str, duration_minutes, user_timezone)
+        start = local_epoch(start_time_str, user_timezone)
+        if is_available:
+            conflicts = live_conflicts(start, start + int(duration_minutes) * 60)
+            is_available = not conflicts
         
         if not is_available:
-            conflict_details = []
-            for conflict in conflicts:
-                if 'error' in conflict:
-                    conflict_details.append(f"Error: {conflict['error']}")
-                else:
-                    conflict_details.append(f"'{conflict['summary']}' from {conflict['start']} to {conflict['end']}")
-            
-       
-            alternatives = suggest_alternative_times(start_time_str, duration_minutes, user_timezone)
-            
-            error_msg = f"❌ Time slot not available! Conflicting with:\n" + "\n".join([f"   • {detail}" for detail in conflict_details])
-            
-            if alternatives:
-                error_msg += f"\n\n💡 Alternative time slots available:\n" + "\n".join([f"   • {alt}" for alt in alternatives])
-            else:
-                error_msg += "\n\n💡 No alternative slots found in the next 4 hours. Please try a different time."
-            
-            return {"error": error_msg}
-
+            # Out of budget: still report the conflict, just without alternatives
+            alternatives = suggest_alternative_times(start_time_str, duration_minutes, user_timezone) if deadline.has_time(ALTERNATIVES_MIN_SECONDS) else None
+            return {"error": _conflict_message(conflicts, alternatives)}
 
-        user_tz = tz.gettz(user_timezone)
-        naive_dt = datetime.fromisoformat(start_time_str)
-        user_dt = naive_dt.replace(tzinfo=user_tz)
 
-  
-        ist_tz = tz.gettz("Asia/Kolkata")
-        ist_dt = user_dt.astimezone(ist_tz)
-        ist_end = ist_dt + timedelta(minutes=duration_minutes)
+        ist_dt = local_time(start)
+        ist_end = local_time(start + int(duration_minutes) * 60)
 
 
         event = {
@@ -172,44 +750,103 @@ def create_event(start_time_str, duration_minutes, summary="Meeting with Asma",
             },
         }
 
-        event_result = service.events().insert(calendarId=CALENDAR_ID, body=event).execute()
+        event_result = _insert_once(event, event_id)
         print(f"✅ Event created: {event_result.get('htmlLink')}")
+        _record_created(event_result)
         return event_result
 
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         print("❌ Error creating event:", e)
         return {"error": str(e)}
 
 
+def reschedule_event(event_id, new_start_str, duration_minutes=None, user_timezone="Asia/Kolkata"):
+    """
+    Move an event to new_start_str (keeping its length unless duration_minutes is given).
+    The conflict check runs against the mirror with the event itself excluded, and
+    only its old and new days are patched in the cache after the single API write.
+    """
+    try:
+        event = get_event(event_id)
+        if event is None:
+            return {"error": "Event not found."}
+        if event.all_day:
+            return {"error": "All-day events can't be moved to a time slot."}
+        if duration_minutes is None:
+            duration_minutes = (event.end - event.start) // 60
+
+        exclude_ids = {event.id}
+        is_available, conflicts = check_calendar_availability(new_start_str, duration_minutes, user_timezone, exclude_ids)
+        start = local_epoch(new_start_str, user_timezone)
+        if is_available:
+            conflicts = live_conflicts(start, start + int(duration_minutes) * 60, exclude_ids)
+            is_available = not conflicts
+        if not is_available:
+            alternatives = (suggest_alternative_times(new_start_str, duration_minutes, user_timezone, exclude_ids=exclude_ids)
+                            if deadline.has_time(ALTERNATIVES_MIN_SECONDS) else None)
+            return {"error": _conflict_message(conflicts, alternatives)}
+
+        ist_start = local_time(start)
+        body = {
+            'start': {'dateTime': ist_start.isoformat(), 'timeZone': 'Asia/Kolkata'},
+            'end': {'dateTime': local_time(start + int(duration_minutes) * 60).isoformat(), 'timeZone': 'Asia/Kolkata'},
+        }
+        event_result = _execute(get_service().events().patch(calendarId=CALENDAR_ID, eventId=event.id, body=body))
+        print(f"✅ Event moved: {event.summary} -> {ist_start.strftime('%Y-%m-%d %H:%M')} IST")
+        _forget(event)
+        _record_created(event_result)
+        return event_result
+
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        print("❌ Error rescheduling event:", e)
+        return {"error": str(e)}
+
+
+def cancel_event(event_id):
+    """Delete an event and drop it from the cached days it occupied"""
+    try:
+        event = get_event(event_id)
+        if event is None:
+            return {"error": "Event not found."}
+        _execute(get_service().events().delete(calendarId=CALENDAR_ID, eventId=event.id))
+        print(f"🗑️ Event cancelled: {event.summary}")
+        _forget(event)
+        return {"status": "cancelled", "id": event.id, "summary": event.summary}
+
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        print("❌ Error cancelling event:", e)
+        return {"error": str(e)}
+
+
 def get_events_for_day(date_str, user_timezone="Asia/Kolkata"):
     """
     Get all events for a specific day
     date_str: YYYY-MM-DD format
     """
     try:
-        user_tz = tz.gettz(user_timezone)
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-        
-        
-        start_of_day = date_obj.replace(hour=0, minute=0, second=0, tzinfo=user_tz)
-        end_of_day = date_obj.replace(hour=23, minute=59, second=59, tzinfo=user_tz)
-        
- 
-        ist_tz = tz.gettz("Asia/Kolkata")
-        ist_start = start_of_day.astimezone(ist_tz)
-        ist_end = end_of_day.astimezone(ist_tz)
+        day_start, day_end = day_bounds(date_str, user_timezone)
+        ist_start = local_time(day_start)
+        ist_end = local_time(day_end - 1)
         
-        events_result = service.events().list(
+        events_result = _execute(get_service().events().list(
             calendarId=CALENDAR_ID,
             timeMin=ist_start.isoformat(),
             timeMax=ist_end.isoformat(),
             singleEvents=True,
             orderBy='startTime'
-        ).execute()
+        ))
         
         events = events_result.get('items', [])
         return events
         
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"❌ Error getting events for day: {e}")
         return []
@@ -243,7 +880,9 @@ def check_availability(start_time_str: str, end_time_str: str, user_timezone: st
             formatted_conflicts.append({
                 "title": conflict.get("summary", "Untitled Event"),
                 "start": conflict.get("start"),
-                "end": conflict.get("end")
+                "end": conflict.get("end"),
+                "start_ts": conflict.get("start_ts"),
+                "end_ts": conflict.get("end_ts")
             })
         
         return {
@@ -251,6 +890,8 @@ def check_availability(start_time_str: str, end_time_str: str, user_timezone: st
             "conflicts": formatted_conflicts if not is_available else []
         }
         
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         return {
             "error": f"Error checking availability: {str(e)}",
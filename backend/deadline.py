@@ -0,0 +1,121 @@
+"""
+Per-request time budgets.
+
+The API edge opens a budget for each request (scope()); it travels with the
+request in a context variable, through run_in_threadpool and the agent graph
+(which also carries it in its state), down to calendar_api and the LLM
+client. Every upstream call checks it first and gets at most the remaining
+time as its timeout, and a client disconnect cancels it, so leftover work
+stops at the next check instead of running on after nobody is waiting.
+
+Work handed to a thread pool must be submitted with propagate() to keep
+the budget.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Cancelled(DeadlineExceeded):
+    """The client went away; nobody is waiting for the rest of the work"""
+
+
+class Budget:
+    __slots__ = ('deadline', 'cancelled')
+
+    def __init__(self, deadline: Optional[float] = None, cancelled: Optional[threading.Event] = None):
+        # time.monotonic() value, or None for no time limit
+        self.deadline = deadline
+        self.cancelled = cancelled or threading.Event()
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+_budget: contextvars.ContextVar = contextvars.ContextVar('request_budget', default=None)
+
+
+def current() -> Optional[Budget]:
+    return _budget.get()
+
+
+@contextmanager
+def scope(seconds: Optional[float] = None):
+    """Open a budget of seconds, nested inside (never longer than) the current one; cancelling either cancels both"""
+    parent = _budget.get()
+    deadline = time.monotonic() + seconds if seconds is not None else None
+    if parent is not None:
+        if parent.deadline is not None:
+            deadline = parent.deadline if deadline is None else min(deadline, parent.deadline)
+        budget = Budget(deadline, parent.cancelled)
+    else:
+        budget = Budget(deadline)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+@contextmanager
+def use(budget: Optional[Budget]):
+    """Re-enter a budget handed over explicitly (e.g. through the agent state)"""
+    if budget is None:
+        yield None
+        return
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+def remaining() -> Optional[float]:
+    budget = _budget.get()
+    return budget.remaining() if budget is not None else None
+
+
+def check(stage: str = "request"):
+    """Raise if the request was cancelled or its time is up"""
+    budget = _budget.get()
+    if budget is None:
+        return
+    if budget.cancelled.is_set():
+        raise Cancelled(f"{stage}: client disconnected")
+    if budget.deadline is not None and time.monotonic() >= budget.deadline:
+        raise DeadlineExceeded(f"{stage}: request deadline exceeded")
+
+
+def timeout(default: float) -> float:
+    """Timeout for an upstream call: default, capped by what is left of the budget"""
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+def has_time(seconds: float) -> bool:
+    """True when at least seconds remain (optional work like alternative slots is skipped otherwise)"""
+    budget = _budget.get()
+    if budget is None:
+        return True
+    if budget.cancelled.is_set():
+        return False
+    left = budget.remaining()
+    return left is None or left >= seconds
+
+
+def propagate(fn: Callable) -> Callable:
+    """Wrap fn to run in the caller's context (budget included) on a pool thread"""
+    context = contextvars.copy_context()
+    # A context can only be entered by one thread at a time, so every call runs in its own copy
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
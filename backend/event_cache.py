@@ -0,0 +1,235 @@
+"""
+In-process mirror of calendar events, bucketed by IST calendar day.
+
+calendar_api fills buckets through get_day(); the booking flow warms days
+ahead of time with prefetch() so the final conflict check and alternative
+search read local data instead of listing the calendar again.
+Listeners registered with subscribe() (e.g. the search index) are told
+about every day that is stored and every event added, so they stay in
+step with the mirror incrementally. Edits made through the bot (move,
+cancel) patch the affected buckets in place with add_event/remove_event
+rather than dropping whole days.
+
+A snapshot attached with attach_snapshot() is the read-only base layer:
+days stored, added to or invalidated in this process after the snapshot
+was taken are served from the in-memory buckets on top of it.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, List, Optional
+
+from backend import deadline, memstats
+from backend.events import Event
+
+DAY_TTL_SECONDS = 120
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "300"))
+
+# day ('YYYY-MM-DD' in IST) -> (fetched_at, events)
+_days: Dict[str, tuple] = {}
+# bumped on every mutation (add, remove, invalidate) so a fetch started before a write cannot store stale data
+_generations: Dict[str, int] = {}
+_pending: Dict[str, Future] = {}
+_listeners: List[Callable[[str, List[Event], bool], None]] = []
+# day -> monotonic time of its last invalidation, so an older snapshot cannot resurrect it
+_invalidated_at: Dict[str, float] = {}
+_base = None
+_base_synced_at = 0.0
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="calendar-prefetch")
+
+
+def _base_entry(day: str) -> Optional[List[Event]]:
+    """The snapshot's copy of a day, unless it is too old or superseded in this process"""
+    if _base is None or time.monotonic() - _base_synced_at >= SNAPSHOT_MAX_AGE_SECONDS:
+        return None
+    if shadows(day):
+        return None
+    return _base.events_on(day)
+
+
+def _fresh_entry(day: str) -> Optional[List[Event]]:
+    entry = _days.get(day)
+    if entry and time.monotonic() - entry[0] < DAY_TTL_SECONDS:
+        return entry[1]
+    return _base_entry(day)
+
+
+def shadows(day: str) -> bool:
+    """True when this process holds newer data for the day than the attached snapshot"""
+    entry = _days.get(day)
+    return (entry is not None and entry[0] >= _base_synced_at) or _invalidated_at.get(day, 0.0) >= _base_synced_at
+
+
+def attach_snapshot(snapshot):
+    """Use a mapped snapshot (see backend.snapshot) as the base layer under the in-memory days"""
+    global _base, _base_synced_at
+    with _lock:
+        _base = snapshot
+        # Express the snapshot's wall-clock sync time on the monotonic clock the buckets use
+        _base_synced_at = time.monotonic() - snapshot.age()
+
+
+def snapshot_base():
+    """The attached snapshot while it is young enough to serve reads, else None"""
+    if _base is None or time.monotonic() - _base_synced_at >= SNAPSHOT_MAX_AGE_SECONDS:
+        return None
+    return _base
+
+
+def subscribe(listener: Callable[[str, List[Event], bool], None]):
+    """
+    Register listener(day, events, replace). replace=True means events is the
+    complete new content of the day; False means they were added to it.
+    """
+    _listeners.append(listener)
+
+
+def _notify(day: str, events: List[Event], replace: bool):
+    for listener in _listeners:
+        try:
+            listener(day, events, replace)
+        except Exception as e:
+            print(f"⚠️ Event cache listener failed for {day}: {e}")
+
+
+def _store(day: str, events: List[Event], generation: int) -> bool:
+    with _lock:
+        if _generations.get(day, 0) != generation:
+            return False
+        _days[day] = (time.monotonic(), events)
+    _notify(day, events, True)
+    return True
+
+
+def _load(day: str, fetch: Callable[[str], List[Event]], generation: int) -> List[Event]:
+    events = fetch(day)
+    _store(day, events, generation)
+    return events
+
+
+def store_day(day: str, events: List[Event]):
+    """Store the full event list of a day fetched elsewhere (e.g. by a range sync)"""
+    with _lock:
+        generation = _generations.get(day, 0)
+    _store(day, events, generation)
+
+
+def _clear_pending(day: str, future: Future):
+    with _lock:
+        if _pending.get(day) is future:
+            del _pending[day]
+
+
+def get_day(day: str, fetch: Callable[[str], List[Event]]) -> List[Event]:
+    """
+    Return the events of an IST day. Concurrent callers missing the same day share one
+    fetch: whoever misses first loads it, the rest join its future (as they would a prefetch).
+    """
+    with _lock:
+        events = _fresh_entry(day)
+        if events is not None:
+            return events
+        future = _pending.get(day)
+        generation = _generations.get(day, 0)
+        owner = future is None or future.done()
+        if owner:
+            future = Future()
+            _pending[day] = future
+
+    if not owner:
+        try:
+            return future.result(timeout=deadline.remaining())
+        except Exception as e:
+            print(f"⚠️ Fetch for {day} failed, fetching inline: {e}")
+            return _load(day, fetch, generation)
+
+    try:
+        events = _load(day, fetch, generation)
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(events)
+        return events
+    finally:
+        _clear_pending(day, future)
+
+
+def prefetch(day: str, fetch: Callable[[str], List[Event]]) -> Optional[Future]:
+    """Start fetching an IST day in the background unless it is already warm or loading"""
+    with _lock:
+        if _fresh_entry(day) is not None:
+            return None
+        future = _pending.get(day)
+        if future is not None and not future.done():
+            return future
+        future = _executor.submit(_load, day, fetch, _generations.get(day, 0))
+        _pending[day] = future
+    future.add_done_callback(lambda f: _clear_pending(day, f))
+    return future
+
+
+def _editable_entry(day: str):
+    """(entry, copied) for an in-place edit; a snapshot-only day is copied up first. Call with _lock held."""
+    entry = _days.get(day)
+    if not shadows(day):
+        # Copy the snapshot's day up so the edit is not hidden behind the base layer
+        copied = _base_entry(day)
+        if copied is not None:
+            return (_base_synced_at, copied), copied
+    return entry, None
+
+
+def add_event(day: str, event: Event):
+    """Record a freshly inserted event in an already cached day"""
+    with _lock:
+        entry, copied = _editable_entry(day)
+        if entry:
+            _days[day] = (entry[0], entry[1] + [event])
+        # A fetch that started before the insert could come back without the event
+        _generations[day] = _generations.get(day, 0) + 1
+    if copied is not None:
+        _notify(day, copied, True)
+    _notify(day, [event], False)
+
+
+def remove_event(day: str, event_id: str):
+    """Drop a moved or deleted event from a cached day, keeping the rest of the bucket"""
+    with _lock:
+        entry, _ = _editable_entry(day)
+        if not entry:
+            return
+        events = [event for event in entry[1] if event.id != event_id]
+        _days[day] = (entry[0], events)
+        # A fetch that started before the edit could still return the event
+        _generations[day] = _generations.get(day, 0) + 1
+    _notify(day, events, True)
+
+
+def invalidate_day(day: str):
+    with _lock:
+        _days.pop(day, None)
+        _generations[day] = _generations.get(day, 0) + 1
+        _invalidated_at[day] = time.monotonic()
+
+
+def size() -> Dict[str, Any]:
+    """What the mirror holds in this process; buckets past their TTL stay in memory until refetched or invalidated"""
+    with _lock:
+        now = time.monotonic()
+        stale = sum(1 for fetched_at, _ in _days.values() if now - fetched_at >= DAY_TTL_SECONDS)
+        report = {
+            "days": len(_days),
+            "stale_days": stale,
+            "events": sum(len(events) for _, events in _days.values()),
+            "pending_fetches": len(_pending),
+            "generations": len(_generations),
+            "invalidated_days": len(_invalidated_at),
+            "snapshot_events": len(_base) if _base is not None else None,
+            "snapshot_fresh": snapshot_base() is not None,
+        }
+        buckets = dict(_days)
+    report["estimated_kb"] = round(memstats.deep_size(buckets) / 1024, 1)
+    return report
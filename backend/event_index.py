@@ -0,0 +1,120 @@
+"""
+Inverted index over the local event mirror for person/topic lookups.
+
+Every event is tokenized once (summary, description, attendee names and
+emails) when event_cache stores its day, so questions like "when is my
+next meeting with John" become a posting-list intersection instead of a
+scan over API results.
+"""
+import re
+import threading
+from typing import Dict, List, Set, Optional, Iterable
+
+from backend.events import Event
+
+# Words that carry no search meaning in calendar questions
+STOPWORDS = {
+    'a', 'an', 'the', 'my', 'me', 'i', 'all', 'any', 'with', 'and', 'or', 'of', 'for', 'to', 'on', 'at',
+    'meeting', 'meetings', 'call', 'calls', 'event', 'events', 'session', 'sessions'
+}
+
+_postings: Dict[str, Set[str]] = {}
+_events: Dict[str, Event] = {}
+_tokens_by_event: Dict[str, Set[str]] = {}
+_events_by_day: Dict[str, Set[str]] = {}
+_lock = threading.Lock()
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _event_tokens(event: Event) -> Set[str]:
+    tokens = set()
+    for part in (event.summary, event.description) + event.attendees:
+        tokens.update(token for token in tokenize(part or '') if token not in STOPWORDS)
+    return tokens
+
+
+def _unindex(event_id: str):
+    for token in _tokens_by_event.pop(event_id, ()):
+        postings = _postings.get(token)
+        if postings is not None:
+            postings.discard(event_id)
+            if not postings:
+                del _postings[token]
+    _events.pop(event_id, None)
+
+
+def _index(event: Event):
+    event_id = event.id
+    if not event_id:
+        return
+    _unindex(event_id)
+    tokens = _event_tokens(event)
+    for token in tokens:
+        _postings.setdefault(token, set()).add(event_id)
+    _tokens_by_event[event_id] = tokens
+    _events[event_id] = event
+
+
+def update_day(day: str, events: List[Event], replace: bool):
+    """event_cache listener: re-index a stored day, or add freshly inserted events to it"""
+    with _lock:
+        previous = _events_by_day.get(day, set())
+        current = {event.id for event in events if event.id}
+        if replace:
+            # Drop events that disappeared from this day unless another day still holds them
+            for event_id in previous - current:
+                if not any(event_id in ids for other, ids in _events_by_day.items() if other != day):
+                    _unindex(event_id)
+            _events_by_day[day] = current
+        else:
+            _events_by_day[day] = previous | current
+        for event in events:
+            _index(event)
+
+
+def get(event_id: str) -> Optional[Event]:
+    return _events.get(event_id)
+
+
+def remove_event(event_id: str):
+    with _lock:
+        _unindex(event_id)
+        for ids in _events_by_day.values():
+            ids.discard(event_id)
+
+
+def _matching_ids(term: str) -> Set[str]:
+    postings = _postings.get(term)
+    # Plural queries ("standups") should still find singular summaries ("Standup")
+    if not postings and term.endswith('s'):
+        postings = _postings.get(term[:-1])
+    return postings or set()
+
+
+def search(terms: Iterable[str], start_ts: Optional[float] = None, end_ts: Optional[float] = None,
+           limit: int = 20) -> List[Event]:
+    """Events containing every term, starting within [start_ts, end_ts), earliest first"""
+    query = [term for term in (token for t in terms for token in tokenize(t)) if term not in STOPWORDS]
+    if not query:
+        return []
+    with _lock:
+        posting_sets = sorted((_matching_ids(term) for term in query), key=len)
+        matches = set(posting_sets[0])
+        for postings in posting_sets[1:]:
+            matches &= postings
+            if not matches:
+                return []
+        hits = [
+            _events[event_id] for event_id in matches
+            if (start_ts is None or _events[event_id].start >= start_ts) and (end_ts is None or _events[event_id].start < end_ts)
+        ]
+        hits.sort()
+        return hits[:limit]
+
+
+def size() -> Dict[str, int]:
+    with _lock:
+        return {"events": len(_events), "terms": len(_postings)}
@@ -0,0 +1,113 @@
+"""
+Compact event representation used by the mirror, the index and the
+availability checks.
+
+Google event dicts are parsed once at ingest into Event objects: integer
+epoch-second start/end, interned id and summary, and only the fields the
+bot reads. Comparing or overlapping two events is then plain integer
+arithmetic instead of string replace + fromisoformat + astimezone.
+"""
+import sys
+from datetime import datetime
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from backend.timecore import CALENDAR_TZ
+
+
+class Event:
+    __slots__ = ('id', 'summary', 'start', 'end', 'all_day', 'description', 'attendees', 'uid')
+
+    def __init__(self, id: str, summary: str, start: int, end: int, all_day: bool = False,
+                 description: str = '', attendees: Tuple[str, ...] = (), uid: str = ''):
+        self.id = sys.intern(id)
+        self.summary = sys.intern(summary)
+        self.start = start
+        self.end = end
+        self.all_day = all_day
+        self.description = description
+        self.attendees = attendees
+        # iCalendar UID, shared by every instance of a recurring series
+        self.uid = uid
+
+    @classmethod
+    def from_google(cls, event: Dict[str, Any]) -> Optional['Event']:
+        """Parse an API event dict; returns None for cancelled or time-less events"""
+        if event.get('status') == 'cancelled':
+            return None
+        start = event.get('start', {})
+        end = event.get('end', {})
+        all_day = 'dateTime' not in start
+        start_epoch = _parse_epoch(start.get('dateTime') or start.get('date'))
+        end_epoch = _parse_epoch(end.get('dateTime') or end.get('date'))
+        if start_epoch is None or end_epoch is None:
+            return None
+        attendees = tuple(
+            sys.intern(part)
+            for attendee in event.get('attendees', [])
+            for part in (attendee.get('displayName'), attendee.get('email'))
+            if part
+        )
+        return cls(
+            event.get('id') or '',
+            event.get('summary', 'Untitled Event'),
+            start_epoch,
+            end_epoch,
+            all_day,
+            event.get('description', ''),
+            attendees,
+            event.get('iCalUID', '')
+        )
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return self.start < end and self.end > start
+
+    def local_start(self, zone=None) -> datetime:
+        return datetime.fromtimestamp(self.start, zone or CALENDAR_TZ)
+
+    def local_end(self, zone=None) -> datetime:
+        return datetime.fromtimestamp(self.end, zone or CALENDAR_TZ)
+
+    def to_dict(self, zone=None) -> Dict[str, Any]:
+        """JSON-friendly view for API responses"""
+        zone = zone or CALENDAR_TZ
+        return {
+            'id': self.id,
+            'summary': self.summary,
+            'start': self.local_start(zone).isoformat(),
+            'end': self.local_end(zone).isoformat(),
+            'all_day': self.all_day
+        }
+
+    def __lt__(self, other: 'Event') -> bool:
+        return (self.start, self.end) < (other.start, other.end)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Event) and self.id == other.id and self.start == other.start and self.end == other.end
+
+    def __hash__(self):
+        return hash((self.id, self.start, self.end))
+
+    def __repr__(self):
+        return f"Event({self.id!r}, {self.summary!r}, {self.start}, {self.end})"
+
+
+def _parse_epoch(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    if 'T' not in value:
+        # All-day events carry a bare date; anchor it at the calendar's local midnight
+        return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=CALENDAR_TZ).timestamp())
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=CALENDAR_TZ)
+    return int(dt.timestamp())
+
+
+def parse_events(items: Iterable[Dict[str, Any]]) -> List[Event]:
+    """Parse a page of API items, dropping cancelled and malformed ones"""
+    events = []
+    for item in items:
+        event = Event.from_google(item)
+        if event is not None:
+            events.append(event)
+    return events
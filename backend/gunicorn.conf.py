@@ -0,0 +1,31 @@
+"""
+Gunicorn settings, read from the working directory (backend/) on start:
+
+    gunicorn main:app -c gunicorn.conf.py
+
+With GUNICORN_PRELOAD=1 (the default) the app is imported once in the master
+before the workers are forked: LangGraph and langchain_core, the compiled
+agent graph, the parsers' regex cache, timezone objects, the service account
+credentials, the Calendar discovery document and the mapped event snapshot
+are then shared copy-on-write instead of being rebuilt in every worker.
+Anything holding sockets or threads (Calendar and inference clients, SQLite
+connections, the LLM batcher, job workers) is created lazily per process.
+Set GUNICORN_PRELOAD=0 for per-worker imports, e.g. to reload code on HUP.
+
+benchmarks/bench_startup.py compares boot time and memory of both modes.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        # Park the preloaded objects in the permanent generation: otherwise every
+        # collection in a worker writes to their headers and un-shares the pages
+        gc.collect()
+        gc.freeze()
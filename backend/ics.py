@@ -0,0 +1,251 @@
+"""
+Streaming iCalendar (RFC 5545) reader and writer.
+
+IcsParser is push-based: feed() it raw bytes as they arrive and it hands
+back every VEVENT completed so far, keeping only the current partial line
+and event in memory. iter_calendar() is the reverse, yielding one chunk per
+event so an export can be streamed straight into the response.
+
+Only what the calendar needs is read: UID, SUMMARY, DESCRIPTION, LOCATION,
+DTSTART/DTEND/DURATION, STATUS, RECURRENCE-ID and the RRULE/RDATE/EXDATE
+lines, which are handed to Google unchanged. TZID values are expected to
+be IANA names; unknown zones fall back to the import's default time zone.
+"""
+import hashlib
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple
+
+from backend.events import Event
+from backend.recurrence import INSTANCE_SUFFIX, instance_id
+from backend.timecore import CALENDAR_TZ, zone
+
+PRODID = "-//Calendar Booking Agent//EN"
+FOLD_OCTETS = 75
+RECURRENCE_PROPERTIES = ('RRULE', 'RDATE', 'EXDATE')
+DURATION_PATTERN = re.compile(r'^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+
+def _split_property(line: str) -> Tuple[str, Dict[str, str], str]:
+    """'DTSTART;TZID=Asia/Kolkata:20261020T100000' -> ('DTSTART', {'TZID': 'Asia/Kolkata'}, '20261020T100000')"""
+    in_quotes = False
+    for i, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ':' and not in_quotes:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        head, value = line, ''
+    name, *raw_params = head.split(';')
+    params = {}
+    for param in raw_params:
+        key, _, param_value = param.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def unescape(value: str) -> str:
+    return re.sub(r'\\([\\;,nN])', lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\r', '\\n').replace('\n', '\\n')
+
+
+class IcsParser:
+    """Incremental VEVENT parser: feed() chunks of bytes, collect completed events"""
+
+    def __init__(self):
+        self._buffer = b''
+        self._line: Optional[bytes] = None
+        self._components: List[str] = []
+        self._event: Optional[Dict[str, Any]] = None
+        self._done: List[Dict[str, Any]] = []
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b'\n')
+        for raw in lines:
+            self._physical_line(raw.rstrip(b'\r'))
+        return self._take()
+
+    def close(self) -> List[Dict[str, Any]]:
+        if self._buffer:
+            self._physical_line(self._buffer.rstrip(b'\r'))
+            self._buffer = b''
+        if self._line is not None:
+            self._logical_line(self._line)
+            self._line = None
+        return self._take()
+
+    def _take(self) -> List[Dict[str, Any]]:
+        done, self._done = self._done, []
+        return done
+
+    def _physical_line(self, raw: bytes):
+        # Folded lines continue with a leading space or tab; unfold before decoding
+        # so a multi-byte character split across the fold survives
+        if raw[:1] in (b' ', b'\t') and self._line is not None:
+            self._line += raw[1:]
+            return
+        if self._line is not None:
+            self._logical_line(self._line)
+        self._line = raw or None
+
+    def _logical_line(self, raw: bytes):
+        name, params, value = _split_property(raw.decode('utf-8', 'replace'))
+        if name == 'BEGIN':
+            self._components.append(value.upper())
+            if value.upper() == 'VEVENT':
+                self._event = {'recurrence': []}
+        elif name == 'END':
+            if self._components and self._components[-1] == value.upper():
+                self._components.pop()
+            if value.upper() == 'VEVENT' and self._event is not None:
+                self._done.append(self._event)
+                self._event = None
+        elif self._event is not None and self._components and self._components[-1] == 'VEVENT':
+            # Properties of nested components (VALARM) are ignored
+            if name in RECURRENCE_PROPERTIES:
+                self._event['recurrence'].append(raw.decode('utf-8', 'replace'))
+            else:
+                self._event.setdefault(name, (params, value))
+
+
+def parse_duration(value: str) -> timedelta:
+    match = DURATION_PATTERN.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid DURATION '{value}'")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == '-' else delta
+
+
+def _parse_time(params: Dict[str, str], value: str, default_timezone: str):
+    """(datetime, all_day, zone name) of a DTSTART/DTEND/RECURRENCE-ID value"""
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d"), True, None
+    if value.endswith('Z'):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc), False, 'UTC'
+    zone_name = params.get('TZID')
+    if not zone_name or zone(zone_name) is None:
+        zone_name = default_timezone
+    return datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=zone(zone_name)), False, zone_name
+
+
+def _google_time(value: datetime, all_day: bool, zone_name: Optional[str]) -> Dict[str, str]:
+    if all_day:
+        return {'date': value.strftime("%Y-%m-%d")}
+    return {'dateTime': value.isoformat(), 'timeZone': zone_name}
+
+
+def event_uid(vevent: Dict[str, Any]) -> str:
+    """The VEVENT's UID, or a stable one derived from its content when it has none"""
+    if 'UID' in vevent:
+        return vevent['UID'][1]
+    key = '|'.join(vevent.get(name, ({}, ''))[1] for name in ('DTSTART', 'DTEND', 'SUMMARY'))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest() + "@calendarbot"
+
+
+def recurrence_id(vevent: Dict[str, Any]) -> Optional[str]:
+    return vevent['RECURRENCE-ID'][1] if 'RECURRENCE-ID' in vevent else None
+
+
+def instance_uid(vevent: Dict[str, Any], default_timezone: str = "Asia/Kolkata") -> str:
+    """UID of an event, or for an override '<series uid>_<original start>' as Google names instances"""
+    uid = event_uid(vevent)
+    if 'RECURRENCE-ID' not in vevent:
+        return uid
+    original, all_day, _ = _parse_time(*vevent['RECURRENCE-ID'], default_timezone)
+    return instance_id(uid, original, all_day)
+
+
+def to_google(vevent: Dict[str, Any], default_timezone: str = "Asia/Kolkata") -> Optional[Dict[str, Any]]:
+    """
+    Google event body (with iCalUID, for events().import_) of a parsed VEVENT;
+    None for cancelled events. Raises ValueError for events without a usable DTSTART.
+    """
+    if vevent.get('STATUS', ({}, ''))[1].upper() == 'CANCELLED':
+        return None
+    if 'DTSTART' not in vevent:
+        raise ValueError("missing DTSTART")
+    start, all_day, zone_name = _parse_time(*vevent['DTSTART'], default_timezone)
+    if 'DTEND' in vevent:
+        end, _, end_zone = _parse_time(*vevent['DTEND'], default_timezone)
+    elif 'DURATION' in vevent:
+        end, end_zone = start + parse_duration(vevent['DURATION'][1]), zone_name
+    else:
+        # RFC 5545: a date DTSTART alone lasts one day, a date-time one has no duration
+        end, end_zone = (start + timedelta(days=1) if all_day else start), zone_name
+    if end < start:
+        raise ValueError("DTEND before DTSTART")
+
+    rid = recurrence_id(vevent)
+    body = {
+        'iCalUID': instance_uid(vevent, default_timezone),
+        'summary': unescape(vevent.get('SUMMARY', ({}, 'Untitled Event'))[1]),
+        'start': _google_time(start, all_day, zone_name),
+        'end': _google_time(end, all_day, end_zone),
+    }
+    for name, key in (('DESCRIPTION', 'description'), ('LOCATION', 'location')):
+        if name in vevent:
+            body[key] = unescape(vevent[name][1])
+    if vevent['recurrence'] and not rid:
+        body['recurrence'] = vevent['recurrence']
+    return body
+
+
+def fold(line: str) -> str:
+    """Fold a content line at 75 octets without splitting a UTF-8 character"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= FOLD_OCTETS:
+        return line
+    parts = []
+    limit = FOLD_OCTETS
+    while len(encoded) > limit:
+        cut = limit
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        # Continuation lines spend one octet on the leading space
+        limit = FOLD_OCTETS - 1
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+
+def _utc_stamp(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def vevent(event: Event, stamp: str, calendar_tz) -> str:
+    """One VEVENT block, CRLF-terminated"""
+    lines = ["BEGIN:VEVENT", f"UID:{event.uid or event.id}", f"DTSTAMP:{stamp}"]
+    instance = INSTANCE_SUFFIX.search(event.id)
+    if instance:
+        # Exported instances of a series carry their original start so they stay distinct
+        original = instance.group(1)
+        lines.append(f"RECURRENCE-ID;VALUE=DATE:{original}" if len(original) == 8 else f"RECURRENCE-ID:{original}")
+    if event.all_day:
+        lines.append(f"DTSTART;VALUE=DATE:{event.local_start(calendar_tz).strftime('%Y%m%d')}")
+        lines.append(f"DTEND;VALUE=DATE:{event.local_end(calendar_tz).strftime('%Y%m%d')}")
+    else:
+        lines.append(f"DTSTART:{_utc_stamp(event.start)}")
+        lines.append(f"DTEND:{_utc_stamp(event.end)}")
+    lines.append(f"SUMMARY:{escape(event.summary)}")
+    if event.description:
+        lines.append(f"DESCRIPTION:{escape(event.description)}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) + "\r\n" for line in lines)
+
+
+def iter_calendar(events: Iterable[Event], name: str = "Calendar") -> Iterator[str]:
+    """Stream a VCALENDAR: header, one chunk per event, footer"""
+    stamp = _utc_stamp(datetime.now(timezone.utc).timestamp())
+    yield (f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{PRODID}\r\nCALSCALE:GREGORIAN\r\n"
+           f"{fold('X-WR-CALNAME:' + escape(name))}\r\n")
+    for event in events:
+        yield vevent(event, stamp, CALENDAR_TZ)
+    yield "END:VCALENDAR\r\n"
@@ -0,0 +1,235 @@
+"""
+Durable queue for calendar writes, shared by every gunicorn worker.
+
+A booking that has all its details is enqueued here instead of running
+inside the chat request: /chat answers straight away with the job id and a
+pool of worker threads in each process claims queued jobs from SQLite,
+runs the registered handler (availability check, alternatives, insert) and
+stores the result for /jobs/{id} and the chat socket to report. A job whose
+worker died is claimed again once its lease runs out.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Any, List, Optional
+
+from backend.session_store import SESSION_DB_PATH
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", SESSION_DB_PATH)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = 120
+JOB_MAX_ATTEMPTS = 3
+JOB_POLL_SECONDS = 0.5
+JOB_RETENTION_SECONDS = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    session_id TEXT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    result TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    leased_until REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at);
+"""
+
+FINISHED = ('done', 'failed')
+# Result of a job given up on after its lease ran out JOB_MAX_ATTEMPTS times; its write may have happened
+LOST_WORKER_RESULT = {
+    "error": "❌ Sorry, I couldn't confirm that booking. Please check your calendar before trying again.",
+    "status": "error"
+}
+
+_local = threading.local()
+_handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+_listeners: List[Callable[[Dict[str, Any]], None]] = []
+_workers: List[threading.Thread] = []
+_wakeup = threading.Event()
+_start_lock = threading.Lock()
+
+
+def get_connection() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    # A connection opened before a fork (gunicorn --preload) must not be used by the child
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(JOB_DB_PATH, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def register(kind: str, handler: Callable[[Dict[str, Any]], Dict[str, Any]]):
+    """
+    handler(payload) -> JSON-serializable result; raising makes the job retry.
+    A job can run more than once (its worker may die after the write, before the
+    result is stored), so payload carries "job_id", the same on every attempt, for
+    handlers to make their writes idempotent with.
+    """
+    _handlers[kind] = handler
+
+
+def subscribe(listener: Callable[[Dict[str, Any]], None]):
+    """listener(job) is called in the worker thread after a job finishes in this process"""
+    _listeners.append(listener)
+
+
+def _job(row) -> Dict[str, Any]:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def enqueue(kind: str, payload: Dict[str, Any], session_id: Optional[str] = None) -> str:
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    get_connection().execute(
+        "INSERT INTO jobs (job_id, session_id, kind, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (job_id, session_id, kind, json.dumps(payload), now, now)
+    )
+    _wakeup.set()
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    row = get_connection().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _job(row) if row is not None else None
+
+
+def _claim() -> Optional[Dict[str, Any]]:
+    """
+    Lease the oldest runnable job (queued, or running with an expired lease). A job whose
+    lease ran out on its last allowed attempt keeps losing its worker; it fails instead.
+    """
+    conn = get_connection()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        abandoned = conn.execute(
+            "SELECT * FROM jobs WHERE status = 'running' AND leased_until < ? AND attempts >= ?",
+            (now, JOB_MAX_ATTEMPTS)
+        ).fetchall()
+        for abandoned_row in abandoned:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', result = ?, leased_until = 0, updated_at = ? WHERE job_id = ?",
+                (json.dumps(LOST_WORKER_RESULT), now, abandoned_row["job_id"])
+            )
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND leased_until < ?) "
+            "ORDER BY created_at LIMIT 1",
+            (now,)
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, leased_until = ?, updated_at = ? WHERE job_id = ?",
+                (now + JOB_LEASE_SECONDS, now, row["job_id"])
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    for abandoned_row in abandoned:
+        job = _job(abandoned_row)
+        print(f"❌ Job {job['job_id']} ({job['kind']}) lost its worker {job['attempts']} times; giving up")
+        job["status"] = 'failed'
+        job["result"] = LOST_WORKER_RESULT
+        _notify(job)
+    if row is None:
+        return None
+    job = _job(row)
+    job["attempts"] += 1
+    return job
+
+
+def _finish(job: Dict[str, Any], status: str, result: Dict[str, Any]):
+    get_connection().execute(
+        "UPDATE jobs SET status = ?, result = ?, leased_until = 0, updated_at = ? WHERE job_id = ?",
+        (status, json.dumps(result), time.time(), job["job_id"])
+    )
+    job["status"] = status
+    job["result"] = result
+    _notify(job)
+
+
+def _notify(job: Dict[str, Any]):
+    for listener in _listeners:
+        try:
+            listener(job)
+        except Exception as e:
+            print(f"⚠️ Job listener failed for {job['job_id']}: {e}")
+
+
+def _run(job: Dict[str, Any]):
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        _finish(job, 'failed', {"error": f"No handler for job kind '{job['kind']}'"})
+        return
+    try:
+        result = handler(dict(job["payload"], job_id=job["job_id"]))
+    except Exception as e:
+        print(f"❌ Job {job['job_id']} ({job['kind']}) failed on attempt {job['attempts']}: {e}")
+        if job["attempts"] >= JOB_MAX_ATTEMPTS:
+            _finish(job, 'failed', {"error": str(e)})
+        else:
+            get_connection().execute(
+                "UPDATE jobs SET status = 'queued', leased_until = 0, updated_at = ? WHERE job_id = ?",
+                (time.time(), job["job_id"])
+            )
+        return
+    _finish(job, 'failed' if isinstance(result, dict) and result.get("status") == "error" else 'done', result)
+
+
+def _work():
+    while True:
+        try:
+            job = _claim()
+        except Exception as e:
+            print(f"⚠️ Could not claim a job: {e}")
+            job = None
+        if job is None:
+            # Woken at once by local enqueues; jobs queued by other workers are found by polling
+            _wakeup.wait(JOB_POLL_SECONDS)
+            _wakeup.clear()
+            continue
+        _run(job)
+
+
+def start_workers(count: int = JOB_WORKERS):
+    """Start this process's worker threads (idempotent)"""
+    with _start_lock:
+        if _workers:
+            return
+        for i in range(count):
+            worker = threading.Thread(target=_work, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+    print(f"🧵 Started {count} job worker(s)")
+
+
+def running() -> bool:
+    return bool(_workers)
+
+
+def purge_finished(older_than_seconds: float = JOB_RETENTION_SECONDS) -> int:
+    return get_connection().execute(
+        "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+        (time.time() - older_than_seconds,)
+    ).rowcount
+
+
+def counts() -> Dict[str, int]:
+    """Jobs in the queue by status"""
+    rows = get_connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+    return {status: count for status, count in rows}
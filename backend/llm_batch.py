@@ -0,0 +1,138 @@
+"""
+Micro-batching for LLM generation calls.
+
+Casual turns from many sessions each want one short completion. submit()
+parks the prompt and blocks; a dispatcher thread waits at most the batch
+window after the first pending prompt (or until max_batch_size prompts are
+waiting), hands the whole batch to the backend's batch function in one go
+and fans the completions back out to the waiting callers.
+
+metrics() reports how full the batches were and how long prompts waited
+in the window, i.e. the latency the batching itself added.
+
+The dispatcher threads start on the first submit() in each process, so a
+batcher created at import survives gunicorn's --preload fork.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+
+import numpy as np
+
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "20"))
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "8"))
+# Batches dispatched concurrently while earlier ones are still generating
+LLM_MAX_INFLIGHT_BATCHES = 4
+LLM_SUBMIT_TIMEOUT_SECONDS = 30
+METRICS_SAMPLE_SIZE = 1000
+
+
+class MicroBatcher:
+    """Collect concurrent submit() calls into batches for dispatch(prompts) -> completions"""
+
+    def __init__(self, dispatch: Callable[[List[str]], List[Optional[str]]],
+                 window_ms: float = LLM_BATCH_WINDOW_MS, max_batch_size: int = LLM_BATCH_MAX_SIZE,
+                 name: str = "llm-batch"):
+        self.dispatch = dispatch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[tuple] = []
+        self.name = name
+        self._cond = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._started_pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._failures = 0
+        self._batch_sizes = deque(maxlen=METRICS_SAMPLE_SIZE)
+        self._waits = deque(maxlen=METRICS_SAMPLE_SIZE)
+        self._dispatch_times = deque(maxlen=METRICS_SAMPLE_SIZE)
+        self._stats_lock = threading.Lock()
+
+    def _ensure_started(self):
+        """Start this process's collector and dispatch pool (threads don't survive a fork)"""
+        if self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=LLM_MAX_INFLIGHT_BATCHES, thread_name_prefix=self.name)
+            threading.Thread(target=self._collect, name=f"{self.name}-collector", daemon=True).start()
+            self._started_pid = os.getpid()
+
+    def submit(self, prompt: str, timeout: float = LLM_SUBMIT_TIMEOUT_SECONDS) -> Optional[str]:
+        """Completion for one prompt; blocks until its batch has been generated"""
+        self._ensure_started()
+        future = Future()
+        with self._cond:
+            self._pending.append((prompt, future, time.monotonic()))
+            self._cond.notify()
+        return future.result(timeout)
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._pending[0][2] + self.window
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: List[tuple]):
+        started = time.monotonic()
+        try:
+            completions = self.dispatch([prompt for prompt, _, _ in batch])
+            if len(completions) != len(batch):
+                raise ValueError(f"backend returned {len(completions)} completions for {len(batch)} prompts")
+        except Exception as e:
+            print(f"⚠️ LLM batch of {len(batch)} failed: {e}")
+            completions = None
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for (_, future, _), completion in zip(batch, completions):
+                future.set_result(completion)
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._failures += completions is None
+            self._batch_sizes.append(len(batch))
+            self._waits.extend(started - enqueued_at for _, _, enqueued_at in batch)
+            self._dispatch_times.append(time.monotonic() - started)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            sizes = np.array(self._batch_sizes, dtype=float)
+            waits_ms = np.array(self._waits, dtype=float) * 1000
+            dispatch_ms = np.array(self._dispatch_times, dtype=float) * 1000
+            counts = (self._batches, self._requests, self._failures)
+
+        def percentiles(values):
+            if values.size == 0:
+                return {"p50": None, "p95": None, "max": None}
+            p50, p95 = np.percentile(values, [50, 95])
+            return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "max": round(float(values.max()), 2)}
+
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": counts[0],
+            "requests": counts[1],
+            "failed_batches": counts[2],
+            "pending": len(self._pending),
+            "mean_batch_size": round(float(sizes.mean()), 2) if sizes.size else None,
+            # Share of batch capacity actually used over the recent batches
+            "batch_fill": round(float(sizes.mean()) / self.max_batch_size, 3) if sizes.size else None,
+            "added_latency_ms": percentiles(waits_ms),
+            "dispatch_ms": percentiles(dispatch_ms)
+        }
@@ -1,19 +1,56 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request, Response, Query, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.requests import HTTPConnection
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import sys
 import os
+import hmac
+import json
 import logging
+import uuid
+import time
+import math
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from agents.agent1 import app as agent_app, conversation_context
+from agents.agent1 import app as agent_app, conversation_context, agent_session, forget_session, llm_batcher, response_metrics, session_memory, warm_up, DEADLINE_REPLY
+from backend import deadline, event_cache, event_index, ics, job_queue, memstats, rate_limit, session_store
+from backend.calendar_api import get_events_for_day, import_events, iter_events_range, IMPORT_BATCH_SIZE
+from backend.analytics import utilization_report
+from backend.timecore import zone
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Calendar Booking Agent API", version="1.0.0")
+# Done at import, so with gunicorn --preload (see gunicorn.conf.py) the master does it once for every worker
+warm_up()
+
+# Payloads under this size are not worth the CPU to compress
+COMPRESSION_MIN_BYTES = 1024
+
+app = FastAPI(
+    title="Calendar Booking Agent API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+# Brotli when brotli-asgi is installed (it still falls back to gzip for clients without br support)
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_BYTES, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,11 +69,91 @@ class ChatResponse(BaseModel):
     response: str
     status: str = "success"
     conversation_context: Dict[str, Any] = {}
+    message_id: Optional[int] = None
+    job_id: Optional[str] = None
 
 class HealthResponse(BaseModel):
     status: str
     message: str
-conversation_sessions: Dict[str, Dict] = {}
+
+def to_json_dict(model: BaseModel) -> Dict[str, Any]:
+    """Plain dict of a response model, for both pydantic 1 and 2"""
+    if hasattr(model, "model_dump"):
+        return model.model_dump()
+    return model.dict()
+
+def fast_json(model: BaseModel) -> ORJSONResponse:
+    """
+    Serialize an already-built response model straight through orjson,
+    skipping FastAPI's re-validation and jsonable_encoder pass on the hot path
+    """
+    return ORJSONResponse(to_json_dict(model))
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+SESSION_PAGE_SIZE = 50
+SESSION_MAX_PAGE_SIZE = 500
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", str(24 * 3600)))
+SESSION_SWEEP_INTERVAL_SECONDS = 300
+# How long a chat socket keeps watching a queued booking before leaving it to /jobs/{id}
+JOB_REPORT_TIMEOUT_SECONDS = 300
+JOB_REPORT_POLL_SECONDS = 0.25
+# Admin endpoints require it in the X-Admin-Token header; without it they are not served at all
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+async def expire_sessions_incrementally(idle_seconds: Optional[float], batch_size: int) -> int:
+    """Expire matching sessions one small batch at a time, yielding to other requests between batches"""
+    removed = 0
+    while True:
+        batch_removed = await run_in_threadpool(session_store.expire_batch, idle_seconds, batch_size)
+        removed += batch_removed
+        if batch_removed < batch_size:
+            return removed
+        await asyncio.sleep(0)
+
+async def sweep_idle_sessions():
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+        try:
+            removed = await expire_sessions_incrementally(SESSION_IDLE_TTL_SECONDS, session_store.EXPIRY_BATCH_SIZE)
+            if removed:
+                logger.info(f"Expired {removed} idle session(s)")
+            purged = await run_in_threadpool(job_queue.purge_finished)
+            if purged:
+                logger.info(f"Purged {purged} finished job(s)")
+            await run_in_threadpool(rate_limit.purge_idle)
+        except Exception as e:
+            logger.error(f"Error expiring idle sessions: {str(e)}")
+
+def record_job_result(job: Dict[str, Any]):
+    """Append the outcome of a finished booking job to its session, like any other assistant turn"""
+    response = (job.get("result") or {}).get("response") or (job.get("result") or {}).get("error")
+    if job.get("session_id") and response:
+        session_store.append_message(job["session_id"], "assistant", response)
+
+# Held so the loop keeps a strong reference to the sweeper and shutdown can stop it
+_sweeper_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    global _sweeper_task
+    _sweeper_task = asyncio.create_task(sweep_idle_sessions())
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    global _sweeper_task
+    if _sweeper_task is not None:
+        _sweeper_task.cancel()
+        try:
+            await _sweeper_task
+        except asyncio.CancelledError:
+            pass
+        _sweeper_task = None
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.subscribe(record_job_result)
+    job_queue.start_workers()
 
 @app.get("/", response_model=HealthResponse)
 async def root():
@@ -48,99 +165,764 @@ async def health_check():
     """Health check endpoint"""
     return HealthResponse(status="healthy", message="API is operational")
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_with_agent(chat_message: ChatMessage):
+# Each session's conversation_context lives in the agent (see agent_session), so turns of
+# different sessions run concurrently while turns of one session stay in order.
+CHAT_BATCH_MAX_ITEMS = 200
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+
+EMPTY_MESSAGE_REPLY = "I'm here to help! Please tell me what you'd like to do with your calendar."
+ERROR_REPLY = "I apologize, but I encountered an error while processing your request. Please try again or rephrase your message."
+
+# Whole-turn budget: calendar calls, alternative search and the LLM reply all draw from it
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))
+DISCONNECT_POLL_SECONDS = 0.5
+# The agent notices an exhausted budget itself and answers with what it has; the edge waits this much longer for that reply
+DEADLINE_GRACE_SECONDS = 1.0
+
+# Admission control (see backend/rate_limit.py): turns waiting for a global slot in this worker, and for how long
+CHAT_MAX_WAITING = int(os.getenv("CHAT_MAX_WAITING", "32"))
+CHAT_QUEUE_WAIT_SECONDS = float(os.getenv("CHAT_QUEUE_WAIT_SECONDS", "2"))
+SLOT_POLL_SECONDS = 0.05
+# A slot outlives its turn only if the worker died; the lease then frees it
+SLOT_LEASE_SECONDS = 2 * REQUEST_DEADLINE_SECONDS
+# Only behind a proxy that appends the peer address to X-Forwarded-For (e.g. Render's); the header is client-controlled otherwise
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "0") == "1"
+RATE_LIMIT_REPLY = "You're sending messages faster than I can keep up with. Please wait a moment and try again."
+
+_waiting_turns = 0
+_slot_freed = asyncio.Event()
+
+def client_ip(connection: HTTPConnection) -> Optional[str]:
     """
-    Main chat endpoint - processes user messages and returns agent responses
+    The peer address, or with TRUST_PROXY_HEADERS the last X-Forwarded-For hop: the one our
+    proxy appended. Earlier entries come from the client and could be rotated to dodge the limit.
     """
+    forwarded = connection.headers.get("x-forwarded-for") if TRUST_PROXY_HEADERS else None
+    if forwarded and forwarded.split(",")[-1].strip():
+        return forwarded.split(",")[-1].strip()
+    return connection.client.host if connection.client else None
+
+async def acquire_turn_slot(lease_seconds: float) -> str:
+    """A global turn slot, waiting up to CHAT_QUEUE_WAIT_SECONDS in this worker's bounded queue"""
+    global _waiting_turns
+    slot = await run_in_threadpool(rate_limit.acquire_slot, lease_seconds)
+    if slot:
+        return slot
+    if _waiting_turns >= CHAT_MAX_WAITING:
+        raise rate_limit.RateLimited("server busy", CHAT_QUEUE_WAIT_SECONDS)
+    give_up_at = time.monotonic() + CHAT_QUEUE_WAIT_SECONDS
+    _waiting_turns += 1
     try:
-        user_input = chat_message.message.strip()
-        session_id = chat_message.session_id
-        user_timezone = chat_message.timezone or "Asia/Kolkata"
-        
-        if not user_input:
-            return ChatResponse(
-                response="I'm here to help! Please tell me what you'd like to do with your calendar.",
-                status="success"
-            )
-        
-        if session_id not in conversation_sessions:
-            conversation_sessions[session_id] = {
-                "messages": [],
-                "context": {}
-            }
-        
-        conversation_sessions[session_id]["messages"].append({
-            "role": "user",
-            "content": user_input
-        })
-        
-        logger.info(f"Processing message for session {session_id}: {user_input}")
-        
-       
+        while time.monotonic() < give_up_at:
+            # Woken early by a slot freed in this worker; slots freed by other workers are seen by polling
+            _slot_freed.clear()
+            try:
+                await asyncio.wait_for(_slot_freed.wait(), SLOT_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            slot = await run_in_threadpool(rate_limit.acquire_slot, lease_seconds)
+            if slot:
+                return slot
+        raise rate_limit.RateLimited("server busy", CHAT_QUEUE_WAIT_SECONDS)
+    finally:
+        _waiting_turns -= 1
+
+async def charge_buckets(connection: Optional[HTTPConnection], session_id: Optional[str], cost: int = 1):
+    """
+    Take cost tokens from the session and client IP buckets (no IP bucket without a
+    connection); raises rate_limit.RateLimited when either is short
+    """
+    buckets = rate_limit.chat_buckets(session_id, client_ip(connection) if connection is not None else None)
+    try:
+        wait = await run_in_threadpool(rate_limit.take, buckets, cost)
+    except ValueError:
+        # A cost no bucket could ever grant is the caller's bug, not a storage failure to admit through
+        raise
+    except Exception as e:
+        logger.error(f"Rate limit check failed, admitting: {str(e)}")
+        wait = 0.0
+    if wait:
+        rate_limit.count("rate_limited")
+        raise rate_limit.RateLimited("rate limited", wait)
+
+@asynccontextmanager
+async def turn_slot():
+    """Hold one global turn slot for one turn; raises rate_limit.RateLimited when none frees up in time"""
+    try:
+        slot = await acquire_turn_slot(SLOT_LEASE_SECONDS)
+    except rate_limit.RateLimited:
+        rate_limit.count("over_capacity")
+        raise
+    except Exception as e:
+        logger.error(f"Turn slot unavailable, admitting: {str(e)}")
+        slot = None
+    rate_limit.count("admitted")
+    try:
+        yield
+    finally:
+        if slot:
+            try:
+                await run_in_threadpool(rate_limit.release_slot, slot)
+            except Exception as e:
+                logger.error(f"Failed to release turn slot: {str(e)}")
+            _slot_freed.set()
+
+@asynccontextmanager
+async def admitted(connection: HTTPConnection, session_id: Optional[str]):
+    """
+    Admit a chat turn: take from the session and client IP token buckets, then hold one of
+    the global turn slots until the turn is done. Raises rate_limit.RateLimited otherwise.
+    If the shared store fails the turn is let through rather than refused.
+    """
+    await charge_buckets(connection, session_id)
+    async with turn_slot():
+        yield
+
+def retry_after_seconds(limited: rate_limit.RateLimited) -> int:
+    return max(1, math.ceil(limited.retry_after))
+
+def rate_limited_response(limited: rate_limit.RateLimited) -> ORJSONResponse:
+    retry_after = retry_after_seconds(limited)
+    return ORJSONResponse(
+        {"response": RATE_LIMIT_REPLY, "status": "rate_limited", "detail": str(limited), "retry_after": retry_after},
+        status_code=429,
+        headers={"Retry-After": str(retry_after)}
+    )
+
+async def within_budget(request: Optional[Request], budget: deadline.Budget, awaitable):
+    """
+    Await work running in the threadpool, giving up soon after the budget runs out or the
+    client disconnects. Either way the budget is cancelled, so the worker thread stops
+    at its next deadline check instead of finishing a reply nobody will read.
+    """
+    task = asyncio.ensure_future(awaitable)
+    give_up_at = budget.deadline + DEADLINE_GRACE_SECONDS if budget.deadline is not None else None
+    try:
+        while True:
+            wait_for = DISCONNECT_POLL_SECONDS
+            if give_up_at is not None:
+                wait_for = min(wait_for, max(give_up_at - time.monotonic(), 0.0))
+            done, _ = await asyncio.wait({task}, timeout=wait_for)
+            if done:
+                return task.result()
+            if request is not None and await request.is_disconnected():
+                budget.cancel()
+                raise deadline.Cancelled("client disconnected")
+            if give_up_at is not None and time.monotonic() >= give_up_at:
+                budget.cancel()
+                raise deadline.DeadlineExceeded("request deadline exceeded")
+    finally:
+        if not task.done():
+            # The thread finishes on its own; just keep its outcome from being logged as unretrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+def run_agent_turn(session_id: str, user_input: str, user_timezone: str) -> ChatResponse:
+    """Run one user message through the agent and record both sides in the session"""
+    session_store.append_message(session_id, "user", user_input)
+    
+    logger.info(f"Processing message for session {session_id}: {user_input}")
+    
+    with agent_session(session_id):
+        conversation_context['pending_job'] = None
         result = agent_app.invoke({
             "input": user_input, 
             "steps": [],
-            "user_timezone": user_timezone
+            "user_timezone": user_timezone,
+            "budget": deadline.current()
         })
         
         agent_response = result['steps'][-1].content if result['steps'] else "I'm sorry, I couldn't process that request."
         
-        
-        conversation_sessions[session_id]["messages"].append({
-            "role": "assistant",
-            "content": agent_response
-        })
-        
-        
-        conversation_sessions[session_id]["context"] = {
+        session_context = {
             "last_topic": conversation_context.get('last_topic'),
             "last_date_mentioned": conversation_context.get('last_date_mentioned'),
             "last_time_mentioned": conversation_context.get('last_time_mentioned')
         }
+        pending_job = conversation_context['pending_job']
+        conversation_context['pending_job'] = None
+    
+        message_id = session_store.append_message(session_id, "assistant", agent_response)
+        session_store.set_context(session_id, session_context)
+        # Enqueued after the acknowledgement is stored so the job's result always follows it in the history
+        job_id = job_queue.enqueue(pending_job['kind'], pending_job['payload'], session_id) if pending_job else None
+        if job_id:
+            conversation_context['booking_job'] = job_id
+    
+    logger.info(f"Agent response for session {session_id}: {agent_response}")
+    
+    return ChatResponse(
+        response=agent_response,
+        status="timeout" if agent_response == DEADLINE_REPLY else "success",
+        conversation_context=session_context,
+        message_id=message_id,
+        job_id=job_id
+    )
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat_with_agent(chat_message: ChatMessage, request: Request):
+    """
+    Main chat endpoint - processes user messages and returns agent responses.
+    A completed booking is acknowledged at once with a job_id; poll /jobs/{job_id} for the outcome.
+    Turns are cut off after REQUEST_DEADLINE_SECONDS (status "timeout") or when the client goes away.
+    Over the session/IP rate or with every turn slot busy it answers 429 with Retry-After.
+    """
+    try:
+        user_input = chat_message.message.strip()
+        session_id = chat_message.session_id
+        user_timezone = chat_message.timezone or "Asia/Kolkata"
+        
+        if not user_input:
+            return ChatResponse(
+                response=EMPTY_MESSAGE_REPLY,
+                status="success"
+            )
         
-        logger.info(f"Agent response for session {session_id}: {agent_response}")
+        async with admitted(request, session_id):
+            with deadline.scope(REQUEST_DEADLINE_SECONDS) as budget:
+                chat_response = await within_budget(
+                    request, budget, run_in_threadpool(run_agent_turn, session_id, user_input, user_timezone)
+                )
+        return fast_json(chat_response)
         
+    except rate_limit.RateLimited as e:
+        logger.info(f"Chat turn for session {chat_message.session_id} refused: {str(e)}")
+        return rate_limited_response(e)
+    except deadline.DeadlineExceeded as e:
+        logger.warning(f"Chat turn for session {chat_message.session_id} stopped: {str(e)}")
         return ChatResponse(
-            response=agent_response,
-            status="success",
-            conversation_context=conversation_sessions[session_id]["context"]
+            response=DEADLINE_REPLY,
+            status="timeout"
         )
-        
     except Exception as e:
         logger.error(f"Error processing chat message: {str(e)}")
         return ChatResponse(
-            response="I apologize, but I encountered an error while processing your request. Please try again or rephrase your message.",
+            response=ERROR_REPLY,
             status="error"
         )
 
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Status of a queued calendar write: queued, running, done or failed (with the reply in result)"""
+    job = await run_in_threadpool(job_queue.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ORJSONResponse(job_status(job))
+
+async def report_job(websocket: WebSocket, job_id: str):
+    """Push a "job" frame to the socket once the queued write finishes"""
+    give_up_at = asyncio.get_running_loop().time() + JOB_REPORT_TIMEOUT_SECONDS
+    while asyncio.get_running_loop().time() < give_up_at:
+        job = await run_in_threadpool(job_queue.get_job, job_id)
+        if job is None:
+            return
+        if job["status"] in job_queue.FINISHED:
+            try:
+                await websocket.send_json({"type": "job", **job_status(job)})
+            except Exception:
+                pass
+            return
+        await asyncio.sleep(JOB_REPORT_POLL_SECONDS)
+
+class BatchChatItem(BaseModel):
+    message: str
+    session_id: Optional[str] = "default"
+    timezone: Optional[str] = None
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem]
+
+def run_session_items(session_id: str, items: List[tuple]) -> List[Dict[str, Any]]:
+    """Run one session's items in order; returns one result per (index, item)"""
+    results = []
+    for index, item in items:
+        started = time.perf_counter()
+        user_input = item.message.strip()
+        try:
+            if not user_input:
+                chat_response = ChatResponse(response=EMPTY_MESSAGE_REPLY, status="success")
+            else:
+                with deadline.scope(REQUEST_DEADLINE_SECONDS):
+                    deadline.check("batch item")
+                    chat_response = run_agent_turn(session_id, user_input, item.timezone or "Asia/Kolkata")
+        except deadline.DeadlineExceeded as e:
+            logger.warning(f"Batch item {index} for session {session_id} stopped: {str(e)}")
+            chat_response = ChatResponse(response=DEADLINE_REPLY, status="timeout")
+        except Exception as e:
+            logger.error(f"Error processing batch item {index} for session {session_id}: {str(e)}")
+            chat_response = ChatResponse(response=ERROR_REPLY, status="error")
+        results.append({
+            "index": index,
+            "session_id": session_id,
+            **to_json_dict(chat_response),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        })
+    return results
+
+@app.post("/chat/batch")
+async def chat_batch(batch: BatchChatRequest, request: Request):
+    """
+    Process many chat messages in one call (scripts, QA suites). Sessions run
+    concurrently, each session's messages in the order given; calendar days
+    needed by several items are fetched once and shared through the event mirror.
+    Results come back in request order with per-item timings. Each item gets its
+    own REQUEST_DEADLINE_SECONDS budget; a client disconnect stops the remaining items.
+    Each item costs one token of the client IP's rate limit, all charged up front (a batch
+    larger than the IP burst is refused with 413), and one token of its session's limit,
+    like a /chat turn, and holds one global turn slot while it runs. An item whose session
+    is out of tokens or that finds every slot busy comes back with status "rate_limited".
+    """
+    if not 1 <= len(batch.items) <= CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Send 1 to {CHAT_BATCH_MAX_ITEMS} items")
+    if len(batch.items) > rate_limit.IP_BURST:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch may hold at most {rate_limit.IP_BURST:g} items (the per-client burst); split it up"
+        )
+    
+    started = time.perf_counter()
+    by_session: Dict[str, List[tuple]] = {}
+    for index, item in enumerate(batch.items):
+        by_session.setdefault(item.session_id or "default", []).append((index, item))
+    
+    limit = asyncio.Semaphore(CHAT_BATCH_CONCURRENCY)
+    async def run_session(session_id: str, items: List[tuple]):
+        results = []
+        async with limit:
+            # One turn slot per running item, so a batch counts against the global cap like separate turns
+            for index, item in items:
+                try:
+                    await charge_buckets(None, session_id)
+                    async with turn_slot():
+                        results.extend(await run_in_threadpool(run_session_items, session_id, [(index, item)]))
+                except rate_limit.RateLimited as e:
+                    results.append({
+                        "index": index,
+                        "session_id": session_id,
+                        "response": RATE_LIMIT_REPLY,
+                        "status": "rate_limited",
+                        "retry_after": retry_after_seconds(e)
+                    })
+        return results
+    
+    try:
+        await charge_buckets(request, None, cost=len(batch.items))
+    except rate_limit.RateLimited as e:
+        logger.info(f"Batch of {len(batch.items)} items refused: {str(e)}")
+        return rate_limited_response(e)
+    
+    try:
+        with deadline.scope() as budget:
+            session_results = await within_budget(request, budget, asyncio.gather(
+                *(run_session(session_id, items) for session_id, items in by_session.items())
+            ))
+    except deadline.Cancelled:
+        logger.info(f"Batch of {len(batch.items)} items abandoned by the client")
+        return Response(status_code=499)
+    results = sorted((result for group in session_results for result in group), key=lambda result: result["index"])
+    return ORJSONResponse({
+        "results": results,
+        "total_items": len(results),
+        "sessions": len(by_session),
+        "errors": sum(result["status"] == "error" for result in results),
+        "timeouts": sum(result["status"] == "timeout" for result in results),
+        "rate_limited": sum(result["status"] == "rate_limited" for result in results),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    })
+
+async def receive_frame(websocket: WebSocket) -> Dict[str, Any]:
+    """
+    The next client frame as a dict. A frame that is not a JSON object, or whose
+    message/timezone are not strings, raises ValueError; the socket stays usable.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    raw = message.get("text")
+    if raw is None:
+        raw = (message.get("bytes") or b"").decode("utf-8", "replace")
+    try:
+        frame = json.loads(raw)
+    except json.JSONDecodeError:
+        raise ValueError("Frame is not valid JSON")
+    if not isinstance(frame, dict):
+        raise ValueError("Frame must be a JSON object")
+    for key in ("type", "message", "timezone"):
+        if frame.get(key) is not None and not isinstance(frame[key], str):
+            raise ValueError(f"'{key}' must be a string")
+    return frame
+
+@app.websocket("/ws/chat")
+async def chat_socket(websocket: WebSocket, session_id: Optional[str] = None):
+    """
+    Persistent chat channel bound to one session.
+    Client frames: {"type": "message", "message": ..., "timezone": ...} or {"type": "ping"}
+    Server frames: "session", "progress", "response", "job", "pong" and "error" events;
+    a response carrying a job_id is followed by a "job" frame when that booking completes
+    """
+    await websocket.accept()
+    session_id = session_id or str(uuid.uuid4())
+    await websocket.send_json({"type": "session", "session_id": session_id})
+    job_reports = set()
+    
+    try:
+        while True:
+            try:
+                frame = await receive_frame(websocket)
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            frame_type = frame.get("type", "message")
+            
+            if frame_type == "ping":
+                await websocket.send_json({"type": "pong"})
+                continue
+            if frame_type != "message":
+                await websocket.send_json({"type": "error", "detail": f"Unknown frame type '{frame_type}'"})
+                continue
+            
+            user_input = (frame.get("message") or "").strip()
+            user_timezone = frame.get("timezone") or "Asia/Kolkata"
+            if not user_input:
+                await websocket.send_json({"type": "response", "response": EMPTY_MESSAGE_REPLY, "status": "success", "conversation_context": {}})
+                continue
+            
+            await websocket.send_json({"type": "progress", "stage": "received"})
+            try:
+                async with admitted(websocket, session_id):
+                    await websocket.send_json({"type": "progress", "stage": "thinking"})
+                    # No disconnect watch here: a closed socket surfaces on the next receive
+                    with deadline.scope(REQUEST_DEADLINE_SECONDS) as budget:
+                        chat_response = await within_budget(
+                            None, budget, run_in_threadpool(run_agent_turn, session_id, user_input, user_timezone)
+                        )
+            except rate_limit.RateLimited as e:
+                logger.info(f"Socket turn for session {session_id} refused: {str(e)}")
+                await websocket.send_json({
+                    "type": "error", "status": "rate_limited", "detail": RATE_LIMIT_REPLY,
+                    "retry_after": retry_after_seconds(e)
+                })
+                continue
+            except deadline.DeadlineExceeded as e:
+                logger.warning(f"Socket turn for session {session_id} stopped: {str(e)}")
+                chat_response = ChatResponse(response=DEADLINE_REPLY, status="timeout")
+            except Exception as e:
+                logger.error(f"Error processing socket message: {str(e)}")
+                chat_response = ChatResponse(response=ERROR_REPLY, status="error")
+            
+            await websocket.send_json({"type": "response", **to_json_dict(chat_response)})
+            if chat_response.job_id:
+                task = asyncio.create_task(report_job(websocket, chat_response.job_id))
+                job_reports.add(task)
+                task.add_done_callback(job_reports.discard)
+    
+    except WebSocketDisconnect:
+        logger.info(f"Chat socket closed for session {session_id}")
+    finally:
+        for task in job_reports:
+            task.cancel()
+
+@app.get("/metrics/llm")
+async def llm_metrics():
+    """
+    Casual-reply stats: the share of turns answered from templates without a model call,
+    and for the rest the micro-batch fill and the latency added by the batch window
+    """
+    return ORJSONResponse({"responses": response_metrics(), "batching": llm_batcher.metrics()})
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    """Chat turns admitted and refused by this worker, and turn slots in use across all workers"""
+    report = await run_in_threadpool(rate_limit.metrics)
+    report["waiting"] = _waiting_turns
+    return ORJSONResponse(report)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # Fail closed: no configured token means no admin access, not open access
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+def memory_report(top_sessions: int) -> Dict[str, Any]:
+    return {
+        "process": memstats.process_memory(),
+        "conversation_state": session_memory(top_sessions),
+        "session_store": session_store.storage_stats(top_sessions),
+        "job_queue": job_queue.counts(),
+        "caches": {
+            "event_mirror": event_cache.size(),
+            "event_index": event_index.size(),
+            "zones": zone.cache_info()._asdict(),
+            "llm_batching": {"pending": llm_batcher.metrics()["pending"]}
+        },
+        "tracemalloc": memstats.tracing_status()
+    }
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def memory_diagnostics(top_sessions: int = Query(10, ge=0, le=100)):
+    """
+    Where this worker's memory goes: process RSS, the per-session conversation state
+    (largest sessions first), the shared session store and the in-process caches.
+    Each gunicorn worker answers for itself; the pid says which one did.
+    """
+    return ORJSONResponse(await run_in_threadpool(memory_report, top_sessions))
+
+@app.post("/admin/memory/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def start_tracemalloc(frames: int = Query(memstats.TRACEMALLOC_FRAMES, ge=1, le=50)):
+    """Start tracing allocations in this worker (slows it down until stopped)"""
+    return ORJSONResponse(memstats.start(frames))
+
+@app.post("/admin/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def stop_tracemalloc():
+    return ORJSONResponse(memstats.stop())
+
+@app.post("/admin/memory/tracemalloc/snapshots", dependencies=[Depends(require_admin)])
+async def take_tracemalloc_snapshot(label: Optional[str] = Query(None, max_length=64)):
+    """Snapshot the traced allocations under a label, to diff against later"""
+    try:
+        return ORJSONResponse(await run_in_threadpool(memstats.take_snapshot, label))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/memory/tracemalloc/diff", dependencies=[Depends(require_admin)])
+async def diff_tracemalloc_snapshots(
+    base: str,
+    current: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+):
+    """
+    Allocation sites that grew most between snapshot `base` and snapshot `current`
+    (or now, taking a new snapshot, when current is omitted)
+    """
+    try:
+        return ORJSONResponse(await run_in_threadpool(memstats.diff, base, current, limit, group_by))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"No snapshot {e}; have {memstats.snapshot_labels()}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @app.get("/conversation/{session_id}")
-async def get_conversation_history(session_id: str):
-    """Get conversation history for a session"""
-    if session_id not in conversation_sessions:
+async def get_conversation_history(
+    session_id: str,
+    request: Request,
+    after: Optional[int] = Query(None, ge=0),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE)
+):
+    """
+    Get conversation history for a session, one page at a time.
+    With ?after=<msg_id> returns up to `limit` messages following that id;
+    without it returns the latest `limit` messages. Supports If-None-Match.
+    """
+    session = await run_in_threadpool(session_store.get_session, session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    return {
+    total = session["message_count"]
+    # Ids are dense and append-only, so the page start is known before touching the messages
+    start = min(after, total) if after is not None else max(total - limit, 0)
+    
+    etag = f'W/"{session_id}:{total}:{start}:{limit}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    page = await run_in_threadpool(session_store.get_messages, session_id, start, limit)
+    return ORJSONResponse({
         "session_id": session_id,
-        "messages": conversation_sessions[session_id]["messages"],
-        "context": conversation_sessions[session_id]["context"]
-    }
+        "messages": page,
+        "context": session["context"],
+        "next_cursor": page[-1]["id"] if page else start,
+        "has_more": start + len(page) < total,
+        "has_earlier": start > 0,
+        "total_messages": total
+    }, headers={"ETag": etag})
+
+@app.get("/events")
+async def list_events(date: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$"), timezone: str = "Asia/Kolkata"):
+    """List the calendar events of one day (YYYY-MM-DD) in the given timezone"""
+    events = await run_in_threadpool(get_events_for_day, date, timezone)
+    return ORJSONResponse({
+        "date": date,
+        "timezone": timezone,
+        "events": events,
+        "total_events": len(events)
+    })
+
+@app.get("/analytics/utilization")
+async def get_utilization(
+    start: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    end: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    timezone: str = "Asia/Kolkata",
+    work_start_hour: int = Query(9, ge=0, le=23),
+    work_end_hour: int = Query(17, ge=1, le=24)
+):
+    """
+    Busy-hours report for [start, end]: utilization per day and week,
+    a weekday x hour meeting-load heatmap and the longest free blocks
+    """
+    try:
+        report = await run_in_threadpool(utilization_report, start, end, timezone, work_start_hour, work_end_hour)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(report)
+
+ICS_MAX_EXPORT_DAYS = 366
+# Per-kind cap on the conflict/failure details echoed back by an import
+ICS_REPORT_LIMIT = 100
+
+@app.get("/calendar/export.ics")
+async def export_ics(
+    start: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    end: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    timezone: str = "Asia/Kolkata"
+):
+    """Stream the events of [start, end] (inclusive, local dates) as an iCalendar file"""
+    user_tz = zone(timezone)
+    if user_tz is None:
+        raise HTTPException(status_code=400, detail=f"Unknown timezone '{timezone}'")
+    range_start = datetime.strptime(start, "%Y-%m-%d").replace(tzinfo=user_tz)
+    range_end = datetime.strptime(end, "%Y-%m-%d").replace(tzinfo=user_tz) + timedelta(days=1)
+    if not 1 <= (range_end - range_start).days <= ICS_MAX_EXPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must cover 1 to {ICS_MAX_EXPORT_DAYS} days")
+    # StreamingResponse runs the synchronous generator in the threadpool, one event at a time
+    return StreamingResponse(
+        ics.iter_calendar(iter_events_range(range_start, range_end)),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="calendar-{start}-{end}.ics"'}
+    )
+
+@app.post("/calendar/import")
+async def import_ics(request: Request, timezone: str = "Asia/Kolkata", skip_conflicts: bool = False):
+    """
+    Import an iCalendar file sent as the raw request body (text/calendar). The body is
+    parsed as it streams in and written in batches; UIDs seen earlier in the file or
+    already in the calendar are skipped. Conflicts are reported, and skipped with
+    skip_conflicts=true. Overrides (RECURRENCE-ID) of a series in the same file are
+    left to the series itself; orphan overrides are imported as single events.
+    """
+    if zone(timezone) is None:
+        raise HTTPException(status_code=400, detail=f"Unknown timezone '{timezone}'")
+    report = {"parsed": 0, "imported": 0, "duplicates": 0, "overrides_skipped": 0,
+              "conflict_count": 0, "conflicts": [], "invalid": [], "failed": []}
+    parser = ics.IcsParser()
+    seen_uids = set()
+    series_uids = set()
+    pending = []
+
+    async def flush():
+        batch = pending[:]
+        pending.clear()
+        result = await run_in_threadpool(import_events, batch, skip_conflicts)
+        for key in ("imported", "duplicates", "conflict_count"):
+            report[key] += result[key]
+        for key in ("conflicts", "failed"):
+            report[key].extend(result[key][:ICS_REPORT_LIMIT - len(report[key])])
+
+    async def handle(vevents):
+        for vevent in vevents:
+            report["parsed"] += 1
+            uid = ics.event_uid(vevent)
+            if ics.recurrence_id(vevent) and uid in series_uids:
+                report["overrides_skipped"] += 1
+                continue
+            try:
+                body = ics.to_google(vevent, timezone)
+            except ValueError as e:
+                if len(report["invalid"]) < ICS_REPORT_LIMIT:
+                    report["invalid"].append({"uid": uid, "error": str(e)})
+                continue
+            if body is None:
+                continue
+            if body['iCalUID'] in seen_uids:
+                report["duplicates"] += 1
+                continue
+            seen_uids.add(body['iCalUID'])
+            if body.get('recurrence'):
+                series_uids.add(uid)
+            pending.append(body)
+            if len(pending) >= IMPORT_BATCH_SIZE:
+                await flush()
+
+    try:
+        async for chunk in request.stream():
+            await handle(parser.feed(chunk))
+        await handle(parser.close())
+        if pending:
+            await flush()
+    except Exception as e:
+        logger.error(f"ICS import failed after {report['parsed']} events: {str(e)}")
+        report["error"] = str(e)
+    return ORJSONResponse(report)
 
 @app.delete("/conversation/{session_id}")
 async def clear_conversation(session_id: str):
     """Clear conversation history for a session"""
-    if session_id in conversation_sessions:
-        del conversation_sessions[session_id]
+    forget_session(session_id)
+    if await run_in_threadpool(session_store.delete_session, session_id):
         return {"message": f"Conversation {session_id} cleared successfully"}
     else:
         raise HTTPException(status_code=404, detail="Session not found")
 
 @app.get("/sessions")
-async def list_active_sessions():
-    """List all active conversation sessions"""
+async def list_active_sessions(
+    limit: int = Query(SESSION_PAGE_SIZE, ge=1, le=SESSION_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    active_within_minutes: Optional[int] = Query(None, ge=1),
+    min_messages: int = Query(0, ge=0),
+    prefix: Optional[str] = None
+):
+    """
+    List conversation sessions across all workers, most recently active first.
+    Pass the returned next_cursor back as ?cursor= to fetch the following page.
+    """
+    try:
+        page = await run_in_threadpool(
+            session_store.list_sessions,
+            limit=limit,
+            cursor=cursor,
+            active_within_seconds=active_within_minutes * 60 if active_within_minutes else None,
+            min_messages=min_messages,
+            prefix=prefix
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    return {
+        "sessions": page["sessions"],
+        "active_sessions": [session["session_id"] for session in page["sessions"]],
+        "total_sessions": page["total"],
+        "next_cursor": page["next_cursor"]
+    }
+
+@app.delete("/sessions", dependencies=[Depends(require_admin)])
+async def expire_sessions(
+    idle_minutes: Optional[int] = Query(None, ge=0),
+    purge_all: bool = False,
+    batch_size: int = Query(session_store.EXPIRY_BATCH_SIZE, ge=1, le=5000)
+):
+    """
+    Expire sessions idle for at least idle_minutes, or every session with purge_all=true (admin only).
+    Deletion runs in small batches so chat traffic keeps flowing meanwhile.
+    """
+    if idle_minutes is None and not purge_all:
+        raise HTTPException(status_code=400, detail="Pass idle_minutes or purge_all=true")
+    
+    idle_seconds = None if purge_all else idle_minutes * 60
+    removed = await expire_sessions_incrementally(idle_seconds, batch_size)
     return {
-        "active_sessions": list(conversation_sessions.keys()),
-        "total_sessions": len(conversation_sessions)
+        "removed_sessions": removed,
+        "remaining_sessions": await run_in_threadpool(session_store.count_sessions)
     }
 
 if __name__ == "__main__":
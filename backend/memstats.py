@@ -0,0 +1,191 @@
+"""
+Memory diagnostics for a long-running worker.
+
+deep_size() estimates what a Python object graph holds (sys.getsizeof
+summed over everything reachable through containers and instance
+attributes, each object counted once), which is how the per-session
+conversation state and the in-process caches are sized for /admin/memory.
+
+The tracemalloc helpers find where memory grows: start tracing, take a
+named snapshot, let traffic run, take another and diff the two to get the
+allocation sites that grew the most. Tracing slows allocations down and
+costs memory of its own, so it only runs between start() and stop(), and
+only the last TRACEMALLOC_MAX_SNAPSHOTS snapshots are kept.
+
+Everything here is per process: every gunicorn worker traces and reports
+its own memory.
+"""
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "10"))
+TRACEMALLOC_MAX_SNAPSHOTS = 4
+DIFF_GROUPINGS = ("lineno", "filename", "traceback")
+
+# label -> (taken_at, snapshot)
+_snapshots: 'OrderedDict[str, tuple]' = OrderedDict()
+_lock = threading.Lock()
+
+# Allocations made by the diagnostics themselves
+_IGNORED_TRACES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def deep_size(obj: Any, seen: Optional[set] = None) -> int:
+    """Approximate bytes held by obj and everything it references (shared objects counted once)"""
+    seen = set() if seen is None else seen
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        # Classes, modules and functions are shared by every session, not owned by one
+        if isinstance(item, (type, type(sys), type(deep_size))):
+            continue
+        size += sys.getsizeof(item, 0)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif not isinstance(item, (str, bytes, int, float, bool)) and item is not None:
+            if hasattr(item, "__dict__"):
+                stack.append(vars(item))
+            for slot in getattr(type(item), "__slots__", ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return size
+
+
+def process_memory() -> Dict[str, Any]:
+    """Resident and peak memory of this process (Linux /proc; peak only elsewhere), plus GC counters"""
+    usage = {"pid": os.getpid(), "rss_mb": None, "peak_rss_mb": None}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "VmRSS":
+                    usage["rss_mb"] = round(int(value.split()[0]) / 1024, 1)
+                elif key == "VmHWM":
+                    usage["peak_rss_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        import resource
+        # ru_maxrss is in kB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    usage["gc"] = {"objects": len(gc.get_objects()), "counts": gc.get_count(), "frozen": gc.get_freeze_count()}
+    return usage
+
+
+def tracing_status() -> Dict[str, Any]:
+    status = {"tracing": tracemalloc.is_tracing(), "snapshots": []}
+    if status["tracing"]:
+        current, peak = tracemalloc.get_traced_memory()
+        status.update({
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_mb": round(current / 2**20, 2),
+            "traced_peak_mb": round(peak / 2**20, 2),
+            # What tracemalloc itself uses, snapshots included
+            "overhead_mb": round(tracemalloc.get_tracemalloc_memory() / 2**20, 2),
+        })
+    with _lock:
+        status["snapshots"] = [{"label": label, "taken_at": taken_at} for label, (taken_at, _) in _snapshots.items()]
+    return status
+
+
+def start(frames: int = TRACEMALLOC_FRAMES) -> Dict[str, Any]:
+    """Start tracing allocations (a no-op if already tracing; the frame depth cannot change while tracing)"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        print(f"🔬 tracemalloc started ({frames} frames)")
+    return tracing_status()
+
+
+def stop() -> Dict[str, Any]:
+    """Stop tracing and drop the stored snapshots"""
+    with _lock:
+        _snapshots.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        print("🔬 tracemalloc stopped")
+    return tracing_status()
+
+
+def take_snapshot(label: Optional[str] = None) -> Dict[str, Any]:
+    """Snapshot the traced allocations under label (default: a timestamp); the oldest is dropped beyond the limit"""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running")
+    taken_at = time.time()
+    label = label or time.strftime("%H%M%S", time.localtime(taken_at))
+    snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_TRACES)
+    with _lock:
+        _snapshots.pop(label, None)
+        _snapshots[label] = (taken_at, snapshot)
+        while len(_snapshots) > TRACEMALLOC_MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return {"label": label, "taken_at": taken_at, "traced_mb": round(sum(stat.size for stat in snapshot.statistics("filename")) / 2**20, 2)}
+
+
+def _site(stat, group_by: str) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    site = {
+        "site": frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}",
+        "size_diff_kb": round(stat.size_diff / 1024, 1),
+        "size_kb": round(stat.size / 1024, 1),
+        "count_diff": stat.count_diff,
+        "count": stat.count,
+    }
+    if group_by == "traceback":
+        site["traceback"] = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    return site
+
+
+def diff(base: str, current: Optional[str] = None, limit: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+    """
+    Top allocation sites by growth from snapshot base to snapshot current
+    (a fresh snapshot when current is None)
+    """
+    if group_by not in DIFF_GROUPINGS:
+        raise ValueError(f"group_by must be one of {', '.join(DIFF_GROUPINGS)}")
+    with _lock:
+        base_entry = _snapshots.get(base)
+        current_entry = _snapshots.get(current) if current else None
+    if base_entry is None:
+        raise KeyError(base)
+    if current and current_entry is None:
+        raise KeyError(current)
+    if current_entry is None:
+        taken = take_snapshot()
+        current = taken["label"]
+        with _lock:
+            current_entry = _snapshots[current]
+
+    stats = current_entry[1].compare_to(base_entry[1], group_by)
+    grown = [stat for stat in stats if stat.size_diff > 0]
+    return {
+        "base": base,
+        "current": current,
+        "seconds_between": round(current_entry[0] - base_entry[0], 1),
+        "group_by": group_by,
+        "total_diff_kb": round(sum(stat.size_diff for stat in stats) / 1024, 1),
+        "top": [_site(stat, group_by) for stat in grown[:limit]],
+        # Largest shrinkers too: a leak fixed by a cache eviction shows up here
+        "freed": [_site(stat, group_by) for stat in sorted(stats, key=lambda s: s.size_diff)[:5] if stat.size_diff < 0],
+    }
+
+
+def snapshot_labels() -> List[str]:
+    with _lock:
+        return list(_snapshots)
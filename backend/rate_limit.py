@@ -0,0 +1,182 @@
+"""
+Admission control for chat turns, shared by every gunicorn worker.
+
+Each turn can fan out into several Google Calendar calls, so one noisy
+client could use up the calendar quota for everyone. Two limits apply
+before a turn runs, both kept in SQLite next to the sessions so every
+worker enforces the same numbers:
+
+- token buckets per session and per client IP (take()): a bucket refills
+  at a steady rate up to a burst size and each turn takes a token from
+  every bucket it belongs to, or from none when any of them is empty
+- a global cap on turns in flight (acquire_slot()): a slot is a leased
+  row, released when the turn ends; a slot whose worker died frees itself
+  when its lease runs out, like a job lease in job_queue
+
+Callers that cannot be admitted are told how long to wait (Retry-After).
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+
+from backend.session_store import SESSION_DB_PATH
+
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", SESSION_DB_PATH)
+# Sustained turns per minute and burst size, per session and per client IP
+SESSION_RATE_PER_MINUTE = float(os.getenv("SESSION_RATE_PER_MINUTE", "12"))
+SESSION_BURST = float(os.getenv("SESSION_BURST", "5"))
+IP_RATE_PER_MINUTE = float(os.getenv("IP_RATE_PER_MINUTE", "60"))
+IP_BURST = float(os.getenv("IP_BURST", "20"))
+# Turns in flight across all workers
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "16"))
+# A bucket untouched this long is full again and can be dropped
+BUCKET_IDLE_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS admission_slots (
+    slot_id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_local = threading.local()
+_stats = {"admitted": 0, "rate_limited": 0, "over_capacity": 0}
+_stats_lock = threading.Lock()
+
+
+class RateLimited(Exception):
+    """A turn that may not run now; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def get_connection() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    # A connection opened before a fork (gunicorn --preload) must not be used by the child
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(RATE_LIMIT_DB_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def count(outcome: str):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def chat_buckets(session_id: Optional[str], client_ip: Optional[str]) -> List[Tuple[str, float, float]]:
+    """(key, tokens per second, burst) of the buckets a chat turn draws from"""
+    buckets = []
+    if session_id:
+        buckets.append((f"session:{session_id}", SESSION_RATE_PER_MINUTE / 60, SESSION_BURST))
+    if client_ip:
+        buckets.append((f"ip:{client_ip}", IP_RATE_PER_MINUTE / 60, IP_BURST))
+    return buckets
+
+
+def take(buckets: List[Tuple[str, float, float]], cost: float = 1) -> float:
+    """
+    Take cost tokens from every bucket, or from none of them. Returns 0.0 when
+    taken, else the seconds until all of them will hold enough. A cost above a
+    bucket's burst size could never be met and raises ValueError; callers must
+    refuse such requests outright (see max_cost()).
+    """
+    if not buckets:
+        return 0.0
+    if cost > max_cost(buckets):
+        raise ValueError(f"cost {cost} exceeds the burst size {max_cost(buckets):g}")
+    conn = get_connection()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        keys = [key for key, _, _ in buckets]
+        stored = {
+            key: (tokens, updated_at) for key, tokens, updated_at in conn.execute(
+                f"SELECT key, tokens, updated_at FROM rate_buckets WHERE key IN ({','.join('?' * len(keys))})", keys
+            )
+        }
+        levels = []
+        wait = 0.0
+        for key, rate, burst in buckets:
+            tokens, updated_at = stored.get(key, (burst, now))
+            level = min(burst, tokens + max(now - updated_at, 0.0) * rate)
+            if level < cost:
+                wait = max(wait, (cost - level) / rate)
+            levels.append((key, level))
+        conn.executemany(
+            "INSERT INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+            [(key, level - cost if wait == 0.0 else level, now) for key, level in levels]
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return wait
+
+
+def max_cost(buckets: List[Tuple[str, float, float]]) -> float:
+    """The largest cost take() can ever grant from these buckets: the smallest burst size"""
+    return min(burst for _, _, burst in buckets) if buckets else float("inf")
+
+
+def acquire_slot(lease_seconds: float, limit: int = CHAT_MAX_CONCURRENCY) -> Optional[str]:
+    """Lease one of the limit global turn slots; None when all are taken"""
+    conn = get_connection()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM admission_slots WHERE expires_at < ?", (now,))
+        in_use = conn.execute("SELECT COUNT(*) FROM admission_slots").fetchone()[0]
+        slot_id = None
+        if in_use < limit:
+            slot_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO admission_slots (slot_id, pid, expires_at) VALUES (?, ?, ?)",
+                (slot_id, os.getpid(), now + lease_seconds)
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return slot_id
+
+
+def release_slot(slot_id: str):
+    get_connection().execute("DELETE FROM admission_slots WHERE slot_id = ?", (slot_id,))
+
+
+def purge_idle(idle_seconds: float = BUCKET_IDLE_SECONDS) -> int:
+    """Drop buckets nobody has drawn from for idle_seconds (they would be full again anyway)"""
+    return get_connection().execute(
+        "DELETE FROM rate_buckets WHERE updated_at < ?", (time.time() - idle_seconds,)
+    ).rowcount
+
+
+def metrics() -> Dict[str, Any]:
+    """Admission outcomes in this process, and the slots in use across all workers"""
+    with _stats_lock:
+        report = dict(_stats)
+    now = time.time()
+    report["slots_in_use"] = get_connection().execute(
+        "SELECT COUNT(*) FROM admission_slots WHERE expires_at >= ?", (now,)
+    ).fetchone()[0]
+    report["max_concurrency"] = CHAT_MAX_CONCURRENCY
+    report["buckets"] = get_connection().execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+    return report
@@ -0,0 +1,171 @@
+"""
+Local expansion of recurring events.
+
+A listing with singleEvents=False returns each recurring series once, as a
+master event carrying its RRULE/EXDATE/RDATE lines, plus the instances
+that were moved or cancelled as separate exception items. Expanding the
+masters here with dateutil.rrule keeps month and quarter listings to a
+handful of items instead of paginating through every server-side
+instance of a daily standup.
+
+Expanded instances get the same ids Google gives them
+('<master id>_<YYYYMMDDTHHMMSSZ>', or '<master id>_<YYYYMMDD>' for all-day
+series), so they line up with day fetches made with singleEvents=True.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from dateutil.rrule import rrulestr
+from typing import Dict, Any, List, Iterator, Iterable, Optional, Tuple
+
+from backend.events import Event, _parse_epoch
+from backend.timecore import CALENDAR_TIMEZONE, CALENDAR_TZ, zone
+
+# Instance ids end in the original start: _YYYYMMDD or _YYYYMMDDTHHMMSSZ
+INSTANCE_SUFFIX = re.compile(r'_(\d{8}(?:T\d{6}Z)?)$')
+
+
+def _series_start(master: Dict[str, Any]) -> Tuple[datetime, timedelta, bool]:
+    """(dtstart, duration, all_day) of a master; timed series recur in their own time zone"""
+    start = master['start']
+    end = master['end']
+    if 'dateTime' not in start:
+        dtstart = datetime.strptime(start['date'], "%Y-%m-%d")
+        return dtstart, datetime.strptime(end['date'], "%Y-%m-%d") - dtstart, True
+    dtstart = datetime.fromisoformat(start['dateTime'].replace('Z', '+00:00'))
+    dtend = datetime.fromisoformat(end['dateTime'].replace('Z', '+00:00'))
+    series_zone = zone(start.get('timeZone') or CALENDAR_TIMEZONE)
+    if dtstart.tzinfo is None:
+        dtstart = dtstart.replace(tzinfo=series_zone)
+        dtend = dtend.replace(tzinfo=series_zone)
+    # DST shifts must follow the series' wall clock, not the offset frozen in dateTime
+    return dtstart.astimezone(series_zone), dtend - dtstart, False
+
+
+def rule_set(lines: Iterable[str], dtstart: datetime):
+    return rrulestr("\n".join(lines), dtstart=dtstart, forceset=True, unfold=True)
+
+
+def instance_id(master_id: str, original_start: datetime, all_day: bool) -> str:
+    if all_day:
+        return f"{master_id}_{original_start.strftime('%Y%m%d')}"
+    return f"{master_id}_{original_start.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+
+
+def series_uid(uid: str) -> str:
+    """The series UID of an instance UID/id ('abc_20261021T043000Z' -> 'abc')"""
+    return INSTANCE_SUFFIX.sub('', uid)
+
+
+def _epoch(value: datetime, all_day: bool) -> int:
+    if all_day:
+        return int(value.replace(tzinfo=CALENDAR_TZ).timestamp())
+    return int(value.timestamp())
+
+
+def expand(master: Dict[str, Any], window_start: datetime, window_end: datetime,
+           skip: Optional[set] = None) -> Iterator[Event]:
+    """
+    Instances of a recurring master overlapping [window_start, window_end),
+    generated lazily in start order. skip holds original start epochs of
+    instances replaced or cancelled by exceptions.
+    """
+    template = Event.from_google(master)
+    if template is None:
+        return
+    dtstart, duration, all_day = _series_start(master)
+    rules = rule_set(master.get('recurrence', []), dtstart)
+    if all_day:
+        window_start = window_start.astimezone(CALENDAR_TZ).replace(tzinfo=None)
+        window_end = window_end.astimezone(CALENDAR_TZ).replace(tzinfo=None)
+
+    # An instance overlaps the window iff it starts before the end and after window_start - duration
+    for occurrence in rules.xafter(window_start - duration, inc=False):
+        if occurrence >= window_end:
+            return
+        start = _epoch(occurrence, all_day)
+        if skip and start in skip:
+            continue
+        yield Event(
+            instance_id(template.id, occurrence, all_day),
+            template.summary,
+            start,
+            _epoch(occurrence + duration, all_day),
+            all_day,
+            template.description,
+            template.attendees,
+            template.uid
+        )
+
+
+def occurrence_starts(rule: str, dtstart: datetime, window_end: datetime, limit: int) -> List[int]:
+    """Epoch starts of a new series (RRULE text without the 'RRULE:' prefix) before window_end"""
+    starts = []
+    for occurrence in rule_set([f"RRULE:{rule}"], dtstart):
+        if occurrence >= window_end or len(starts) == limit:
+            break
+        starts.append(int(occurrence.timestamp()))
+    return starts
+
+
+def exception_series(items: Iterable[Dict[str, Any]]) -> set:
+    """Ids of the series that have moved or cancelled instances among a listing's items"""
+    return {item['recurringEventId'] for item in items if item.get('recurringEventId') and item.get('originalStartTime')}
+
+
+def expand_listing(items: List[Dict[str, Any]], window_start: datetime, window_end: datetime,
+                   fallback=None, known_exceptions: Iterable[str] = ()) -> List[Event]:
+    """
+    Turn a singleEvents=False listing into the instances overlapping the window:
+    single events as they are, masters expanded locally, exceptions merged in
+    (matched to the instance they replace by originalStartTime).
+
+    fallback(master) is asked for the server-side instances of a series whose
+    rules cannot be expanded here, and of every series with exceptions (in this
+    listing or in known_exceptions): an instance moved out of the window is not
+    in the listing at all, so local expansion would still put it at its
+    original time.
+    """
+    masters = []
+    replaced: Dict[str, set] = {}
+    exceptions: Dict[str, List[Event]] = {}
+    events = []
+    for item in items:
+        if item.get('recurrence'):
+            if item.get('status') != 'cancelled':
+                masters.append(item)
+            continue
+        master_id = item.get('recurringEventId')
+        original = item.get('originalStartTime', {})
+        event = Event.from_google(item)
+        if master_id and original:
+            original_start = _parse_epoch(original.get('dateTime') or original.get('date'))
+            replaced.setdefault(master_id, set()).add(original_start)
+            if event is not None:
+                exceptions.setdefault(master_id, []).append(event)
+        elif event is not None:
+            events.append(event)
+
+    with_exceptions = set(replaced) | set(known_exceptions)
+    master_ids = {master['id'] for master in masters}
+    for master_id, moved in exceptions.items():
+        # The server-side instances of these series already include their moved instances
+        if master_id not in master_ids or fallback is None:
+            events.extend(moved)
+
+    window_start_ts = int(window_start.timestamp())
+    window_end_ts = int(window_end.timestamp())
+    events = [event for event in events if event.overlaps(window_start_ts, window_end_ts)]
+    for master in masters:
+        if fallback is not None and master['id'] in with_exceptions:
+            events.extend(fallback(master))
+            continue
+        try:
+            instances = list(expand(master, window_start, window_end, replaced.get(master['id'])))
+        except Exception as e:
+            if fallback is None:
+                raise
+            print(f"⚠️ Could not expand recurrence of {master.get('id')} locally: {e}")
+            instances = fallback(master)
+        events.extend(instances)
+    events.sort()
+    return events
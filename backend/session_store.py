@@ -0,0 +1,232 @@
+"""
+Conversation session store shared by every gunicorn worker.
+
+Sessions and their messages live in one SQLite database (WAL mode) so any
+worker can answer history and listing requests, not just the one that
+handled the chat. Each thread keeps its own connection.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "/tmp/calendarbot_sessions.db")
+EXPIRY_BATCH_SIZE = 200
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    last_activity REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    context TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS sessions_by_activity ON sessions (last_activity, session_id);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, id)
+) WITHOUT ROWID;
+"""
+
+
+def get_connection() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    # A connection opened before a fork (gunicorn --preload) must not be used by the child
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(SESSION_DB_PATH, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def ensure_session(session_id: str):
+    now = time.time()
+    get_connection().execute(
+        "INSERT OR IGNORE INTO sessions (session_id, created_at, last_activity) VALUES (?, ?, ?)",
+        (session_id, now, now)
+    )
+
+
+def get_session(session_id: str) -> Optional[Dict[str, Any]]:
+    row = get_connection().execute(
+        "SELECT * FROM sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    session = dict(row)
+    session["context"] = json.loads(session["context"])
+    return session
+
+
+def append_message(session_id: str, role: str, content: str) -> int:
+    """Append a message and return its id; ids start at 1 and are dense per session"""
+    conn = get_connection()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "INSERT OR IGNORE INTO sessions (session_id, created_at, last_activity) VALUES (?, ?, ?)",
+            (session_id, now, now)
+        )
+        conn.execute(
+            "UPDATE sessions SET message_count = message_count + 1, last_activity = ? WHERE session_id = ?",
+            (now, session_id)
+        )
+        message_id = conn.execute(
+            "SELECT message_count FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO messages (session_id, id, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+            (session_id, message_id, role, content, now)
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return message_id
+
+
+def set_context(session_id: str, context: Dict[str, Any]):
+    get_connection().execute(
+        "UPDATE sessions SET context = ? WHERE session_id = ?",
+        (json.dumps(context), session_id)
+    )
+
+
+def get_messages(session_id: str, after: int, limit: int) -> List[Dict[str, Any]]:
+    rows = get_connection().execute(
+        "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?",
+        (session_id, after, limit)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def delete_session(session_id: str) -> bool:
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        deleted = conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return deleted > 0
+
+
+def _encode_cursor(row) -> str:
+    return f"{row['last_activity']!r}|{row['session_id']}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    last_activity, session_id = cursor.split("|", 1)
+    return float(last_activity), session_id
+
+
+def list_sessions(limit: int = 50, cursor: Optional[str] = None, active_within_seconds: Optional[float] = None,
+                  min_messages: int = 0, prefix: Optional[str] = None) -> Dict[str, Any]:
+    """
+    One page of sessions, most recently active first.
+    Pages are keyset-paginated on (last_activity, session_id), so deep pages cost the same as the first.
+    """
+    filters = ["message_count >= ?"]
+    params: List[Any] = [min_messages]
+    if active_within_seconds is not None:
+        filters.append("last_activity >= ?")
+        params.append(time.time() - active_within_seconds)
+    if prefix:
+        filters.append("session_id >= ? AND session_id < ?")
+        params.extend([prefix, prefix + "\uffff"])
+    where = " AND ".join(filters)
+
+    conn = get_connection()
+    total = conn.execute(f"SELECT COUNT(*) FROM sessions WHERE {where}", params).fetchone()[0]
+
+    page_filters = where
+    page_params = list(params)
+    if cursor:
+        last_activity, session_id = _decode_cursor(cursor)
+        page_filters += " AND (last_activity < ? OR (last_activity = ? AND session_id < ?))"
+        page_params.extend([last_activity, last_activity, session_id])
+
+    rows = conn.execute(
+        f"SELECT session_id, created_at, last_activity, message_count FROM sessions "
+        f"WHERE {page_filters} ORDER BY last_activity DESC, session_id DESC LIMIT ?",
+        page_params + [limit + 1]
+    ).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "sessions": [dict(row) for row in rows],
+        "next_cursor": _encode_cursor(rows[-1]) if has_more else None,
+        "total": total
+    }
+
+
+def expire_batch(idle_seconds: Optional[float], batch_size: int = EXPIRY_BATCH_SIZE) -> int:
+    """
+    Delete up to batch_size sessions idle for longer than idle_seconds (all sessions when None).
+    Each batch is its own short transaction so other workers are never blocked for long.
+    """
+    conn = get_connection()
+    cutoff = time.time() - idle_seconds if idle_seconds is not None else float("inf")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        session_ids = [row[0] for row in conn.execute(
+            "SELECT session_id FROM sessions WHERE last_activity < ? ORDER BY last_activity LIMIT ?",
+            (cutoff, batch_size)
+        )]
+        if session_ids:
+            placeholders = ",".join("?" * len(session_ids))
+            conn.execute(f"DELETE FROM messages WHERE session_id IN ({placeholders})", session_ids)
+            conn.execute(f"DELETE FROM sessions WHERE session_id IN ({placeholders})", session_ids)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return len(session_ids)
+
+
+def count_sessions() -> int:
+    return get_connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def storage_stats(top: int = 10) -> Dict[str, Any]:
+    """Size of the shared store on disk and the sessions with the most message text"""
+    conn = get_connection()
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    try:
+        wal_bytes = os.path.getsize(SESSION_DB_PATH + "-wal")
+    except OSError:
+        wal_bytes = 0
+    sessions, messages = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(message_count), 0) FROM sessions"
+    ).fetchone()
+    largest = conn.execute(
+        "SELECT session_id, COUNT(*) AS messages, SUM(LENGTH(content)) AS content_bytes FROM messages "
+        "GROUP BY session_id ORDER BY content_bytes DESC LIMIT ?",
+        (top,)
+    ).fetchall()
+    return {
+        "sessions": sessions,
+        "messages": messages,
+        "db_mb": round(page_size * page_count / 2**20, 2),
+        "free_mb": round(page_size * free_pages / 2**20, 2),
+        "wal_mb": round(wal_bytes / 2**20, 2),
+        "largest": [dict(row) for row in largest]
+    }
@@ -0,0 +1,50 @@
+"""
+Vectorized interval primitives shared by slot suggestion and analytics.
+
+Times are integer epoch seconds in NumPy arrays. Busy intervals are merged
+once into sorted, disjoint blocks; after that any number of candidate
+slots is tested with a single searchsorted.
+"""
+import numpy as np
+
+
+def merge_intervals(starts: np.ndarray, ends: np.ndarray):
+    """Union of possibly overlapping intervals as sorted, disjoint (starts, ends)"""
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if starts.size == 0:
+        return starts, ends
+    order = np.argsort(starts, kind='stable')
+    starts = starts[order]
+    ends = np.maximum.accumulate(ends[order])
+    # A block starts wherever an interval begins after everything before it has ended
+    new_block = np.empty(starts.size, dtype=bool)
+    new_block[0] = True
+    new_block[1:] = starts[1:] > ends[:-1]
+    block_ids = np.cumsum(new_block) - 1
+    merged_starts = starts[new_block]
+    merged_ends = np.zeros(merged_starts.size, dtype=np.int64)
+    np.maximum.at(merged_ends, block_ids, ends)
+    return merged_starts, merged_ends
+
+
+def overlap_mask(busy_starts, busy_ends, starts, ends) -> np.ndarray:
+    """True for every interval [start, end) that overlaps some busy interval"""
+    merged_starts, merged_ends = merge_intervals(busy_starts, busy_ends)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if merged_starts.size == 0:
+        return np.zeros(starts.shape, dtype=bool)
+    # Blocks are disjoint, so their ends are sorted too: the first block ending after
+    # the interval starts is the only one that can overlap it
+    idx = np.searchsorted(merged_ends, starts, side='right')
+    in_range = idx < merged_starts.size
+    next_start = np.full(starts.shape, np.iinfo(np.int64).max, dtype=np.int64)
+    next_start[in_range] = merged_starts[idx[in_range]]
+    return next_start < ends
+
+
+def free_mask(busy_starts, busy_ends, candidate_starts, duration_seconds: int) -> np.ndarray:
+    """True for every candidate [start, start + duration) that overlaps no busy interval"""
+    candidate_starts = np.asarray(candidate_starts, dtype=np.int64)
+    return ~overlap_mask(busy_starts, busy_ends, candidate_starts, candidate_starts + duration_seconds)
@@ -0,0 +1,206 @@
+"""
+Versioned binary snapshot of the event mirror and its search index.
+
+sync_mirror writes the whole mirror window to one file; every gunicorn
+worker maps it read-only at boot, so a restart or deploy starts with a
+warm mirror and the pages are shared through the OS page cache instead of
+being rebuilt and held once per process. Nothing is parsed at load: the
+arrays below are NumPy views straight into the mapping and Event objects
+are only built for the days and search hits actually read.
+
+Layout (little endian, every section 8-byte aligned):
+    header   MAGIC, VERSION, term width, synced_at, section table
+    starts   int64 epoch seconds, events sorted by start
+    ends     int64 epoch seconds
+    all_day  uint8
+    fields   uint64 offsets into strings, 5 per event (id, summary, description, attendees, uid)
+    strings  UTF-8 blob; attendees are joined with FIELD_SEPARATOR
+    days     S10 'YYYY-MM-DD' (IST), sorted, including days known to be empty
+    day_ptr  uint32 CSR offsets into day_events
+    day_events  uint32 event indices
+    terms    S<term width>, sorted
+    term_ptr uint32 CSR offsets into postings
+    postings uint32 event indices, ascending (= start order)
+"""
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Iterable, Iterator
+
+import numpy as np
+
+from backend.events import Event
+from backend.event_index import tokenize, STOPWORDS, _event_tokens
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "/tmp/calendarbot_mirror.snap")
+
+MAGIC = b"CALSNAP\0"
+VERSION = 2
+FIELD_SEPARATOR = "\x1f"
+FIELDS_PER_EVENT = 5
+
+SECTIONS = [
+    ("starts", "<i8"), ("ends", "<i8"), ("all_day", "u1"), ("fields", "<u8"), ("strings", "u1"),
+    ("days", "S10"), ("day_ptr", "<u4"), ("day_events", "<u4"),
+    ("terms", None), ("term_ptr", "<u4"), ("postings", "<u4"),
+]
+_HEADER = struct.Struct("<8sIId")
+_SECTION = struct.Struct("<QQ")
+HEADER_SIZE = _HEADER.size + _SECTION.size * len(SECTIONS)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _csr(groups: List[List[int]]):
+    ptr = np.zeros(len(groups) + 1, dtype="<u4")
+    ptr[1:] = np.cumsum([len(group) for group in groups])
+    flat = np.fromiter((i for group in groups for i in group), dtype="<u4", count=int(ptr[-1]))
+    return ptr, flat
+
+
+def write(days: Dict[str, List[Event]], synced_at: float, path: str = SNAPSHOT_PATH):
+    """Write the mirror (IST day -> events) atomically; readers keep their old mapping until they reopen"""
+    unique = {}
+    for day_events in days.values():
+        for event in day_events:
+            unique.setdefault(event.id, event)
+    events = sorted(unique.values())
+    position = {event.id: i for i, event in enumerate(events)}
+
+    blob = bytearray()
+    fields = np.zeros(len(events) * FIELDS_PER_EVENT + 1, dtype="<u8")
+    for i, event in enumerate(events):
+        for j, text in enumerate((event.id, event.summary, event.description or '', FIELD_SEPARATOR.join(event.attendees), event.uid)):
+            blob += text.encode("utf-8")
+            fields[i * FIELDS_PER_EVENT + j + 1] = len(blob)
+
+    day_names = sorted(days)
+    day_ptr, day_events = _csr([sorted(position[event.id] for event in days[day]) for day in day_names])
+
+    postings: Dict[str, List[int]] = {}
+    for i, event in enumerate(events):
+        for token in _event_tokens(event):
+            postings.setdefault(token, []).append(i)
+    term_names = sorted(postings)
+    encoded_terms = [term.encode("utf-8") for term in term_names]
+    term_width = max((len(term) for term in encoded_terms), default=1)
+    term_ptr, posting_list = _csr([postings[term] for term in term_names])
+
+    arrays = {
+        "starts": np.fromiter((event.start for event in events), dtype="<i8", count=len(events)),
+        "ends": np.fromiter((event.end for event in events), dtype="<i8", count=len(events)),
+        "all_day": np.fromiter((event.all_day for event in events), dtype="u1", count=len(events)),
+        "fields": fields,
+        "strings": np.frombuffer(bytes(blob), dtype="u1"),
+        "days": np.array([day.encode("ascii") for day in day_names], dtype="S10"),
+        "day_ptr": day_ptr,
+        "day_events": day_events,
+        "terms": np.array(encoded_terms, dtype=f"S{term_width}"),
+        "term_ptr": term_ptr,
+        "postings": posting_list,
+    }
+
+    table = []
+    offset = HEADER_SIZE
+    for name, _ in SECTIONS:
+        offset = _align(offset)
+        table.append((offset, arrays[name].nbytes))
+        offset += arrays[name].nbytes
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, term_width, synced_at))
+        for section_offset, length in table:
+            f.write(_SECTION.pack(section_offset, length))
+        for (name, _), (section_offset, _) in zip(SECTIONS, table):
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(arrays[name].tobytes())
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Read-only view of a snapshot file; arrays point into the shared mapping"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, term_width, self.synced_at = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"unsupported snapshot format {magic!r} v{version}")
+        for index, (name, dtype) in enumerate(SECTIONS):
+            offset, length = _SECTION.unpack_from(self._map, _HEADER.size + index * _SECTION.size)
+            dtype = np.dtype(dtype or f"S{term_width}")
+            setattr(self, name, np.frombuffer(self._map, dtype=dtype, count=length // dtype.itemsize, offset=offset))
+
+    def __len__(self) -> int:
+        return self.starts.size
+
+    def age(self) -> float:
+        return time.time() - self.synced_at
+
+    def _text(self, index: int) -> str:
+        return bytes(self.strings[self.fields[index]:self.fields[index + 1]]).decode("utf-8")
+
+    def event(self, i: int) -> Event:
+        base = int(i) * FIELDS_PER_EVENT
+        attendees = self._text(base + 3)
+        return Event(
+            self._text(base), self._text(base + 1), int(self.starts[i]), int(self.ends[i]),
+            bool(self.all_day[i]), self._text(base + 2),
+            tuple(attendees.split(FIELD_SEPARATOR)) if attendees else (),
+            self._text(base + 4)
+        )
+
+    def events_on(self, day: str) -> Optional[List[Event]]:
+        """Events of an IST day, or None when the day is outside the snapshot"""
+        key = day.encode("ascii")
+        k = int(np.searchsorted(self.days, key))
+        if k == self.days.size or self.days[k] != key:
+            return None
+        return [self.event(i) for i in self.day_events[self.day_ptr[k]:self.day_ptr[k + 1]]]
+
+    def _postings(self, term: str) -> np.ndarray:
+        for candidate in (term, term[:-1] if term.endswith('s') else None):
+            if not candidate:
+                continue
+            key = candidate.encode("utf-8")
+            k = int(np.searchsorted(self.terms, key))
+            if k < self.terms.size and self.terms[k] == key:
+                return self.postings[self.term_ptr[k]:self.term_ptr[k + 1]]
+        return self.postings[:0]
+
+    def search(self, terms: Iterable[str], start_ts: Optional[float] = None,
+               end_ts: Optional[float] = None) -> Iterator[Event]:
+        """Events containing every term and starting within [start_ts, end_ts), earliest first"""
+        query = [term for term in (token for t in terms for token in tokenize(t)) if term not in STOPWORDS]
+        if not query:
+            return
+        posting_sets = sorted((self._postings(term) for term in query), key=len)
+        matches = posting_sets[0]
+        for postings in posting_sets[1:]:
+            matches = np.intersect1d(matches, postings, assume_unique=True)
+        starts = self.starts[matches]
+        keep = np.ones(matches.size, dtype=bool)
+        if start_ts is not None:
+            keep &= starts >= start_ts
+        if end_ts is not None:
+            keep &= starts < end_ts
+        for i in matches[keep]:
+            yield self.event(i)
+
+
+def open_snapshot(path: str = SNAPSHOT_PATH, current: Optional[Snapshot] = None) -> Optional[Snapshot]:
+    """Map the snapshot at path; returns current unchanged if the file was not replaced since"""
+    try:
+        if current is not None and os.stat(path).st_ino == current.inode:
+            return current
+        return Snapshot(path)
+    except FileNotFoundError:
+        return current
+    except (OSError, ValueError, struct.error) as e:
+        print(f"⚠️ Ignoring event snapshot {path}: {e}")
+        return current
@@ -0,0 +1,111 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "test_create_event.snap"))
+# No service account here; every API call goes to FakeService below
+with mock.patch("google.oauth2.service_account.Credentials.from_service_account_file"):
+    from backend import calendar_api, event_cache
+
+
+class FakeRequest:
+    def __init__(self, run):
+        self.run = run
+
+    def execute(self):
+        return self.run()
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({"status": status}), b"")
+
+
+class FakeEvents:
+    """events() of a Calendar holding timed events in a dict by id"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def list(self, calendarId, timeMin, timeMax, **kwargs):
+        start, end = datetime.fromisoformat(timeMin), datetime.fromisoformat(timeMax)
+        return FakeRequest(lambda: {"items": [
+            event for event in self.store.values()
+            if datetime.fromisoformat(event['start']['dateTime']) < end
+            and datetime.fromisoformat(event['end']['dateTime']) > start
+        ]})
+
+    def get(self, calendarId, eventId):
+        def run():
+            if eventId not in self.store:
+                raise http_error(404)
+            return self.store[eventId]
+        return FakeRequest(run)
+
+    def insert(self, calendarId, body):
+        def run():
+            event_id = body.get('id') or f"evt{len(self.store)}"
+            if event_id in self.store:
+                raise http_error(409)
+            self.store[event_id] = dict(body, id=event_id)
+            return self.store[event_id]
+        return FakeRequest(run)
+
+
+class FakeService:
+    def __init__(self):
+        self.store = {}
+
+    def events(self):
+        return FakeEvents(self.store)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = FakeService()
+    monkeypatch.setattr(calendar_api, "get_service", lambda: fake)
+    monkeypatch.setattr(event_cache, "_days", {})
+    monkeypatch.setattr(event_cache, "_pending", {})
+    return fake
+
+
+def slot():
+    return (datetime.now() + timedelta(days=3)).replace(hour=15, minute=0, second=0, microsecond=0).isoformat()
+
+
+def test_retried_write_returns_the_event_it_created(service):
+    event_id = calendar_api.write_event_id("job-1")
+    first = calendar_api.create_event(slot(), 30, "Bob", event_id=event_id)
+    # e.g. the job's worker died after the insert and the job ran again
+    second = calendar_api.create_event(slot(), 30, "Bob", event_id=event_id)
+    assert "error" not in first and "error" not in second
+    assert first["id"] == second["id"] == event_id
+    assert list(service.store) == [event_id]
+
+
+def test_insert_under_an_existing_id_returns_that_event(service):
+    event_id = calendar_api.write_event_id("job-2")
+    body = {"summary": "Bob", "start": {"dateTime": slot() + "+05:30"}, "end": {"dateTime": slot() + "+05:30"}}
+    created = calendar_api._insert_once(body, event_id)
+    assert calendar_api._insert_once(body, event_id) == created
+    assert len(service.store) == 1
+
+
+def test_other_writes_still_conflict(service):
+    calendar_api.create_event(slot(), 30, "Bob", event_id=calendar_api.write_event_id("job-3"))
+    second = calendar_api.create_event(slot(), 30, "Alice", event_id=calendar_api.write_event_id("job-4"))
+    assert "Time slot not available" in second["error"]
+    assert len(service.store) == 1
+
+
+def test_write_event_id_is_valid_base32hex():
+    event_id = calendar_api.write_event_id("3f2a9c")
+    assert event_id == calendar_api.write_event_id("3f2a9c")
+    assert set(event_id) <= set("0123456789abcdefghijklmnopqrstuv")
+    assert 5 <= len(event_id) <= 1024
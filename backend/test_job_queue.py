@@ -0,0 +1,58 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend import job_queue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_DB_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(job_queue, "_local", threading.local())
+    monkeypatch.setattr(job_queue, "_listeners", [])
+    monkeypatch.setattr(job_queue, "_handlers", {})
+    return job_queue
+
+
+def expire_lease(queue, job_id):
+    queue.get_connection().execute("UPDATE jobs SET leased_until = 0 WHERE job_id = ?", (job_id,))
+
+
+def test_handler_gets_the_job_id(queue):
+    queue.register("echo", lambda payload: {"status": "success", "seen": payload})
+    job_id = queue.enqueue("echo", {"title": "Sync"})
+    queue._run(queue._claim())
+    job = queue.get_job(job_id)
+    assert job["status"] == "done"
+    assert job["result"]["seen"] == {"title": "Sync", "job_id": job_id}
+
+
+def test_expired_lease_is_claimed_again(queue):
+    job_id = queue.enqueue("book_meeting", {})
+    assert queue._claim()["attempts"] == 1
+    assert queue._claim() is None
+    expire_lease(queue, job_id)
+    job = queue._claim()
+    assert job["job_id"] == job_id
+    assert job["attempts"] == 2
+
+
+def test_job_that_keeps_losing_its_worker_fails(queue):
+    finished = []
+    queue.subscribe(finished.append)
+    job_id = queue.enqueue("book_meeting", {})
+    for attempt in range(1, queue.JOB_MAX_ATTEMPTS + 1):
+        assert queue._claim()["attempts"] == attempt
+        expire_lease(queue, job_id)
+
+    assert queue._claim() is None
+    job = queue.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["attempts"] == queue.JOB_MAX_ATTEMPTS
+    assert job["result"] == queue.LOST_WORKER_RESULT
+    assert [(job["job_id"], job["status"]) for job in finished] == [(job_id, "failed")]
+    # Failed for good: never claimed again
+    assert queue._claim() is None
@@ -0,0 +1,91 @@
+"""
+Time core: cached zone objects and epoch-second conversions.
+
+Inside the backend every instant is an integer UTC epoch second and every
+interval a half-open [start, end) pair of them (Event, the slot arrays, the
+snapshot). Wall-clock values enter through local_epoch()/day_epoch() when a
+request is parsed and leave through format_epoch()/local_time() when a
+reply or an API body is built; nothing in between formats or re-parses
+time strings. Zones are resolved once per name instead of per call, as
+stdlib ZoneInfo objects (C-accelerated conversions) where the system has
+the zone, otherwise through dateutil.
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from dateutil import tz
+
+CALENDAR_TIMEZONE = "Asia/Kolkata"
+WALL_FORMAT = "%Y-%m-%d %H:%M"
+# Zone names seen from clients; unknown names are cached as None too
+ZONE_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE)
+def zone(name: Optional[str] = CALENDAR_TIMEZONE):
+    """tzinfo for an IANA name (None if unknown, as tz.gettz)"""
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        # POSIX TZ strings, missing tz database, unknown names
+        return tz.gettz(name)
+
+
+CALENDAR_TZ = zone(CALENDAR_TIMEZONE)
+
+
+def local_epoch(wall: Union[str, datetime], zone_name: str = CALENDAR_TIMEZONE) -> int:
+    """Epoch seconds of a naive wall-clock time (datetime or ISO string) in zone_name"""
+    if isinstance(wall, str):
+        wall = datetime.fromisoformat(wall)
+    return int(wall.replace(tzinfo=zone(zone_name)).timestamp())
+
+
+def day_epoch(date_str: str, zone_name: str = CALENDAR_TIMEZONE, hour: int = 0, minute: int = 0) -> int:
+    """Epoch seconds of hour:minute on a YYYY-MM-DD date in zone_name"""
+    return int(datetime.strptime(date_str, "%Y-%m-%d").replace(hour=hour, minute=minute, tzinfo=zone(zone_name)).timestamp())
+
+
+def day_bounds(date_str: str, zone_name: str = CALENDAR_TIMEZONE) -> Tuple[int, int]:
+    """[local midnight, next local midnight) of a YYYY-MM-DD date as epoch seconds"""
+    day_start = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=zone(zone_name))
+    return int(day_start.timestamp()), int((day_start + timedelta(days=1)).timestamp())
+
+
+def local_time(epoch: int, zone_name: str = CALENDAR_TIMEZONE) -> datetime:
+    return datetime.fromtimestamp(epoch, zone(zone_name))
+
+
+def format_epoch(epoch: int, zone_name: str = CALENDAR_TIMEZONE, fmt: str = WALL_FORMAT) -> str:
+    return datetime.fromtimestamp(epoch, zone(zone_name)).strftime(fmt)
+
+
+def clock_labels(epochs, zone_name: str = CALENDAR_TIMEZONE) -> List[str]:
+    """HH:MM wall-clock labels of epoch seconds, by integer arithmetic when one UTC offset covers them all"""
+    epochs = [int(epoch) for epoch in epochs]
+    if not epochs:
+        return []
+    first, last = local_time(min(epochs), zone_name), local_time(max(epochs), zone_name)
+    if first.utcoffset() != last.utcoffset():
+        # A DST change inside the span: convert each one
+        return [format_epoch(epoch, zone_name, "%H:%M") for epoch in epochs]
+    offset = int(first.utcoffset().total_seconds())
+    return [f"{(epoch + offset) // 3600 % 24:02d}:{(epoch + offset) // 60 % 60:02d}" for epoch in epochs]
+
+
+def calendar_day(epoch: int) -> str:
+    """The calendar's (IST) day of an instant, YYYY-MM-DD"""
+    return datetime.fromtimestamp(epoch, CALENDAR_TZ).strftime("%Y-%m-%d")
+
+
+def calendar_days(start: int, end: int) -> List[str]:
+    """Calendar (IST) days touched by [start, end); at least the day of start"""
+    day = datetime.fromtimestamp(start, CALENDAR_TZ).date()
+    last_day = datetime.fromtimestamp(max(start, end - 1), CALENDAR_TZ).date()
+    days = []
+    while day <= last_day:
+        days.append(day.strftime("%Y-%m-%d"))
+        day += timedelta(days=1)
+    return days
@@ -0,0 +1,188 @@
+"""
+Accuracy and throughput of the agent's rule-based language parsing.
+
+Runs every utterance of a labelled corpus (make_nlu_corpus.py) through
+is_availability_request, is_booking_request, extract_availability_request,
+extract_comprehensive_booking_info and parse_relative_date. The clock is
+fixed at the reference time in the corpus header, so the date labels stay
+valid whatever day the benchmark runs on. The corpus is split into shards
+across a process pool, since the parsers are pure Python and CPU bound.
+
+Reports utterances per second, per-field accuracy (with sample misses),
+the mean and 99th percentile time of each parser and the slowest inputs.
+An input's time is its best over the --repeat passes, so one preempted
+run does not put it at the top of the list.
+
+    python benchmarks/bench_nlu.py [--corpus benchmarks/nlu_corpus.jsonl] [--workers 4] [--repeat 1]
+                                   [--slowest 10] [--misses 3] [--json results.json]
+
+Imports agents.agent1, so it runs in the server's environment (.env,
+service account file), like the other benchmarks.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+DEFAULT_CORPUS = os.path.join(ROOT, "benchmarks", "nlu_corpus.jsonl")
+SHARD_SIZE = 200
+
+# Set in each worker by init_worker()
+agent = None
+reference = None
+
+
+def load_corpus(path):
+    """(reference datetime, [records]) of a corpus file"""
+    with open(path) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    return datetime.fromisoformat(lines[0]["reference"]), lines[1:]
+
+
+def init_worker(reference_iso):
+    global agent, reference
+    sys.path.append(ROOT)
+    from agents import agent1
+    agent = agent1
+    reference = datetime.fromisoformat(reference_iso)
+
+
+def timed(fn, *args):
+    started = time.perf_counter_ns()
+    result = fn(*args)
+    return result, time.perf_counter_ns() - started
+
+
+def evaluate(record):
+    """(fields {name: (expected, got)}, parser timings {name: ns}) of one utterance"""
+    text, expect = record["text"], record["expect"]
+    fields, timings = {}, {}
+
+    is_availability, timings["is_availability_request"] = timed(agent.is_availability_request, text)
+    is_booking, timings["is_booking_request"] = timed(agent.is_booking_request, text)
+    fields["intent.availability"] = (expect["availability"], is_availability)
+    fields["intent.booking"] = (expect["booking"], is_booking)
+
+    if "date_phrase" in expect:
+        date, timings["parse_relative_date"] = timed(agent.parse_relative_date, expect["date_phrase"], reference)
+        fields["parse_relative_date"] = (expect["date"], date)
+
+    if expect["availability"]:
+        request, timings["extract_availability_request"] = timed(agent.extract_availability_request, text)
+        resolved = agent.parse_relative_date(request["date"], reference) if request["date"] else None
+        fields["availability.date"] = (expect["date"], resolved)
+        fields["availability.time_start"] = (expect["time_start"], request["time_start"])
+        fields["availability.time_end"] = (expect["time_end"], request["time_end"])
+
+    if expect["booking"]:
+        info, timings["extract_comprehensive_booking_info"] = timed(agent.extract_comprehensive_booking_info, text, reference)
+        for field in ("title", "date", "time", "duration_minutes"):
+            fields[f"booking.{field}"] = (expect[field], info[field])
+
+    return fields, timings
+
+
+def run_shard(shard):
+    """Per-utterance results of a shard, plus the CPU time it took"""
+    started = time.process_time()
+    results = []
+    for record in shard:
+        fields, timings = evaluate(record)
+        results.append((record["text"], fields, timings))
+    return results, time.process_time() - started
+
+
+def shards(records, size):
+    return [records[i:i + size] for i in range(0, len(records), size)]
+
+
+def summarize(results):
+    accuracy, parser_ns, best_ns = {}, {}, {}
+    for text, fields, timings in results:
+        for name, (expected, got) in fields.items():
+            stats = accuracy.setdefault(name, {"n": 0, "correct": 0, "misses": []})
+            stats["n"] += 1
+            if expected == got:
+                stats["correct"] += 1
+            else:
+                stats["misses"].append({"text": text, "expected": expected, "got": got})
+        for name, ns in timings.items():
+            parser_ns.setdefault(name, []).append(ns)
+        total = sum(timings.values())
+        best_ns[text] = min(total, best_ns.get(text, total))
+    slowest = sorted(((ns, text) for text, ns in best_ns.items()), reverse=True)
+    return accuracy, parser_ns, slowest
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the corpus, for steadier throughput figures")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--slowest", type=int, default=10, help="slowest inputs to list")
+    parser.add_argument("--misses", type=int, default=3, help="sample misses to list per field")
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    reference_date, records = load_corpus(args.corpus)
+    work = shards(records * args.repeat, args.shard_size)
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(reference_date.isoformat(),)) as pool:
+        # Start every worker (and its import) before the clock starts
+        list(pool.map(time.sleep, [0.05] * args.workers))
+        started = time.perf_counter()
+        shard_results = list(pool.map(run_shard, work))
+        wall_seconds = time.perf_counter() - started
+
+    results = [result for shard, _ in shard_results for result in shard]
+    cpu_seconds = sum(cpu for _, cpu in shard_results)
+    accuracy, parser_ns, slowest = summarize(results)
+
+    print(f"{len(records)} utterances x {args.repeat} on {args.workers} workers, reference {reference_date:%Y-%m-%d %H:%M}")
+    print(f"{len(results) / wall_seconds:,.0f} utterances/s wall, {len(results) / cpu_seconds:,.0f} per CPU-second\n")
+
+    header = f"{'field':<34}{'n':>7}{'accuracy':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in accuracy.items():
+        print(f"{name:<34}{stats['n'] // args.repeat:>7}{stats['correct'] / stats['n']:>10.1%}")
+        # The first pass has every distinct miss; later passes repeat them
+        for miss in stats["misses"][:args.misses]:
+            print(f"    {miss['text']!r}: expected {miss['expected']!r}, got {miss['got']!r}")
+
+    print(f"\n{'parser':<38}{'mean us':>9}{'p99 us':>9}")
+    for name, samples in parser_ns.items():
+        print(f"{name:<38}{sum(samples) / len(samples) / 1000:>9.1f}{percentile(samples, 0.99) / 1000:>9.1f}")
+
+    print(f"\nslowest {args.slowest} inputs (all parsers, best of {args.repeat})")
+    for ns, text in slowest[:args.slowest]:
+        print(f"{ns / 1000:>9.1f} us  {text}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "reference": reference_date.isoformat(),
+                "utterances": len(results),
+                "workers": args.workers,
+                "utterances_per_second": len(results) / wall_seconds,
+                "utterances_per_cpu_second": len(results) / cpu_seconds,
+                "accuracy": {name: stats["correct"] / stats["n"] for name, stats in accuracy.items()},
+                "parser_mean_us": {name: sum(samples) / len(samples) / 1000 for name, samples in parser_ns.items()},
+                "parser_p99_us": {name: percentile(samples, 0.99) / 1000 for name, samples in parser_ns.items()},
+                "slowest": [{"us": ns / 1000, "text": text} for ns, text in slowest[:args.slowest]],
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
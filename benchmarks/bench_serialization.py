@@ -0,0 +1,123 @@
+"""
+Serialization micro-benchmark for the API's main payloads.
+
+Compares the stdlib json encoder (FastAPI's default JSONResponse path)
+with orjson, and reports bytes on the wire raw, gzipped and, when the
+brotli package is installed, brotli-compressed.
+
+    python benchmarks/bench_serialization.py [--repeat 2000]
+"""
+import argparse
+import gzip
+import json
+import time
+
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def chat_payload():
+    return {
+        "response": "Not available on Tuesday, October 20, 2026 around 14:00. Available slots: 9:00 AM, 10:00 AM, 11:00 AM, 12:00 PM, 1:00 PM",
+        "status": "success",
+        "conversation_context": {
+            "last_topic": "availability",
+            "last_date_mentioned": "tomorrow",
+            "last_time_mentioned": "14:00"
+        },
+        "message_id": 42
+    }
+
+
+def history_payload(num_messages):
+    messages = []
+    for i in range(1, num_messages + 1):
+        if i % 2:
+            content = "Am I free tomorrow afternoon or on Friday morning?"
+        else:
+            content = "You're free on 1 of 2 days around 14:00:\n• Tuesday, October 20: busy around 14:00\n• Friday, October 23: free around 14:00"
+        messages.append({"id": i, "role": "user" if i % 2 else "assistant", "content": content})
+    return {
+        "session_id": "5b0e7f4c-2f0a-4f7e-9d8e-0f4c1f7b9a11",
+        "messages": messages,
+        "context": {"last_topic": "availability", "last_date_mentioned": "tomorrow", "last_time_mentioned": "14:00"},
+        "next_cursor": num_messages,
+        "has_more": False,
+        "has_earlier": False,
+        "total_messages": num_messages
+    }
+
+
+def events_payload(num_events):
+    events = []
+    for i in range(num_events):
+        hour = 9 + i % 9
+        events.append({
+            "kind": "calendar#event",
+            "etag": f"\"33{i:010d}\"",
+            "id": f"evt{i:06d}abcdefghij",
+            "status": "confirmed",
+            "htmlLink": f"https://www.google.com/calendar/event?eid=evt{i:06d}",
+            "created": "2026-10-01T08:00:00.000Z",
+            "updated": "2026-10-01T08:00:00.000Z",
+            "summary": "Team Standup" if i % 3 else "Meeting With John",
+            "description": "Booked via chatbot",
+            "creator": {"email": "calendarbot@example.iam.gserviceaccount.com"},
+            "organizer": {"email": "yourcalendar7@gmail.com", "self": True},
+            "start": {"dateTime": f"2026-10-20T{hour:02d}:00:00+05:30", "timeZone": "Asia/Kolkata"},
+            "end": {"dateTime": f"2026-10-20T{hour:02d}:30:00+05:30", "timeZone": "Asia/Kolkata"},
+            "iCalUID": f"evt{i:06d}@google.com",
+            "sequence": 0,
+            "reminders": {"useDefault": True},
+            "eventType": "default"
+        })
+    return {"date": "2026-10-20", "timezone": "Asia/Kolkata", "events": events, "total_events": num_events}
+
+
+def stdlib_dumps(content):
+    # Mirrors starlette.responses.JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def time_per_call(func, content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(content)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    payloads = [
+        ("/chat", chat_payload()),
+        ("/conversation/{id} (50 msgs)", history_payload(50)),
+        ("/conversation/{id} (200 msgs)", history_payload(200)),
+        ("/events (100 events)", events_payload(100)),
+    ]
+
+    header = f"{'endpoint':<32}{'json µs':>10}{'orjson µs':>11}{'speedup':>9}{'raw B':>9}{'gzip B':>9}"
+    if brotli is not None:
+        header += f"{'br B':>9}"
+    print(header)
+    print("-" * len(header))
+
+    for name, content in payloads:
+        stdlib_us = time_per_call(stdlib_dumps, content, args.repeat)
+        orjson_us = time_per_call(orjson.dumps, content, args.repeat)
+        body = orjson.dumps(content)
+        line = (f"{name:<32}{stdlib_us:>10.1f}{orjson_us:>11.1f}{stdlib_us / orjson_us:>8.1f}x"
+                f"{len(body):>9}{len(gzip.compress(body, compresslevel=9)):>9}")
+        if brotli is not None:
+            line += f"{len(brotli.compress(body, quality=4)):>9}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Boot time and memory of the gunicorn deployment with and without preloading.
+
+Starts `gunicorn main:app -c gunicorn.conf.py` from backend/ once per mode
+(GUNICORN_PRELOAD=0 and =1), waits until every worker has logged
+"Application startup complete", then reads RSS and PSS of the master and
+each worker from /proc (Linux only). PSS charges shared pages to the
+processes sharing them, so the PSS total is what the deployment really
+occupies; RSS counts every copy-on-write page again in each worker.
+
+    python benchmarks/bench_startup.py [--workers 4] [--rounds 3]
+
+Runs in the server's environment (service account file, .env).
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+READY_LINE = "Application startup complete"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def child_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def memory_kb(pid):
+    """(rss, pss) of a process in kB"""
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                usage[key] = int(value.split()[0])
+    return usage["Rss"], usage["Pss"]
+
+
+def boot(workers, preload, timeout, settle):
+    """Start the server, wait for every worker, measure, stop it"""
+    env = dict(os.environ, GUNICORN_PRELOAD="1" if preload else "0",
+               WEB_CONCURRENCY=str(workers), PORT=str(free_port()))
+    ready = threading.Semaphore(0)
+
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py"],
+                            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+
+    def watch_log():
+        # Keep draining the log so the server never blocks on a full pipe
+        for line in proc.stderr:
+            if READY_LINE in line:
+                ready.release()
+
+    threading.Thread(target=watch_log, daemon=True).start()
+    try:
+        for _ in range(workers):
+            if not ready.acquire(timeout=max(started + timeout - time.perf_counter(), 0)):
+                raise RuntimeError(f"workers not ready after {timeout}s (exit code {proc.poll()})")
+        boot_seconds = time.perf_counter() - started
+        time.sleep(settle)
+        master = memory_kb(proc.pid)
+        worker_usage = [memory_kb(pid) for pid in child_pids(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    return {
+        "boot_s": boot_seconds,
+        "master_rss_mb": master[0] / 1024,
+        "worker_rss_mb": sum(rss for rss, _ in worker_usage) / 1024,
+        "total_pss_mb": (master[1] + sum(pss for _, pss in worker_usage)) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds to wait after boot before measuring")
+    args = parser.parse_args()
+
+    header = f"{'mode':<12}{'boot s':>9}{'master RSS MB':>15}{'workers RSS MB':>16}{'total PSS MB':>14}"
+    print(f"{args.workers} workers, median of {args.rounds} rounds")
+    print(header)
+    print("-" * len(header))
+
+    medians = {}
+    for name, preload in (("per-worker", False), ("preload", True)):
+        runs = [boot(args.workers, preload, args.timeout, args.settle) for _ in range(args.rounds)]
+        medians[name] = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        m = medians[name]
+        print(f"{name:<12}{m['boot_s']:>9.2f}{m['master_rss_mb']:>15.1f}{m['worker_rss_mb']:>16.1f}{m['total_pss_mb']:>14.1f}")
+
+    before, after = medians["per-worker"], medians["preload"]
+    print(f"\npreload saves {before['total_pss_mb'] - after['total_pss_mb']:.1f} MB PSS "
+          f"({1 - after['total_pss_mb'] / before['total_pss_mb']:.0%}) and boots "
+          f"{before['boot_s'] / after['boot_s']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Generate the labelled utterance corpus for bench_nlu.py.
+
+Utterances are built from templates whose slots (day phrase, clock time,
+duration, person, topic) are drawn with a fixed seed, and every label is
+computed from the slot values against the reference clock, never from the
+parsers being measured. The first line is a header carrying that
+reference; every other line is {"text": ..., "expect": {...}}.
+
+    python benchmarks/make_nlu_corpus.py [--count 1200] [--seed 7] > benchmarks/nlu_corpus.jsonl
+
+Label conventions (the ones the agent is meant to follow):
+  'friday', 'on friday', 'this/next/coming friday': the next friday after
+      the reference day (a week ahead when it is that weekday already)
+  'next week friday': friday of the following Monday-to-Sunday week
+  'the 25th': that day this month, next month once it has passed
+  'october 28', '28th october': that date, next year once it has passed
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+REFERENCE = datetime(2026, 10, 19, 9, 0)
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+PEOPLE = ["john", "priya", "maria", "alex", "rahul", "sarah", "chen", "fatima", "david", "aisha"]
+TOPICS = ["design review", "budget", "sprint planning", "hiring", "roadmap", "onboarding"]
+# (phrase, minutes)
+DURATIONS = [("30 minutes", 30), ("45 minutes", 45), ("1 hour", 60), ("an hour", 60),
+             ("90 minutes", 90), ("half an hour", 30), ("2 hours", 120), ("45 min", 45)]
+
+
+def ordinal(day):
+    suffix = "th" if 10 <= day % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+    return f"{day}{suffix}"
+
+
+def next_weekday(reference, index):
+    days_ahead = (index - reference.weekday()) % 7 or 7
+    return reference + timedelta(days=days_ahead)
+
+
+def date_phrase(rng, reference):
+    """(phrase as typed, phrase as a standalone date, YYYY-MM-DD)"""
+    kind = rng.choice(["today", "tomorrow", "day_after", "weekday", "on_weekday", "prefixed_weekday",
+                       "next_week", "ordinal", "month_day", "day_month"])
+    if kind == "today":
+        return "today", "today", reference.strftime("%Y-%m-%d")
+    if kind == "tomorrow":
+        return "tomorrow", "tomorrow", (reference + timedelta(days=1)).strftime("%Y-%m-%d")
+    if kind == "day_after":
+        return "day after tomorrow", "day after tomorrow", (reference + timedelta(days=2)).strftime("%Y-%m-%d")
+
+    index = rng.randrange(7)
+    day = WEEKDAYS[index]
+    if kind in ("weekday", "on_weekday", "prefixed_weekday"):
+        target = next_weekday(reference, index).strftime("%Y-%m-%d")
+        if kind == "weekday":
+            return day, day, target
+        if kind == "on_weekday":
+            return f"on {day}", day, target
+        phrase = f"{rng.choice(['this', 'next', 'coming'])} {day}"
+        return phrase, phrase, target
+    if kind == "next_week":
+        monday = reference + timedelta(days=7 - reference.weekday())
+        return f"next week {day}", f"next week {day}", (monday + timedelta(days=index)).strftime("%Y-%m-%d")
+
+    if kind == "ordinal":
+        day_of_month = rng.randint(1, 28)
+        year, month = reference.year, reference.month
+        if day_of_month < reference.day:
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        phrase = f"the {ordinal(day_of_month)}"
+        return phrase, ordinal(day_of_month), datetime(year, month, day_of_month).strftime("%Y-%m-%d")
+
+    target = (reference + timedelta(days=rng.randint(1, 60))).date()
+    month = MONTHS[target.month - 1]
+    if kind == "month_day":
+        phrase = f"{month} {target.day}"
+    else:
+        phrase = f"{ordinal(target.day)} {month}"
+    return phrase, phrase, target.strftime("%Y-%m-%d")
+
+
+def clock_time(rng):
+    """(phrase, HH:MM) within business hours"""
+    hour = rng.randint(9, 17)
+    minute = rng.choice([0, 0, 0, 30, 15, 45])
+    hour12, meridiem = (hour - 12 if hour > 12 else hour), ("pm" if hour >= 12 else "am")
+    if minute:
+        phrase = f"{hour12}:{minute:02d}{rng.choice(['', ' '])}{meridiem}"
+    else:
+        phrase = f"{hour12}{rng.choice(['', ' '])}{meridiem}"
+    return phrase, f"{hour:02d}:{minute:02d}"
+
+
+def capitalize(rng, text):
+    return text[0].upper() + text[1:] if rng.random() < 0.7 else text
+
+
+def availability(rng, reference):
+    phrase, standalone, date = date_phrase(rng, reference)
+    expect = {"availability": True, "booking": False, "date_phrase": standalone, "date": date,
+              "time_start": None, "time_end": None}
+    form = rng.randrange(6)
+    if form == 0:
+        text = f"am I free {phrase}?"
+    elif form == 1:
+        time_text, expect["time_start"] = clock_time(rng)
+        text = f"am I free {phrase} at {time_text}?"
+    elif form == 2:
+        start = rng.randint(9, 15)
+        end = start + rng.randint(1, 3)
+        expect["time_start"], expect["time_end"] = f"{start:02d}:00", f"{end:02d}:00"
+        fmt = lambda hour: f"{hour - 12 if hour > 12 else hour}{'pm' if hour >= 12 else 'am'}"
+        text = f"check my availability {phrase} from {fmt(start)} to {fmt(end)}"
+    elif form == 3:
+        text = f"do I have any meetings {phrase}?"
+    elif form == 4:
+        part, expect["time_start"] = rng.choice([("morning", "09:00"), ("afternoon", "14:00"), ("evening", "18:00")])
+        text = f"are you free {phrase} {part}?" if phrase.startswith(("on ", "the ")) else f"are you free {phrase} in the {part}?"
+    else:
+        time_text, expect["time_start"] = clock_time(rng)
+        text = f"is {time_text} {phrase} available?"
+    return capitalize(rng, text), expect
+
+
+def booking(rng, reference):
+    phrase, standalone, date = date_phrase(rng, reference)
+    time_text, time = clock_time(rng)
+    duration_text, minutes = rng.choice(DURATIONS)
+    person = rng.choice(PEOPLE)
+    expect = {"availability": False, "booking": True, "date_phrase": standalone, "date": date,
+              "time": time, "title": person.title(), "duration_minutes": minutes}
+    form = rng.randrange(6)
+    if form == 0:
+        text = f"book a meeting with {person} {phrase} at {time_text} for {duration_text}"
+    elif form == 1:
+        text = f"schedule a call with {person} {phrase} at {time_text}, {duration_text}"
+    elif form == 2:
+        text = f"set up a meeting with {person}, {phrase} at {time_text} for {duration_text}"
+    elif form == 3:
+        text = f"can you arrange a meeting with {person} {phrase} at {time_text}?"
+        expect["duration_minutes"] = None
+    elif form == 4:
+        topic = rng.choice(TOPICS)
+        expect["title"] = topic.title()
+        text = f"book a {topic} meeting {phrase} at {time_text} for {duration_text}"
+    else:
+        text = f"add a meeting with {person} to my calendar {phrase} at {time_text} for {duration_text}"
+    return capitalize(rng, text), expect
+
+
+def other(rng, reference):
+    person = rng.choice(PEOPLE)
+    text = rng.choice([
+        "hello", "hi there!", "thanks, that's all", "what can you do?", "good morning",
+        f"when is my next meeting with {person}?",
+        f"cancel my meeting with {person}",
+        f"move my call with {person} to {clock_time(rng)[0]}",
+        "who are you?", "ok great", "never mind",
+    ])
+    return capitalize(rng, text), {"availability": False, "booking": False}
+
+
+def generate(count, seed, reference=REFERENCE):
+    rng = random.Random(seed)
+    # Roughly the mix seen in chat traffic
+    makers = [availability] * 5 + [booking] * 4 + [other]
+    return [dict(zip(("text", "expect"), rng.choice(makers)(rng, reference))) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    out = sys.stdout
+    out.write(json.dumps({"reference": REFERENCE.isoformat(), "seed": args.seed}) + "\n")
+    for record in generate(args.count, args.seed):
+        out.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
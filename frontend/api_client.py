@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from websockets.sync.client import connect
+from websockets.exceptions import WebSocketException
+
+# FastAPI backend URL
+API_BASE_URL = "https://calendar-bot-o41f.onrender.com"
+WS_CHAT_URL = API_BASE_URL.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + "/ws/chat"
+
+SOCKET_OPEN_TIMEOUT = 10
+SOCKET_REPLY_TIMEOUT = 30
+SOCKET_RETRY_SECONDS = 60
+HEALTH_TTL_SECONDS = 30
+HEALTH_TIMEOUT = 5
+CHAT_TIMEOUT = 30
+HISTORY_PAGE_SIZE = 50
+# How long a reply waits for its queued booking to finish before leaving it to the history
+JOB_WAIT_TIMEOUT = 60
+JOB_POLL_SECONDS = 1.0
+JOB_FINISHED = ("done", "failed")
+
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """One pooled HTTP session shared by every browser session of this Streamlit server"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@st.cache_resource
+def get_health_state():
+    """Last backend health probe, shared across reruns and browser sessions"""
+    return {
+        "healthy": False,
+        "status": "unknown",
+        "checked_at": 0.0,
+        "refreshing": False,
+        "lock": threading.Lock()
+    }
+
+
+def _probe_health(state, session):
+    try:
+        response = session.get(f"{API_BASE_URL}/health", timeout=HEALTH_TIMEOUT)
+        healthy = response.status_code == 200
+        status = "healthy" if healthy else "unhealthy"
+    except Exception as e:
+        healthy = False
+        status = f"error: {str(e)}"
+    with state["lock"]:
+        state["healthy"] = healthy
+        state["status"] = status
+        state["checked_at"] = time.monotonic()
+        state["refreshing"] = False
+
+
+def get_api_health(force_refresh=False):
+    """
+    Return (healthy, status) from the cached probe without waiting on the network.
+    A stale or forced probe is refreshed on a background thread; status is "unknown" until the first one lands.
+    """
+    state = get_health_state()
+    with state["lock"]:
+        stale = force_refresh or time.monotonic() - state["checked_at"] > HEALTH_TTL_SECONDS
+        if stale and not state["refreshing"]:
+            state["refreshing"] = True
+            threading.Thread(target=_probe_health, args=(state, get_http_session()), daemon=True).start()
+        return state["healthy"], state["status"]
+
+
+def post_chat(payload):
+    """POST a chat message over the pooled HTTP session"""
+    return get_http_session().post(f"{API_BASE_URL}/chat", json=payload, timeout=CHAT_TIMEOUT)
+
+
+def fetch_job(job_id):
+    response = get_http_session().get(f"{API_BASE_URL}/jobs/{job_id}", timeout=HEALTH_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def wait_for_job(job_id, timeout=JOB_WAIT_TIMEOUT):
+    """Poll /jobs/{job_id} until the queued booking finishes; None if it is still pending after timeout"""
+    give_up_at = time.monotonic() + timeout
+    while True:
+        job = fetch_job(job_id)
+        if job["status"] in JOB_FINISHED:
+            return job
+        if time.monotonic() >= give_up_at:
+            return None
+        time.sleep(JOB_POLL_SECONDS)
+
+
+def fetch_history_page(session_id, after=None, etag=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Fetch one page of server-side history after the given message id.
+    Returns (page, etag); page is None when the server answered 304 Not Modified.
+    """
+    params = {"limit": limit}
+    if after is not None:
+        params["after"] = after
+    headers = {"If-None-Match": etag} if etag else {}
+    response = get_http_session().get(
+        f"{API_BASE_URL}/conversation/{session_id}",
+        params=params,
+        headers=headers,
+        timeout=HEALTH_TIMEOUT
+    )
+    if response.status_code == 304:
+        return None, etag
+    if response.status_code == 404:
+        return {"messages": [], "has_more": False}, None
+    response.raise_for_status()
+    return response.json(), response.headers.get("ETag")
+
+
+def _open_socket():
+    """Open the chat socket for this browser session and wait for the server's session frame"""
+    ws = connect(
+        f"{WS_CHAT_URL}?session_id={st.session_state.session_id}",
+        open_timeout=SOCKET_OPEN_TIMEOUT
+    )
+    hello = json.loads(ws.recv(timeout=SOCKET_OPEN_TIMEOUT))
+    if hello.get("type") != "session":
+        ws.close()
+        raise WebSocketException(f"Unexpected greeting from server: {hello}")
+    st.session_state.chat_socket = ws
+    st.session_state.chat_socket_session = st.session_state.session_id
+    return ws
+
+
+def close_socket():
+    ws = st.session_state.get("chat_socket")
+    if ws is not None:
+        try:
+            ws.close()
+        except Exception:
+            pass
+    st.session_state.chat_socket = None
+
+
+def get_socket():
+    """Return the open socket for the current session, reconnecting if it dropped or the session changed"""
+    ws = st.session_state.get("chat_socket")
+    if ws is not None and st.session_state.get("chat_socket_session") != st.session_state.session_id:
+        close_socket()
+        ws = None
+    if ws is None:
+        ws = _open_socket()
+    return ws
+
+
+def socket_is_open() -> bool:
+    return st.session_state.get("chat_socket") is not None
+
+
+def try_socket() -> bool:
+    """Make sure the chat socket is open, backing off for a while after a failed connect"""
+    if socket_is_open() and st.session_state.get("chat_socket_session") == st.session_state.session_id:
+        return True
+    if time.monotonic() < st.session_state.get("socket_retry_at", 0.0):
+        return False
+    try:
+        get_socket()
+        return True
+    except Exception:
+        st.session_state.socket_retry_at = time.monotonic() + SOCKET_RETRY_SECONDS
+        return False
+
+
+def send_over_socket(message: str, on_progress=None):
+    """
+    Send one message over the persistent socket and block until the response frame.
+    on_progress is called with each progress stage pushed by the server.
+    A response that queued a booking also waits (up to JOB_WAIT_TIMEOUT) for its
+    "job" frame, returned as the response's "job".
+    """
+    payload = json.dumps({
+        "type": "message",
+        "message": message,
+        "timezone": st.session_state["timezone"]
+    })
+
+    # A socket the server closed while the page sat idle fails on send;
+    # reconnect once then, but never resend after the server may have received it
+    ws = get_socket()
+    try:
+        ws.send(payload)
+    except (WebSocketException, OSError):
+        close_socket()
+        ws = get_socket()
+        ws.send(payload)
+
+    reply = None
+    job_deadline = None
+    try:
+        while True:
+            timeout = SOCKET_REPLY_TIMEOUT
+            if reply is not None:
+                timeout = job_deadline - time.monotonic()
+                if timeout <= 0:
+                    return reply
+            try:
+                frame = json.loads(ws.recv(timeout=timeout))
+            except TimeoutError:
+                # The booking is still queued; its outcome shows up in the history later
+                if reply is not None:
+                    return reply
+                raise
+            frame_type = frame.pop("type", None)
+            if frame_type == "progress":
+                if on_progress:
+                    on_progress(frame.get("stage"))
+            elif frame_type == "response":
+                if not frame.get("job_id"):
+                    return frame
+                reply = frame
+                job_deadline = time.monotonic() + JOB_WAIT_TIMEOUT
+                if on_progress:
+                    on_progress("booking")
+            elif frame_type == "job":
+                # Reports for earlier bookings are picked up by the history sync
+                if reply is not None and frame.get("job_id") == reply["job_id"]:
+                    reply["job"] = frame
+                    return reply
+            elif frame_type == "error":
+                return {"response": f"Error: {frame.get('detail')}", "status": "error"}
+    except (WebSocketException, OSError, TimeoutError):
+        close_socket()
+        raise
@@ -5,6 +5,7 @@ import uuid
 from datetime import datetime
 import time
 import pytz
+from api_client import get_api_health, post_chat, wait_for_job, fetch_history_page, socket_is_open, try_socket, send_over_socket, close_socket
 
 st.set_page_config(
     page_title="📅 AI Calendar Assistant",
@@ -79,9 +80,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# FastAPI backend URL
-API_BASE_URL = "https://calendar-bot-o41f.onrender.com"
-
 # Timezone selection
 if "timezone" not in st.session_state:
     st.session_state["timezone"] = "Asia/Kolkata"
@@ -103,22 +101,46 @@ if "messages" not in st.session_state:
 if "api_status" not in st.session_state:
     st.session_state.api_status = "unknown"
 
-def check_api_health():
-    """Check if the FastAPI backend is running"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
-        if response.status_code == 200:
-            st.session_state.api_status = "healthy"
-            return True
-        else:
-            st.session_state.api_status = "unhealthy"
-            return False
-    except Exception as e:
-        st.session_state.api_status = f"error: {str(e)}"
-        return False
-
-def send_message_to_agent(message: str):
-    """Send message to FastAPI backend and get response"""
+if "chat_socket" not in st.session_state:
+    st.session_state.chat_socket = None
+
+# Id of the newest server-side message we hold, used as the history cursor
+if "last_message_id" not in st.session_state:
+    st.session_state.last_message_id = 0
+    st.session_state.history_etag = None
+
+# Only the newest messages are rendered; older ones are revealed on demand
+HISTORY_WINDOW = 50
+if "history_window" not in st.session_state:
+    st.session_state.history_window = HISTORY_WINDOW
+
+def check_api_health(force_refresh=False):
+    """
+    Report backend health without blocking the render: an open chat socket counts as healthy,
+    otherwise the cached background probe answers (optimistically while its first run is pending)
+    """
+    if socket_is_open() and not force_refresh:
+        st.session_state.api_status = "healthy"
+        return True
+    healthy, status = get_api_health(force_refresh)
+    st.session_state.api_status = "checking..." if status == "unknown" else status
+    return healthy or status == "unknown"
+
+def send_message_to_agent(message: str, progress_placeholder=None):
+    """Send message to FastAPI backend and get response (with the outcome of a booking it queued as "job")"""
+    progress_labels = {"received": "📨 Message received...", "thinking": "🤖 Thinking...", "booking": "📅 Booking..."}
+    on_progress = None
+    if progress_placeholder is not None:
+        on_progress = lambda stage: progress_placeholder.caption(progress_labels.get(stage, stage))
+    if try_socket():
+        try:
+            return send_over_socket(message, on_progress)
+        except Exception as e:
+            return {
+                "response": f"Connection error: {str(e)}. Please make sure the backend is running.",
+                "status": "error"
+            }
+    
     try:
         payload = {
             "message": message,
@@ -126,14 +148,19 @@ def send_message_to_agent(message: str):
             "timezone": st.session_state["timezone"]
         }
         
-        response = requests.post(
-            f"{API_BASE_URL}/chat",
-            json=payload,
-            timeout=30
-        )
+        response = post_chat(payload)
         
         if response.status_code == 200:
-            return response.json()
+            response_data = response.json()
+            if response_data.get("job_id"):
+                if on_progress:
+                    on_progress("booking")
+                try:
+                    response_data["job"] = wait_for_job(response_data["job_id"])
+                except requests.exceptions.RequestException:
+                    # The outcome still reaches the history; it just shows up on the next sync
+                    response_data["job"] = None
+            return response_data
         else:
             return {
                 "response": f"Error: Received status code {response.status_code}",
@@ -151,6 +178,81 @@ def send_message_to_agent(message: str):
             "status": "error"
         }
 
+def sync_history():
+    """Pull only the messages after our cursor from the backend and append them"""
+    try:
+        while True:
+            page, etag = fetch_history_page(
+                st.session_state.session_id,
+                after=st.session_state.last_message_id,
+                etag=st.session_state.history_etag
+            )
+            if page is None:
+                return
+            st.session_state.history_etag = etag
+            for message in page["messages"]:
+                # A message we already show without an id (a user turn whose reply failed or timed out
+                # client-side, a booking outcome from its job report) gets its server id instead of a second copy
+                shown = next((m for m in st.session_state.messages
+                              if m.get("id") is None and m["role"] == message["role"] and m["content"] == message["content"]), None)
+                if shown is not None:
+                    shown["id"] = message["id"]
+                    st.session_state.last_message_id = message["id"]
+                    continue
+                st.session_state.messages.append({
+                    "id": message["id"],
+                    "role": message["role"],
+                    "content": message["content"],
+                    "timestamp": datetime.now().isoformat()
+                })
+                st.session_state.last_message_id = message["id"]
+            if not page.get("has_more"):
+                return
+    except Exception as e:
+        st.session_state.api_status = f"error: {str(e)}"
+
+def submit_message(message: str, progress_placeholder=None, spinner_text="🤖 Thinking..."):
+    """Send a message and record the exchange, syncing from the server only if we missed messages"""
+    user_entry = {
+        "role": "user",
+        "content": message,
+        "timestamp": datetime.now().isoformat()
+    }
+    st.session_state.messages.append(user_entry)
+    
+    with st.spinner(spinner_text):
+        response_data = send_message_to_agent(message, progress_placeholder)
+    
+    message_id = response_data.get("message_id")
+    if message_id and message_id != st.session_state.last_message_id + 2:
+        # Other messages landed in this session meanwhile (e.g. another tab); fetch just those
+        st.session_state.messages.remove(user_entry)
+        sync_history()
+        return
+    
+    if message_id:
+        user_entry["id"] = message_id - 1
+        st.session_state.last_message_id = message_id
+    st.session_state.messages.append({
+        "id": message_id,
+        "role": "assistant",
+        "content": response_data["response"],
+        "status": response_data.get("status", "unknown"),
+        "timestamp": datetime.now().isoformat()
+    })
+    
+    # The outcome of a queued booking; the server adds it to the history too, so it has no id until the next sync
+    job = response_data.get("job")
+    if job:
+        result = job.get("result") or {}
+        st.session_state.messages.append({
+            "job_id": job["job_id"],
+            "role": "assistant",
+            "content": result.get("response") or result.get("error") or f"Booking {job['status']}.",
+            "status": "success" if job["status"] == "done" else "error",
+            "timestamp": datetime.now().isoformat()
+        })
+
 def display_message(message, is_user=False):
     """Display a message in the chat interface"""
     if is_user:
@@ -178,16 +280,21 @@ with st.sidebar:
     st.header("🔧 Controls")
     
     if st.button("🔄 Refresh API Status"):
-        check_api_health()
+        close_socket()
+        check_api_health(force_refresh=True)
         st.rerun()
     
     if st.button("🗑️ Clear Chat"):
         st.session_state.messages = []
+        st.session_state.history_window = HISTORY_WINDOW
         st.rerun()
     
     if st.button("🆕 New Session"):
         st.session_state.session_id = str(uuid.uuid4())
         st.session_state.messages = []
+        st.session_state.last_message_id = 0
+        st.session_state.history_etag = None
+        st.session_state.history_window = HISTORY_WINDOW
         st.rerun()
     
 
@@ -237,7 +344,13 @@ with col1:
             """, unsafe_allow_html=True)
         
 
-        for message in st.session_state.messages:
+        hidden_count = len(st.session_state.messages) - st.session_state.history_window
+        if hidden_count > 0:
+            if st.button(f"⬆️ Show {min(hidden_count, HISTORY_WINDOW)} earlier messages"):
+                st.session_state.history_window += HISTORY_WINDOW
+                st.rerun()
+        
+        for message in st.session_state.messages[-st.session_state.history_window:]:
             display_message(message["content"], message["role"] == "user")
         
         st.markdown('</div>', unsafe_allow_html=True)
@@ -289,26 +402,9 @@ with input_container:
         if not api_healthy:
             st.error("Cannot send message: API is not available")
         else:
-   
-            st.session_state.messages.append({
-                "role": "user", 
-                "content": user_input,
-                "timestamp": datetime.now().isoformat()
-            })
-            
- 
-            with st.spinner("🤖 Thinking..."):
-               
-                response_data = send_message_to_agent(user_input)
-            
-         
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": response_data["response"],
-                "status": response_data.get("status", "unknown"),
-                "timestamp": datetime.now().isoformat()
-            })
-            
+            progress_placeholder = st.empty()
+            submit_message(user_input, progress_placeholder)
+            progress_placeholder.empty()
             
             st.rerun()
 
@@ -322,30 +418,21 @@ with example_col1:
     if st.button("📅 Check Availability"):
         if api_healthy:
             example_prompt = "Check availability for tomorrow afternoon."
-            st.session_state.messages.append({"role": "user", "content": example_prompt, "timestamp": datetime.now().isoformat()})
-            with st.spinner("Processing..."):
-                response_data = send_message_to_agent(example_prompt)
-            st.session_state.messages.append({"role": "assistant", "content": response_data["response"], "timestamp": datetime.now().isoformat()})
+            submit_message(example_prompt, spinner_text="Processing...")
             st.rerun()
 
 with example_col2:
     if st.button("📝 Schedule Meeting"):
         if api_healthy:
             example_prompt = "Schedule a 1-hour meeting with the team next Monday at 2pm"
-            st.session_state.messages.append({"role": "user", "content": example_prompt, "timestamp": datetime.now().isoformat()})
-            with st.spinner("Processing..."):
-                response_data = send_message_to_agent(example_prompt)
-            st.session_state.messages.append({"role": "assistant", "content": response_data["response"], "timestamp": datetime.now().isoformat()})
+            submit_message(example_prompt, spinner_text="Processing...")
             st.rerun()
 
 with example_col3:
     if st.button("🔍 Find Time Slots"):
         if api_healthy:
             example_prompt = "List available 30-minute time slots for this week."
-            st.session_state.messages.append({"role": "user", "content": example_prompt, "timestamp": datetime.now().isoformat()})
-            with st.spinner("Processing..."):
-                response_data = send_message_to_agent(example_prompt)
-            st.session_state.messages.append({"role": "assistant", "content": response_data["response"], "timestamp": datetime.now().isoformat()})
+            submit_message(example_prompt, spinner_text="Processing...")
             st.rerun()
 
 